@@ -0,0 +1,45 @@
+"""Add daily_user_category_totals rollup
+
+Revision ID: 3f5c1d8e2a47
+Revises: b386d9b54080
+Create Date: 2026-10-16 10:12:04.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f5c1d8e2a47'
+down_revision: Union[str, Sequence[str], None] = 'b386d9b54080'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_user_category_totals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('payment_type', sa.String(length=255), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('txn_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint(
+        'user_id', 'day', 'category_id', 'payment_type',
+        name='uq_daily_user_category_totals',
+        postgresql_nulls_not_distinct=True,
+    )
+    )
+    # Заполнение выполняется отдельно: python -m app.scripts.backfill_rollup
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_user_category_totals')
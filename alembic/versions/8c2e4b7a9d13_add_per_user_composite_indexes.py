@@ -0,0 +1,67 @@
+"""Add per-user composite indexes
+
+Revision ID: 8c2e4b7a9d13
+Revises: 3f5c1d8e2a47
+Create Date: 2026-10-16 11:40:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e4b7a9d13'
+down_revision: Union[str, Sequence[str], None] = '3f5c1d8e2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не может выполняться внутри транзакции.
+    # Если сборка прервётся, индекс останется INVALID: удалите его
+    # (DROP INDEX CONCURRENTLY) и повторите миграцию.
+    # Уникальный индекс на категориях упадёт, если в таблице уже есть
+    # дубликаты (user_id, name) — их нужно слить заранее.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_id_timestamp_id',
+            'transactions',
+            ['user_id', sa.text('timestamp DESC'), 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'uq_categories_user_id_name',
+            'categories',
+            ['user_id', 'name'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_goals_user_id',
+            'goals',
+            ['user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_goals_user_id', table_name='goals', postgresql_concurrently=True
+        )
+        op.drop_index(
+            'uq_categories_user_id_name',
+            table_name='categories',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_transactions_user_id_timestamp_id',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
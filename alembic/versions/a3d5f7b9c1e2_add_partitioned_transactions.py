@@ -0,0 +1,202 @@
+"""Add monthly partitioned shadow table for transactions
+
+Revision ID: a3d5f7b9c1e2
+Revises: 5d9f3a1c7e20
+Create Date: 2026-10-17 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d5f7b9c1e2'
+down_revision: Union[str, Sequence[str], None] = '5d9f3a1c7e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Переход на секционированную таблицу выполняется в три шага:
+#   1. эта миграция — пустая секционированная копия transactions_partitioned,
+#      триггер, зеркалирующий в неё все изменения transactions;
+#   2. python -m app.scripts.partition_transactions migrate — перенос
+#      существующих строк пачками, без блокировки записи;
+#   3. миграция f2b4d6e8a0c1 — переименование таблиц под короткой блокировкой.
+# Требуется PostgreSQL 13+ (BEFORE-триггеры на секционированных таблицах).
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Первичный ключ секционированной таблицы обязан включать ключ
+    # секционирования, поэтому он (id, timestamp). id по-прежнему берётся
+    # из transactions_id_seq (LIKE ... INCLUDING DEFAULTS).
+    op.execute(
+        """
+        CREATE TABLE transactions_partitioned (
+            LIKE transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE transactions_partitioned
+            ADD CONSTRAINT transactions_partitioned_pkey PRIMARY KEY (id, timestamp),
+            ADD FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            ADD FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE SET NULL
+        """
+    )
+    # Индексы на родителе пустой таблицы создаются мгновенно и наследуются
+    # всеми секциями, включая создаваемые позже.
+    op.create_index(
+        'ix_transactions_user_id_timestamp_id_partitioned',
+        'transactions_partitioned',
+        ['user_id', sa.text('timestamp DESC'), 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_transactions_user_id_content_hash_partitioned',
+        'transactions_partitioned',
+        ['user_id', 'content_hash'],
+        unique=False,
+    )
+    op.execute(
+        """
+        CREATE TRIGGER transactions_content_hash
+        BEFORE INSERT OR UPDATE OF timestamp, amount, item, payment_method, payment_type
+        ON transactions_partitioned
+        FOR EACH ROW EXECUTE FUNCTION set_transaction_content_hash()
+        """
+    )
+    # Секция по умолчанию принимает строки вне созданных месяцев, чтобы
+    # вставка никогда не падала; create_transaction_partition переносит
+    # такие строки в новую секцию.
+    op.execute(
+        "CREATE TABLE transactions_default PARTITION OF transactions_partitioned DEFAULT"
+    )
+    # Секция месяца (границы — начало месяца по UTC). Родитель определяется
+    # через transactions_default, поэтому функция работает и до, и после
+    # переименования таблиц. Идемпотентна; параллельные вызовы
+    # сериализуются advisory-блокировкой.
+    op.execute(
+        """
+        CREATE FUNCTION create_transaction_partition(month date) RETURNS text
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            parent regclass;
+            month_start timestamp := date_trunc('month', month::timestamp);
+            lower_bound timestamptz := month_start AT TIME ZONE 'UTC';
+            upper_bound timestamptz := (month_start + interval '1 month') AT TIME ZONE 'UTC';
+            partition_name text := 'transactions_p' || to_char(month_start, 'YYYYMM');
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_advisory_xact_lock(hashtext('create_transaction_partition'));
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+
+            SELECT inhparent::regclass INTO parent
+            FROM pg_inherits
+            WHERE inhrelid = 'transactions_default'::regclass;
+
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name, parent
+            );
+            EXECUTE format(
+                'WITH moved AS ('
+                '    DELETE FROM transactions_default'
+                '    WHERE timestamp >= $1 AND timestamp < $2 RETURNING *'
+                ') INSERT INTO %I SELECT * FROM moved',
+                partition_name
+            ) USING lower_bound, upper_bound;
+            EXECUTE format(
+                'ALTER TABLE %s ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                parent, partition_name, lower_bound, upper_bound
+            );
+            RETURN partition_name;
+        END
+        $$
+        """
+    )
+    # Секции от месяца самой ранней транзакции до трёх месяцев вперёд.
+    # Минимум берётся по самим transactions (rollup мог быть заполнен не
+    # полностью): по одной индексной пробе (user_id, timestamp) на пользователя
+    # вместо полного просмотра таблицы.
+    op.execute(
+        """
+        SELECT create_transaction_partition(month::date)
+        FROM generate_series(
+            date_trunc(
+                'month',
+                coalesce(
+                    (
+                        SELECT min(earliest.timestamp)
+                        FROM users u
+                        CROSS JOIN LATERAL (
+                            SELECT t.timestamp FROM transactions t
+                            WHERE t.user_id = u.id
+                            ORDER BY t.timestamp
+                            LIMIT 1
+                        ) earliest
+                    ),
+                    now()
+                ) AT TIME ZONE 'UTC'
+            ),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months',
+            interval '1 month'
+        ) AS month
+        """
+    )
+    # Зеркалирование изменений в таблицу TG_ARGV[0]. UPDATE — удаление
+    # и вставка, так как timestamp (ключ секционирования) может измениться.
+    op.execute(
+        """
+        CREATE FUNCTION mirror_transaction() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                EXECUTE format('DELETE FROM %I WHERE id = $1', TG_ARGV[0]) USING OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                EXECUTE format('INSERT INTO %I SELECT ($1).*', TG_ARGV[0]) USING NEW;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER transactions_mirror
+        AFTER INSERT OR UPDATE OR DELETE ON transactions
+        FOR EACH ROW EXECUTE FUNCTION mirror_transaction('transactions_partitioned')
+        """
+    )
+    # Прогресс переноса: target_id — max(id) на момент старта (всё, что
+    # новее, уже попадает в копию через триггер), last_id — перенесено до.
+    op.create_table(
+        'transactions_partition_backfill',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('target_id', sa.BigInteger(), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column(
+            'started_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transactions_partition_backfill')
+    op.execute("DROP TRIGGER transactions_mirror ON transactions")
+    op.execute("DROP FUNCTION mirror_transaction()")
+    op.execute("DROP FUNCTION create_transaction_partition(date)")
+    op.execute("DROP TABLE transactions_partitioned")
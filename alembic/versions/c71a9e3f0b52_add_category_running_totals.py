@@ -0,0 +1,85 @@
+"""Add all-time and monthly category running totals
+
+Revision ID: c71a9e3f0b52
+Revises: 8c2e4b7a9d13
+Create Date: 2026-10-16 14:05:51.337820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71a9e3f0b52'
+down_revision: Union[str, Sequence[str], None] = '8c2e4b7a9d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_category_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('txn_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'category_id')
+    )
+    op.create_index(
+        'ix_user_category_totals_user_id_total',
+        'user_category_totals',
+        ['user_id', sa.text('total_amount DESC')],
+        unique=False,
+    )
+    op.create_table('monthly_user_category_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('txn_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'month', 'category_id')
+    )
+    op.create_index(
+        'ix_monthly_user_category_totals_user_id_month_total',
+        'monthly_user_category_totals',
+        ['user_id', 'month', sa.text('total_amount DESC')],
+        unique=False,
+    )
+
+    # Начальное заполнение из дневного rollup: объём пропорционален числу дней,
+    # а не транзакций.
+    op.execute("""
+        INSERT INTO user_category_totals (user_id, category_id, total_amount, txn_count)
+        SELECT user_id, category_id, sum(total_amount), sum(txn_count)
+        FROM daily_user_category_totals
+        WHERE payment_type = 'Expense' AND category_id IS NOT NULL
+        GROUP BY user_id, category_id
+    """)
+    op.execute("""
+        INSERT INTO monthly_user_category_totals
+            (user_id, month, category_id, total_amount, txn_count)
+        SELECT user_id, date_trunc('month', day)::date, category_id,
+               sum(total_amount), sum(txn_count)
+        FROM daily_user_category_totals
+        WHERE payment_type = 'Expense' AND category_id IS NOT NULL
+        GROUP BY user_id, date_trunc('month', day)::date, category_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_monthly_user_category_totals_user_id_month_total',
+        table_name='monthly_user_category_totals',
+    )
+    op.drop_table('monthly_user_category_totals')
+    op.drop_index(
+        'ix_user_category_totals_user_id_total', table_name='user_category_totals'
+    )
+    op.drop_table('user_category_totals')
@@ -0,0 +1,128 @@
+"""Add transaction content hash for import de-duplication
+
+Revision ID: e4a7b2c9d1f6
+Revises: c71a9e3f0b52
+Create Date: 2026-10-16 16:22:09.415873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# Строк на одну транзакцию заполнения content_hash
+BACKFILL_BATCH = 10000
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7b2c9d1f6'
+down_revision: Union[str, Sequence[str], None] = 'c71a9e3f0b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'transactions', sa.Column('content_hash', sa.String(length=32), nullable=True)
+    )
+    # Единственное определение хеша: его используют триггер и merge импорта.
+    # Время приводится к UTC явно, поэтому результат не зависит от TimeZone
+    # сессии и функцию можно объявить IMMUTABLE.
+    op.execute(
+        """
+        CREATE FUNCTION transaction_content_hash(
+            ts timestamptz,
+            amount numeric,
+            item text,
+            payment_method text,
+            payment_type text
+        ) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT md5(concat_ws(
+                '|',
+                to_char(ts AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+                amount::numeric(12, 2)::text,
+                item,
+                payment_method,
+                payment_type
+            ))
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION set_transaction_content_hash() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.content_hash := transaction_content_hash(
+                NEW.timestamp, NEW.amount, NEW.item,
+                NEW.payment_method, NEW.payment_type
+            );
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER transactions_content_hash
+        BEFORE INSERT OR UPDATE OF timestamp, amount, item, payment_method, payment_type
+        ON transactions
+        FOR EACH ROW EXECUTE FUNCTION set_transaction_content_hash()
+        """
+    )
+    # autocommit_block фиксирует изменения выше (новые строки дальше получают
+    # хеш триггером), затем существующие строки заполняются пачками по id —
+    # каждая пачка своей короткой транзакцией, без блокировки всей таблицы
+    # и без одного огромного UPDATE; затем CREATE INDEX CONCURRENTLY.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = 0
+        while last_id is not None:
+            last_id = bind.execute(
+                sa.text(
+                    """
+                    WITH batch AS (
+                        SELECT id FROM transactions
+                        WHERE id > :last_id
+                        ORDER BY id
+                        LIMIT :batch_size
+                    ),
+                    updated AS (
+                        UPDATE transactions t
+                        SET content_hash = transaction_content_hash(
+                            t.timestamp, t.amount, t.item,
+                            t.payment_method, t.payment_type
+                        )
+                        FROM batch
+                        WHERE t.id = batch.id AND t.content_hash IS NULL
+                    )
+                    SELECT max(id) FROM batch
+                    """
+                ),
+                {"last_id": last_id, "batch_size": BACKFILL_BATCH},
+            ).scalar()
+
+        op.create_index(
+            'ix_transactions_user_id_content_hash',
+            'transactions',
+            ['user_id', 'content_hash'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_id_content_hash',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
+    op.execute("DROP TRIGGER transactions_content_hash ON transactions")
+    op.execute("DROP FUNCTION set_transaction_content_hash()")
+    op.execute(
+        "DROP FUNCTION transaction_content_hash(timestamptz, numeric, text, text, text)"
+    )
+    op.drop_column('transactions', 'content_hash')
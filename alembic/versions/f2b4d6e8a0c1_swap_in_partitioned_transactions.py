@@ -0,0 +1,100 @@
+"""Swap in the partitioned transactions table
+
+Revision ID: f2b4d6e8a0c1
+Revises: a3d5f7b9c1e2
+Create Date: 2026-10-17 09:40:03.527914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b4d6e8a0c1'
+down_revision: Union[str, Sequence[str], None] = 'a3d5f7b9c1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Индексы, имена которых переходят от старой таблицы к секционированной.
+INDEXES = (
+    'ix_transactions_user_id_timestamp_id',
+    'ix_transactions_user_id_content_hash',
+)
+
+
+def _rename(table: str, new_table: str, suffix: str, new_suffix: str) -> None:
+    """Переименовывает таблицу вместе с первичным ключом и индексами."""
+    op.execute(f"ALTER TABLE {table} RENAME TO {new_table}")
+    op.execute(f"ALTER INDEX {table}_pkey RENAME TO {new_table}_pkey")
+    op.execute(f"ALTER INDEX IF EXISTS ix_{table}_id RENAME TO ix_{new_table}_id")
+    for name in INDEXES:
+        op.execute(f"ALTER INDEX {name}{suffix} RENAME TO {name}{new_suffix}")
+
+
+def _mirror_to(table: str) -> None:
+    op.execute(
+        f"""
+        CREATE TRIGGER transactions_mirror
+        AFTER INSERT OR UPDATE OR DELETE ON transactions
+        FOR EACH ROW EXECUTE FUNCTION mirror_transaction('{table}')
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    progress = op.get_bind().execute(
+        sa.text("SELECT target_id, last_id FROM transactions_partition_backfill")
+    ).first()
+    if progress is None or progress.last_id < progress.target_id:
+        raise RuntimeError(
+            "transactions are not copied into transactions_partitioned yet: "
+            "run `python -m app.scripts.partition_transactions migrate` first"
+        )
+    # Все строки уже в копии, поэтому блокировка нужна только на время
+    # переименований. Старая таблица остаётся синхронной (зеркалирование
+    # в обратную сторону), пока её не удалят командой
+    # partition_transactions drop-legacy, — так миграцию можно откатить.
+    op.execute("LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER transactions_mirror ON transactions")
+    _rename('transactions', 'transactions_legacy', '', '_legacy')
+    _rename('transactions_partitioned', 'transactions', '_partitioned', '')
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    _mirror_to('transactions_legacy')
+    op.drop_table('transactions_partition_backfill')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().scalar(sa.text("SELECT to_regclass('transactions_legacy')")) is None:
+        raise RuntimeError(
+            "transactions_legacy was dropped, the partitioned table cannot be swapped back"
+        )
+    op.execute("LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER transactions_mirror ON transactions")
+    _rename('transactions', 'transactions_partitioned', '', '_partitioned')
+    _rename('transactions_legacy', 'transactions', '_legacy', '')
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    _mirror_to('transactions_partitioned')
+    op.create_table(
+        'transactions_partition_backfill',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('target_id', sa.BigInteger(), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column(
+            'started_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute(
+        """
+        INSERT INTO transactions_partition_backfill (id, target_id, last_id, finished_at)
+        VALUES (1, 0, 0, now())
+        """
+    )
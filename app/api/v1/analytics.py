@@ -1,9 +1,17 @@
 from typing import List, Optional, Dict
 from datetime import datetime
-from fastapi import APIRouter, Depends, Response, status, Query
+from fastapi import APIRouter, Depends, Request, Response, status, Query
 
 from app.core.jwt import get_current_payload
-from app.schemas.transaction import TransactionCreate, TransactionResponse
+from app.schemas.transaction import (
+    TransactionCreate,
+    TransactionResponse,
+    TotalsResponse,
+    ForecastResponse,
+    DashboardResponse,
+)
+from app.services.analytics_cache import cached_response
+from app.services.dashboard import DashboardService, get_dashboard_service
 from app.services.transaction import AnalyticsService, get_analytics_service
 
 
@@ -12,29 +20,44 @@ router = APIRouter(prefix="/analytics", tags=["Аналитика"])
 
 @router.get(
     "/total_sum",
-    response_model=dict,
+    response_model=TotalsResponse,
     status_code=status.HTTP_200_OK,
     summary="Получение общей суммы расходов",
 )
 async def get_total_spent(
+    request: Request,
     date_from: Optional[datetime] = Query(
         None, description="Начальная дата фильтра (включительно), формат ISO 8601"
     ),
     date_to: Optional[datetime] = Query(
         None, description="Конечная дата фильтра (включительно), формат ISO 8601"
     ),
+    by_payment_method: bool = Query(
+        False, description="Дополнительно разбить суммы по способу оплаты"
+    ),
     payload: dict = Depends(get_current_payload),
     service: AnalyticsService = Depends(get_analytics_service),
 ):
     """
-    Возвращает общую сумму потраченных средств текущего пользователя.
+    Возвращает общую сумму расходов и доходов текущего пользователя
+    по хранимым транзакциям (без месяцев, отсоединённых по retention).
     Дополнительные параметры:
     - date_from: ISO-формат начальной даты (включительно)
     - date_to: ISO-формат конечной даты (включительно)
+    - by_payment_method: разбивка сумм по payment_method в breakdown
     """
     user_id = int(payload.get("sub"))
-    total_spent = await service.get_total_spent(user_id, date_from, date_to)
-    return {"total_spent": total_spent}
+    return await cached_response(
+        request,
+        user_id,
+        "total_sum",
+        {
+            "date_from": date_from,
+            "date_to": date_to,
+            "by_payment_method": by_payment_method,
+        },
+        lambda: service.get_total_spent(user_id, date_from, date_to, by_payment_method),
+    )
 
 
 @router.get(
@@ -44,6 +67,7 @@ async def get_total_spent(
     summary="Получение топ категорий по тратам",
 )
 async def get_top_categories(
+    request: Request,
     limit: int = Query(
         5, ge=1, le=100, description="Количество категорий для отображения (1-100)"
     ),
@@ -64,7 +88,13 @@ async def get_top_categories(
     - date_to: ISO-формат конечной даты (включительно)
     """
     user_id = int(payload.get("sub"))
-    return await service.get_top_categories(user_id, limit, date_from, date_to)
+    return await cached_response(
+        request,
+        user_id,
+        "top_categories",
+        {"limit": limit, "date_from": date_from, "date_to": date_to},
+        lambda: service.get_top_categories(user_id, limit, date_from, date_to),
+    )
 
 
 @router.get(
@@ -74,6 +104,7 @@ async def get_top_categories(
     summary="Получение ежедневных трат",
 )
 async def get_daily_spending(
+    request: Request,
     days_back: int = Query(
         30, ge=1, le=365, description="Количество дней назад для анализа (1-365)"
     ),
@@ -87,7 +118,13 @@ async def get_daily_spending(
     - date_to: ISO-формат конечной даты (включительно)
     """
     user_id = int(payload.get("sub"))
-    return await service.get_daily_spending(user_id, days_back)
+    return await cached_response(
+        request,
+        user_id,
+        "daily_spending",
+        {"days_back": days_back},
+        lambda: service.get_daily_spending(user_id, days_back),
+    )
 
 
 @router.get(
@@ -97,6 +134,7 @@ async def get_daily_spending(
     summary="Получение прогноза трат",
 )
 async def get_forecast_month_end(
+    request: Request,
     date_from: Optional[datetime] = Query(
         None, description="Начальная дата фильтра (включительно), формат ISO 8601"
     ),
@@ -110,4 +148,103 @@ async def get_forecast_month_end(
     - date_to: ISO-формат конечной даты (включительно)
     """
     user_id = int(payload.get("sub"))
-    return await service.forecast_month_end(user_id, date_from)
+    return await cached_response(
+        request,
+        user_id,
+        "forecast_month_end",
+        {"date_from": date_from},
+        lambda: service.forecast_month_end(user_id, date_from),
+    )
+
+
+@router.get(
+    "/forecast",
+    response_model=ForecastResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Получение прогноза трат с доверительным интервалом",
+)
+async def get_forecast(
+    request: Request,
+    date_from: Optional[datetime] = Query(
+        None, description="Начало истории для оценки уровня трат, формат ISO 8601"
+    ),
+    payload: dict = Depends(get_current_payload),
+    service: AnalyticsService = Depends(get_analytics_service),
+):
+    """
+    Возвращает прогноз трат текущего пользователя до конца месяца:
+    - spent_to_date: траты с начала месяца по вчера
+    - remaining, remaining_lower, remaining_upper: прогноз остатка месяца и интервал
+    - recurring: регулярные платежи, ожидаемые до конца месяца
+    - month_total: ожидаемая сумма за месяц
+    """
+    user_id = int(payload.get("sub"))
+    return await cached_response(
+        request,
+        user_id,
+        "forecast",
+        {"date_from": date_from},
+        lambda: service.forecast(user_id, date_from),
+    )
+
+
+@router.get(
+    "/dashboard",
+    response_model=DashboardResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Получение всех метрик дашборда одним запросом",
+)
+async def get_dashboard(
+    request: Request,
+    date_from: Optional[datetime] = Query(
+        None, description="Начальная дата фильтра (включительно), формат ISO 8601"
+    ),
+    date_to: Optional[datetime] = Query(
+        None, description="Конечная дата фильтра (включительно), формат ISO 8601"
+    ),
+    limit: int = Query(
+        5, ge=1, le=100, description="Количество категорий для отображения (1-100)"
+    ),
+    days_back: int = Query(
+        30, ge=1, le=365, description="Количество дней назад для анализа (1-365)"
+    ),
+    payload: dict = Depends(get_current_payload),
+    service: DashboardService = Depends(get_dashboard_service),
+):
+    """
+    Возвращает total_sum, top_categories, daily_spending и forecast
+    на общем снимке БД. Параметры значат то же, что в отдельных эндпоинтах:
+    - totals и top_categories — за окно date_from/date_to
+    - forecast — до конца текущего месяца; date_from задаёт начало истории
+      для оценки уровня трат, date_to не используется
+    - daily_spending — за days_back дней по сегодня, окно не используется
+    Ответ кэшируется как и отдельные метрики; серверное время каждой —
+    в timings_ms (для ответа из кэша — время исходного расчёта), при
+    расчёте — и в заголовке Server-Timing.
+    """
+    user_id = int(payload.get("sub"))
+    computed = []
+
+    async def compute() -> DashboardResponse:
+        dashboard = await service.build(user_id, date_from, date_to, limit, days_back)
+        computed.append(dashboard)
+        return dashboard
+
+    response = await cached_response(
+        request,
+        user_id,
+        "dashboard",
+        {
+            "date_from": date_from,
+            "date_to": date_to,
+            "limit": limit,
+            "days_back": days_back,
+        },
+        compute,
+    )
+    if computed:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{name};dur={elapsed}"
+            for name, elapsed in computed[0].timings_ms.items()
+        )
+    return response
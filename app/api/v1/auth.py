@@ -1,4 +1,15 @@
-from fastapi import APIRouter, Body, Depends, Request, Response, status, HTTPException
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    Request,
+    Response,
+    status,
+    HTTPException,
+)
 from pydantic import BaseModel
 from pydantic import ConfigDict
 from app.schemas.user import (
@@ -11,7 +22,11 @@ from app.schemas.user import (
 )
 from app.services.user import UserService, get_user_service
 from app.services.auth import AuthService, get_auth_service
-from app.services.category import CategoryService, get_category_service
+from app.services.category import (
+    CategoryService,
+    get_category_service,
+    resolve_locale,
+)
 from app.core.jwt import get_current_payload
 
 router = APIRouter()
@@ -25,21 +40,19 @@ router = APIRouter()
 )
 async def create(
     user_create: UserCreate,
+    accept_language: Optional[str] = Header(None),
     user_service: UserService = Depends(get_user_service),
-    auth_service: AuthService = Depends(get_auth_service),
     category_service: CategoryService = Depends(get_category_service),
 ):
     """
     Создание пользователя с автоматическим добавлением категорий по умолчанию.
-
+    Набор категорий выбирается по заголовку Accept-Language.
+    Пользователь и категории создаются в одной транзакции.
     """
-    if await auth_service.get_user_by_email(user_create.email):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Пользователь с таким email уже существует",
-        )
     created_new_user = await user_service.create_user(user_create)
-    await category_service.create_default_categories(created_new_user.id)
+    await category_service.create_default_categories(
+        created_new_user.id, resolve_locale(accept_language)
+    )
     return created_new_user
 
 
@@ -59,12 +72,9 @@ async def login(
     """
     Аутентификация пользователя и получение пары JWT.
     """
-
-    user = await auth_service.get_user_by_email(user_login.email)
-    if user:
-        tokens = await auth_service.login(user_login.email, user_login.password)
-        if tokens:
-            return tokens
+    tokens = await auth_service.login(user_login.email, user_login.password)
+    if tokens:
+        return tokens
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный email или пароль"
     )
@@ -119,11 +129,9 @@ async def refresh_tokens(
     """
     Принимает refresh_token и возвращает новую пару токенов.
     """
-    payload = auth_service.verify_jwt(data.refresh_token)
-    user = await auth_service.get_user_by_email(payload.get("email"))
-    if not user:
+    tokens = await auth_service.refresh(data.refresh_token)
+    if not tokens:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользователь не найден"
         )
-    tokens = await auth_service.create_tokens_pair(user)
     return tokens
@@ -1,9 +1,14 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, status, Response
+from fastapi import APIRouter, Depends, Header, status, Response
 from pydantic import BaseModel, ConfigDict
 
-from app.services.category import CategoryService, get_category_service
+from app.services.category import (
+    CategoryService,
+    get_category_service,
+    get_read_category_service,
+)
+from app.services.idempotency import IdempotencyService, get_idempotency_service
 from app.core.jwt import get_current_payload
 from app.schemas.category import CategoryCreate, CategoryResponse
 
@@ -19,14 +24,30 @@ router = APIRouter(prefix="/categories", tags=["Категории"])
 )
 async def create_category(
     data: CategoryCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Ключ идемпотентности: повтор с тем же ключом вернёт исходный ответ",
+    ),
     payload: dict = Depends(get_current_payload),
     service: CategoryService = Depends(get_category_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service),
 ):
     """
     Создает новую категорию для аутентифицированного пользователя.
+    Поддерживает заголовок Idempotency-Key.
     """
     user_id = int(payload.get("sub"))
-    return await service.create_category(user_id, data.name, data.color)
+    return await idempotency.run(
+        user_id,
+        idempotency_key,
+        "categories.create",
+        data,
+        status.HTTP_201_CREATED,
+        CategoryResponse,
+        lambda: service.create_category(user_id, data.name, data.color),
+    )
 
 
 @router.get(
@@ -37,7 +58,7 @@ async def create_category(
 )
 async def list_categories(
     payload: dict = Depends(get_current_payload),
-    service: CategoryService = Depends(get_category_service),
+    service: CategoryService = Depends(get_read_category_service),
 ):
     """
     Возвращает список всех категорий текущего пользователя.
@@ -59,6 +80,6 @@ async def delete_category(
     """
     Удаляет категорию по ID для текущего пользователя.
     """
-    # Можно сюда добавить проверку, что категория принадлежит именно этому user_id
-    await service.delete_category(category_id)
+    user_id = int(payload.get("sub"))
+    await service.delete_category(category_id, user_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
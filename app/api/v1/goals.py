@@ -3,11 +3,13 @@ from typing import List, Optional
 from decimal import Decimal
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from pydantic import BaseModel, ConfigDict
 
 from app.core.jwt import get_current_payload
-from app.services.goals import GoalsService, get_goals_service
+from app.schemas.goals import GoalProgress
+from app.services.goals import GoalsService, get_goals_service, get_read_goals_service
+from app.services.idempotency import IdempotencyService, get_idempotency_service
 
 router = APIRouter(prefix="/goals", tags=["Цели"])
 
@@ -45,11 +47,26 @@ class GoalResponse(BaseModel):
 )
 async def create_goal(
     data: GoalCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Ключ идемпотентности: повтор с тем же ключом вернёт исходный ответ",
+    ),
     payload: dict = Depends(get_current_payload),
     service: GoalsService = Depends(get_goals_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service),
 ):
     user_id = int(payload["sub"])
-    return await service.create_goal(user_id, data)
+    return await idempotency.run(
+        user_id,
+        idempotency_key,
+        "goals.create",
+        data,
+        status.HTTP_201_CREATED,
+        GoalResponse,
+        lambda: service.create_goal(user_id, data),
+    )
 
 
 @router.get(
@@ -60,12 +77,35 @@ async def create_goal(
 )
 async def list_goals(
     payload: dict = Depends(get_current_payload),
-    service: GoalsService = Depends(get_goals_service),
+    service: GoalsService = Depends(get_read_goals_service),
 ):
     user_id = int(payload["sub"])
     return await service.get_goals(user_id)
 
 
+@router.get(
+    "/progress",
+    response_model=List[GoalProgress],
+    status_code=status.HTTP_200_OK,
+    summary="Прогресс по целям пользователя",
+)
+async def list_goals_progress(
+    payload: dict = Depends(get_current_payload),
+    service: GoalsService = Depends(get_read_goals_service),
+):
+    """
+    Возвращает цели текущего пользователя с прогрессом:
+    - saved / remaining: накоплено и осталось (накопления распределяются
+      по целям в порядке срока)
+    - required_daily: сколько откладывать в день, чтобы успеть к сроку
+    - projected_date: прогнозная дата достижения при текущем темпе
+      накоплений (null, если накопления не растут)
+    - on_track: прогноз укладывается в срок
+    """
+    user_id = int(payload["sub"])
+    return await service.get_goals_progress(user_id)
+
+
 @router.get(
     "/{goal_id}",
     response_model=GoalResponse,
@@ -75,7 +115,7 @@ async def list_goals(
 async def get_goal(
     goal_id: int,
     payload: dict = Depends(get_current_payload),
-    service: GoalsService = Depends(get_goals_service),
+    service: GoalsService = Depends(get_read_goals_service),
 ):
     user_id = int(payload["sub"])
     goal = await service.get_goal(goal_id, user_id)
@@ -114,7 +154,5 @@ async def delete_goal(
     service: GoalsService = Depends(get_goals_service),
 ):
     user_id = int(payload["sub"])
-    success = await service.delete_goal(goal_id, user_id)
-    if not success:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Goal not found")
+    await service.delete_goal(goal_id, user_id)
     return
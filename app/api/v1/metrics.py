@@ -0,0 +1,38 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from app.core.metrics import metrics
+from app.core.settings import settings
+
+router = APIRouter(prefix="/metrics", tags=["Служебное"])
+
+
+def check_metrics_token(token: Optional[str]) -> None:
+    """
+    Метрики пула, кэшей и хешера — служебные данные: без настроенного
+    metrics_token эндпоинт скрыт, с ним требуется совпадающий заголовок.
+    """
+    if settings.metrics_token is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if token is None or not hmac.compare_digest(token, settings.metrics_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token"
+        )
+
+
+@router.get(
+    "",
+    status_code=status.HTTP_200_OK,
+    summary="Метрики текущего воркера",
+)
+async def get_metrics(
+    x_metrics_token: Optional[str] = Header(None, alias="X-Metrics-Token"),
+):
+    """
+    Возвращает счётчики, gauge и сводки наблюдений текущего процесса.
+    Требует заголовок X-Metrics-Token (settings.metrics_token).
+    """
+    check_metrics_token(x_metrics_token)
+    return metrics.snapshot()
@@ -1,16 +1,100 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, Response, status, Query, Body, Form
 
+import orjson
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Response,
+    UploadFile,
+    status,
+    Query,
+    Body,
+    Form,
+    Header,
+)
+from pydantic import ValidationError
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import async_session
 from app.core.jwt import get_current_payload
-from app.schemas.transaction import TransactionCreate, TransactionResponse
+from app.core.replica import read_session_factory
+from app.core.serialization import orjson_default
+from app.schemas.transaction import (
+    TransactionCreate,
+    TransactionResponse,
+    TransactionBulkResponse,
+    TransactionPage,
+    TransactionImportOptions,
+)
 from app.schemas.transaction import PaymentMethod, PaymentType
-from app.services.transaction import TransactionService, get_transaction_service
+from app.services.transaction import (
+    TransactionService,
+    get_read_transaction_service,
+    get_transaction_service,
+)
 from app.services.category import get_category_service, CategoryService
+from app.services.export import EXPORT_FORMATS, TransactionExportService, check_format
+from app.services.idempotency import IdempotencyService, get_idempotency_service
+from app.services.importer import TransactionImportService, check_csv
 
 router = APIRouter(prefix="/transactions", tags=["Транзакции"])
 
 
+async def _export_transactions(
+    export_format: str,
+    user_id: int,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+):
+    """
+    Потоковая выгрузка в собственной сессии (см. _ndjson_transactions).
+    """
+    async with read_session_factory(user_id)() as session:
+        service = TransactionExportService(session)
+        async for data in service.export(export_format, user_id, date_from, date_to):
+            yield data
+
+
+async def _import_transactions(
+    user_id: int, upload: UploadFile, options: TransactionImportOptions
+):
+    """
+    Импорт в собственной сессии; прогресс отдаётся строками NDJSON.
+    Если клиент оборвёт соединение, транзакция импорта откатится.
+    """
+    async with async_session() as session:
+        service = TransactionImportService(session)
+        async for progress in service.import_csv(user_id, upload.file, options):
+            yield orjson.dumps(
+                progress.model_dump(), option=orjson.OPT_APPEND_NEWLINE
+            )
+
+
+async def _ndjson_transactions(
+    user_id: int, date_from: Optional[datetime], date_to: Optional[datetime]
+):
+    """
+    Построчно (NDJSON) сериализует транзакции по мере чтения из курсора.
+    Открывает собственную сессию: генератор живёт дольше зависимостей запроса.
+    Читает с реплики, если она настроена (см. app/core/replica.py).
+    """
+    async with read_session_factory(user_id)() as session:
+        service = TransactionService(session)
+        async for chunk in service.stream_transactions(user_id, date_from, date_to):
+            yield b"".join(
+                orjson.dumps(
+                    TransactionResponse.model_validate(txn).model_dump(),
+                    default=orjson_default,
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+                for txn in chunk
+            )
+
+
 @router.post(
     "",
     response_model=TransactionResponse,
@@ -19,15 +103,68 @@ router = APIRouter(prefix="/transactions", tags=["Транзакции"])
 )
 async def create_transaction(
     data: TransactionCreate = Body(...),
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Ключ идемпотентности: повтор с тем же ключом вернёт исходный ответ",
+    ),
     payload: dict = Depends(get_current_payload),
     service: TransactionService = Depends(get_transaction_service),
     category_service: CategoryService = Depends(get_category_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service),
 ):
     """
     Создает новую транзакцию для текущего пользователя.
+    С заголовком Idempotency-Key повторный запрос не создаёт дубликат,
+    а возвращает ответ первого.
     """
     user_id = int(payload.get("sub"))
-    return await service.create_transaction(user_id, data)
+    return await idempotency.run(
+        user_id,
+        idempotency_key,
+        "transactions.create",
+        data,
+        status.HTTP_201_CREATED,
+        TransactionResponse,
+        lambda: service.create_transaction(user_id, data),
+    )
+
+
+@router.post(
+    "/bulk",
+    response_model=TransactionBulkResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Массовое создание транзакций",
+)
+async def create_transactions_bulk(
+    data: List[TransactionCreate] = Body(...),
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Ключ идемпотентности: повтор с тем же ключом вернёт исходный ответ",
+    ),
+    payload: dict = Depends(get_current_payload),
+    service: TransactionService = Depends(get_transaction_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service),
+):
+    """
+    Создает пакет транзакций для текущего пользователя за один запрос к БД.
+    Строки с ошибками (например, неизвестная категория) не прерывают пакет
+    и возвращаются в errors с индексом элемента во входном списке.
+    Поддерживает заголовок Idempotency-Key.
+    """
+    user_id = int(payload.get("sub"))
+    return await idempotency.run(
+        user_id,
+        idempotency_key,
+        "transactions.bulk",
+        [item.model_dump(mode="json") for item in data],
+        status.HTTP_201_CREATED,
+        TransactionBulkResponse,
+        lambda: service.create_transactions_bulk(user_id, data),
+    )
 
 
 @router.get(
@@ -43,19 +180,141 @@ async def list_transactions(
     date_to: Optional[datetime] = Query(
         None, description="Конечная дата фильтра (inclusive), формат ISO 8601"
     ),
+    stream: bool = Query(
+        False, description="Потоковая выдача в формате NDJSON (application/x-ndjson)"
+    ),
     payload: dict = Depends(get_current_payload),
-    service: TransactionService = Depends(get_transaction_service),
+    service: TransactionService = Depends(get_read_transaction_service),
 ):
     """
     Возвращает список всех транзакций текущего пользователя.
     Дополнительные параметры:
     - date_from: ISO-формат начальной даты (включительно)
     - date_to: ISO-формат конечной даты (включительно)
+    - stream: отдавать транзакции потоком NDJSON с постоянным расходом памяти
     """
     user_id = int(payload.get("sub"))
+    if stream:
+        return StreamingResponse(
+            _ndjson_transactions(user_id, date_from, date_to),
+            media_type="application/x-ndjson",
+        )
     return await service.get_transactions(user_id, date_from, date_to)
 
 
+@router.get(
+    "/page",
+    response_model=TransactionPage,
+    status_code=status.HTTP_200_OK,
+    summary="Постраничное получение транзакций",
+)
+async def list_transactions_page(
+    limit: int = Query(
+        50, ge=1, le=500, description="Количество транзакций на странице (1-500)"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы из поля next_cursor"
+    ),
+    date_from: Optional[datetime] = Query(
+        None, description="Начальная дата фильтра (inclusive), формат ISO 8601"
+    ),
+    date_to: Optional[datetime] = Query(
+        None, description="Конечная дата фильтра (inclusive), формат ISO 8601"
+    ),
+    payload: dict = Depends(get_current_payload),
+    service: TransactionService = Depends(get_read_transaction_service),
+):
+    """
+    Возвращает страницу транзакций текущего пользователя, от новых к старым.
+    Дополнительные параметры:
+    - limit: размер страницы (1-500)
+    - cursor: значение next_cursor из предыдущего ответа
+    - date_from: ISO-формат начальной даты (включительно)
+    - date_to: ISO-формат конечной даты (включительно)
+    """
+    user_id = int(payload.get("sub"))
+    return await service.get_transactions_page(
+        user_id, limit, cursor, date_from, date_to
+    )
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    summary="Экспорт истории транзакций",
+)
+async def export_transactions(
+    format: str = Query("csv", description="Формат выгрузки: csv, parquet или ndjson"),
+    date_from: Optional[datetime] = Query(
+        None, description="Начальная дата фильтра (inclusive), формат ISO 8601"
+    ),
+    date_to: Optional[datetime] = Query(
+        None, description="Конечная дата фильтра (inclusive), формат ISO 8601"
+    ),
+    payload: dict = Depends(get_current_payload),
+):
+    """
+    Выгружает транзакции текущего пользователя файлом, от новых к старым.
+    Строки читаются серверным курсором и отдаются потоком.
+    Дополнительные параметры:
+    - format: csv, parquet или ndjson
+    - date_from: ISO-формат начальной даты (включительно)
+    - date_to: ISO-формат конечной даты (включительно)
+    """
+    check_format(format)
+    user_id = int(payload.get("sub"))
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        _export_transactions(format, user_id, date_from, date_to),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{extension}"'
+        },
+    )
+
+
+@router.post(
+    "/import",
+    status_code=status.HTTP_200_OK,
+    summary="Импорт транзакций из CSV",
+)
+async def import_transactions(
+    file: UploadFile = File(..., description="CSV-файл выписки"),
+    options: str = Form(
+        "{}", description="JSON с параметрами импорта (TransactionImportOptions)"
+    ),
+    payload: dict = Depends(get_current_payload),
+):
+    """
+    Импортирует транзакции текущего пользователя из CSV-выписки.
+    Недостающие категории создаются, уже загруженные строки пропускаются
+    (дедупликация по содержимому). Ответ — поток NDJSON с прогрессом после
+    каждой пачки; последняя строка (done=true) содержит ошибки строк.
+    Файл в неверной кодировке или с ошибкой формата CSV — 400 с номером строки.
+    Параметры options:
+    - mapping: поле транзакции → заголовок колонки
+    - delimiter, encoding: формат файла
+    - timestamp_format: формат даты (strptime), по умолчанию ISO 8601
+    - decimal_comma: суммы с десятичной запятой
+    - defaults: значения для отсутствующих полей
+    - signed_amounts: тип платежа по знаку суммы
+    """
+    try:
+        import_options = TransactionImportOptions.model_validate_json(options)
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=exc.errors(include_url=False, include_context=False),
+        )
+    # файл уже принят целиком; ошибки кодировки и формата — 400 до начала потока
+    await run_in_threadpool(check_csv, file.file, import_options)
+    user_id = int(payload.get("sub"))
+    return StreamingResponse(
+        _import_transactions(user_id, file, import_options),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.get(
     "/{transaction_id}",
     response_model=TransactionResponse,
@@ -65,7 +324,7 @@ async def list_transactions(
 async def get_transaction(
     transaction_id: int,
     payload: dict = Depends(get_current_payload),
-    service: TransactionService = Depends(get_transaction_service),
+    service: TransactionService = Depends(get_read_transaction_service),
 ):
     """
     Возвращает одну транзакцию по ID для текущего пользователя.
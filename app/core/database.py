@@ -1,17 +1,239 @@
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Tuple
+from uuid import uuid4
 
+from sqlalchemy import MetaData, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import metrics
 from app.core.settings import settings
 
 DATABASE_URL = settings.database_dsn
 
-engine = create_async_engine(DATABASE_URL, echo=settings.pg_echo)
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений с метриками:
+    - db.pool.wait_ms — ожидание свободного (или создание нового) соединения;
+    - db.pool.checkout_ms — полная выдача соединения, включая pre-ping;
+    - db.pool.checked_out — число выданных соединений.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.observe(
+                "db.pool.checkout_ms", (time.perf_counter() - started) * 1000
+            )
+            metrics.set("db.pool.checked_out", self.checkedout())
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("db.pool.wait_ms", (time.perf_counter() - started) * 1000)
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        metrics.set("db.pool.checked_out", self.checkedout())
+
+
+def pool_limits() -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) пула одного воркера. При pg_max_connections
+    бюджет делится поровну между web_workers воркерами (их число выставляет
+    gunicorn.conf.py); из доли воркера одно соединение оставлено под LISTEN
+    (app/core/notify.py), остальное — пул.
+    """
+    size, overflow = settings.pg_pool_size, settings.pg_max_overflow
+    if settings.pg_max_connections is None:
+        return size, overflow
+    workers = settings.web_workers or 1
+    share = settings.pg_max_connections // workers - 1
+    if share < 1:
+        raise ValueError(
+            f"pg_max_connections={settings.pg_max_connections} is too small "
+            f"for {workers} workers"
+        )
+    size = min(size, share)
+    return size, min(overflow, share - size)
+
+
+def _engine_options(dsn: str = DATABASE_URL) -> dict:
+    """
+    Параметры create_async_engine из Settings.
+    В режиме PgBouncer (transaction pooling) именованные prepared statements
+    между транзакциями не переживают, поэтому кэши asyncpg и SQLAlchemy
+    отключаются, а имена операторов делаются уникальными.
+    """
+    connect_args = {
+        "server_settings": {
+            "application_name": settings.pg_application_name,
+            **settings.pg_server_settings,
+        },
+    }
+    statement_cache_size = settings.pg_statement_cache_size
+    if settings.pg_pgbouncer:
+        statement_cache_size = 0
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = (
+            lambda: f"__asyncpg_{uuid4()}__"
+        )
+
+    url = make_url(dsn).update_query_dict(
+        {"prepared_statement_cache_size": str(statement_cache_size)}
+    )
+    pool_size, max_overflow = pool_limits()
+    return {
+        "url": url,
+        "echo": settings.pg_echo,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.pg_pool_timeout,
+        "pool_recycle": settings.pg_pool_recycle,
+        "pool_pre_ping": settings.pg_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_async_engine(**_engine_options())
+replica_engine = (
+    create_async_engine(**_engine_options(settings.database_replica_dsn))
+    if settings.database_replica_dsn
+    else None
+)
 metadata = MetaData()
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+class RoutingSession(Session):
+    """
+    Сессия чтения: запросы идут на реплику, если она настроена и сессия
+    создана с info={"replica": True}. flush и INSERT/UPDATE/DELETE всегда
+    уходят на основной сервер.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_engine is not None
+            and self.info.get("replica")
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            return replica_engine.sync_engine
+        return engine.sync_engine
+
+
+routing_session = sessionmaker(
+    class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+)
+
+
+def _engines() -> list:
+    return [engine] + ([replica_engine] if replica_engine is not None else [])
+
+
+async def _warm_up(target: AsyncEngine, size: int) -> None:
+    async def ping() -> None:
+        async with target.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # соединения открываются одновременно, поэтому пул дорастает до size
+    await asyncio.gather(*(ping() for _ in range(size)))
+
+
+async def warm_up_pools() -> None:
+    """
+    Открывает pg_pool_warmup соединений в каждом пуле при старте воркера,
+    чтобы первые запросы не ждали подключения. Ошибка не мешает старту:
+    соединения откроются по требованию.
+    """
+    size = min(settings.pg_pool_warmup, pool_limits()[0])
+    if size <= 0:
+        return
+    for target in _engines():
+        started = time.perf_counter()
+        try:
+            await _warm_up(target, size)
+        except Exception:
+            logger.exception("database pool warm-up failed for %s", target.url.host)
+            continue
+        metrics.observe("db.pool.warmup_ms", (time.perf_counter() - started) * 1000)
+
+
+async def dispose_engines() -> None:
+    """Закрывает соединения всех пулов при остановке воркера."""
+    for target in _engines():
+        await target.dispose()
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Any]) -> None:
+    """
+    Регистрирует действие (сброс кэшей и т.п.), которое commit выполнит
+    только после успешной фиксации транзакции. callback может быть корутинной
+    функцией — тогда результат будет дождан.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+# Все уведомления транзакции — одним оператором
+NOTIFY_PENDING = text(
+    "SELECT pg_notify(channel, payload) FROM unnest("
+    "CAST(:channels AS text[]), CAST(:payloads AS text[])) AS n(channel, payload)"
+)
+
+
+def notify_on_commit(session: AsyncSession, channel: str, payload: str) -> None:
+    """
+    Ставит pg_notify в очередь транзакции: commit отправит все накопленные
+    уведомления одним запросом перед COMMIT (слушатели получат их только
+    при фиксации). Повторы схлопываются.
+    """
+    session.info.setdefault("notify", {})[(channel, payload)] = None
+
+
+async def commit(session: AsyncSession) -> None:
+    """
+    COMMIT и затем зарегистрированные after_commit действия. Используется
+    get_session и фоновыми задачами со своей сессией (импорт и т.п.).
+    """
+    pending = session.info.pop("notify", None)
+    if pending:
+        channels, payloads = zip(*pending)
+        await session.execute(
+            NOTIFY_PENDING, {"channels": list(channels), "payloads": list(payloads)}
+        )
+    await session.commit()
+    for callback in session.info.pop("after_commit", []):
+        result = callback()
+        if inspect.isawaitable(result):
+            await result
+
+
 async def get_session() -> AsyncSession:
+    """
+    Сессия на запрос (unit of work). Сервисы только отправляют изменения
+    (INSERT/UPDATE ... RETURNING, flush), а фиксирует их единственный
+    commit здесь. Если обработчик завершился исключением, commit не
+    выполняется и транзакция откатывается при закрытии сессии.
+    Подключается только как Depends(get_session, scope="function"): тогда
+    COMMIT и after_commit выполняются до отправки ответа, и ошибка COMMIT
+    доходит до клиента. Со scope по умолчанию FastAPI закрывает зависимость
+    уже после ответа; разные scope дали бы и разные сессии в одном запросе.
+    """
     async with async_session() as session:
         yield session
-        await session.commit()
+        await commit(session)
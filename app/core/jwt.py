@@ -1,19 +1,30 @@
+import hashlib
+import time
 from typing import Dict, Any
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.services.auth import AuthService, get_auth_service
+from app.core.cache import TTLCache
+from app.core.metrics import metrics
+from app.core.settings import settings
+from app.services.auth import JwtService, get_jwt_service
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
+# sha256(token) → payload уже проверенных токенов; запись живёт до exp токена
+verified_tokens = TTLCache(
+    maxsize=settings.jwt_cache_size, ttl=settings.jwt_cache_max_ttl
+)
+
 
 async def get_current_payload(
-    auth_service: AuthService = Depends(get_auth_service),
+    jwt_service: JwtService = Depends(get_jwt_service),
     creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
 ) -> Dict[str, Any]:
     """
-    Извлекает Bearer-токен из заголовка, декодирует его через AuthService.verify_jwt
-    и возвращает payload.
+    Извлекает Bearer-токен из заголовка, декодирует его через JwtService.verify_jwt
+    и возвращает payload. Повторные предъявления того же токена
+    обслуживаются из verified_tokens без повторной проверки подписи.
     """
     if not creds or creds.scheme.lower() != "bearer":
         raise HTTPException(
@@ -22,6 +33,17 @@ async def get_current_payload(
             headers={"WWW-Authenticate": "Bearer"},
         )
     token = creds.credentials
-    # вот здесь вызываем ваш метод из AuthService
-    payload = auth_service.verify_jwt(token)
+    if not settings.jwt_cache_enabled:
+        return jwt_service.verify_jwt(token)
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(key)
+    if payload is not None:
+        metrics.inc("jwt_cache.hits")
+        return payload
+
+    metrics.inc("jwt_cache.misses")
+    # сессия БД для проверки токена не нужна: JwtService — синглтон процесса
+    payload = jwt_service.verify_jwt(token)
+    verified_tokens.set(key, payload, ttl=payload["exp"] - time.time())
     return payload
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from threading import Lock
+from typing import Any, Dict
+
+
+class Metrics:
+    """
+    Простейший in-process реестр метрик: счётчики, gauge и сводки наблюдений.
+    Значения локальны для воркера и отдаются через /api/v1/metrics.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = {"count": 0, "sum": 0.0, "max": 0.0}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {
+                    name: {
+                        **summary,
+                        "avg": summary["sum"] / summary["count"],
+                    }
+                    for name, summary in self._summaries.items()
+                },
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import asyncpg
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str], None]
+
+
+class NotifyListener:
+    """
+    Фоновая задача воркера: одно соединение asyncpg, LISTEN на все
+    подписанные каналы. После потери соединения вызываются on_reset
+    подписчиков, так как уведомления за время разрыва могли быть пропущены.
+    """
+
+    reconnect_delay = 5.0
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+        self._subscriptions: Dict[str, Tuple[Handler, Optional[Callable[[], None]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Handler,
+        on_reset: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._subscriptions[channel] = (handler, on_reset)
+
+    async def start(self) -> None:
+        if self._subscriptions:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _reset(self) -> None:
+        for _, on_reset in self._subscriptions.values():
+            if on_reset is not None:
+                on_reset()
+
+    async def _run(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for channel in self._subscriptions:
+                    await connection.add_listener(channel, self._on_notify)
+                self._reset()
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("notify listener failed, reconnecting")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            self._reset()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notify(self, connection, pid, channel: str, payload: str) -> None:
+        subscription = self._subscriptions.get(channel)
+        if subscription is None:
+            return
+        try:
+            subscription[0](payload)
+        except Exception:
+            logger.warning("malformed %s notification: %r", channel, payload)
+
+
+notify_listener = NotifyListener(settings.database_dsn_not_async)
@@ -0,0 +1,96 @@
+import time
+from typing import Callable
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.database import (
+    after_commit,
+    notify_on_commit,
+    replica_engine,
+    routing_session,
+)
+from app.core.jwt import get_current_payload
+from app.core.metrics import metrics
+from app.core.notify import notify_listener
+from app.core.settings import settings
+
+NOTIFY_CHANNEL = "replica_writes"
+
+
+class ReadYourWrites:
+    """
+    Пользователи, недавно писавшие в БД: window секунд после записи их
+    чтения идут на основной сервер, чтобы не увидеть отстающую реплику.
+    Состояние воркера; остальные воркеры узнают о записи через NOTIFY.
+    """
+
+    def __init__(self, window: float, maxsize: int = 100_000) -> None:
+        self.window = window
+        self._writes = TTLCache(maxsize=maxsize, ttl=window)
+        self._all_until = 0.0
+
+    def mark(self, user_id: int) -> None:
+        self._writes.set(user_id, True)
+
+    def mark_all(self) -> None:
+        """После разрыва LISTEN записи могли быть пропущены — все на primary."""
+        self._all_until = time.monotonic() + self.window
+
+    def recent(self, user_id: int) -> bool:
+        return time.monotonic() < self._all_until or self._writes.get(user_id, False)
+
+
+read_your_writes = ReadYourWrites(settings.pg_replica_read_your_writes_seconds)
+
+
+def record_write(session: AsyncSession, user_id: int) -> None:
+    """
+    Отмечает запись пользователя: после коммита текущей транзакции его
+    чтения на время окна read-your-writes идут на основной сервер.
+    Уведомление другим воркерам commit отправляет вместе с остальными.
+    """
+    if replica_engine is None:
+        return
+    after_commit(session, lambda: read_your_writes.mark(user_id))
+    if settings.pg_replica_listen:
+        notify_on_commit(session, NOTIFY_CHANNEL, str(user_id))
+
+
+def read_session_factory(user_id: int) -> Callable[[], AsyncSession]:
+    """
+    Фабрика сессий чтения для пользователя: на реплику, если она
+    настроена и пользователь недавно не писал, иначе на основной сервер.
+    """
+    replica = replica_engine is not None and not read_your_writes.recent(user_id)
+    if replica_engine is not None:
+        metrics.inc("db.replica.reads" if replica else "db.replica.primary_fallbacks")
+    return lambda: routing_session(info={"replica": replica})
+
+
+def get_read_session_factory(
+    payload: dict = Depends(get_current_payload),
+) -> Callable[[], AsyncSession]:
+    return read_session_factory(int(payload["sub"]))
+
+
+async def get_read_session(
+    session_factory: Callable[[], AsyncSession] = Depends(get_read_session_factory),
+) -> AsyncSession:
+    """
+    Сессия для GET-эндпоинтов аналитики и списков. Только чтение:
+    транзакция не фиксируется и откатывается при закрытии.
+    """
+    async with session_factory() as session:
+        yield session
+
+
+def _on_notify(payload: str) -> None:
+    read_your_writes.mark(int(payload))
+
+
+if replica_engine is not None and settings.pg_replica_listen:
+    notify_listener.subscribe(
+        NOTIFY_CHANNEL, _on_notify, on_reset=read_your_writes.mark_all
+    )
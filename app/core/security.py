@@ -0,0 +1,96 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+import bcrypt
+from fastapi import HTTPException, status
+from werkzeug.security import check_password_hash
+
+from app.core.metrics import metrics
+from app.core.settings import settings
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельном ограниченном пуле потоков,
+    чтобы намеренно медленный bcrypt не блокировал event loop.
+    Если очередь переполнена, запрос отклоняется с 503 вместо накопления.
+    bcrypt учитывает только первые 72 байта пароля, поэтому более длинные
+    пароли не хешируются (400) и не проходят проверку.
+    """
+
+    max_password_bytes = 72
+
+    def __init__(self, workers: int, queue_limit: int, rounds: int) -> None:
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Количество задач, ожидающих свободного потока.
+        """
+        return max(self._pending - self.workers, 0)
+
+    async def hash(self, password: str) -> str:
+        if len(password.encode()) > self.max_password_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Пароль длиннее {self.max_password_bytes} байт",
+            )
+        return await self._run(self._hash_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Проверяет пароль. Возвращает (valid, new_hash): new_hash не None,
+        если хеш устарел (werkzeug или другой work factor) и его нужно сохранить.
+        """
+        return await self._run(self._verify_sync, password, hashed)
+
+    def _hash_sync(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def _verify_sync(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        secret = password.encode()
+        if len(secret) > self.max_password_bytes:
+            return False, None
+        if not hashed.startswith(("$2a$", "$2b$", "$2y$")):
+            # Хеши werkzeug от прежней схемы: проверяем и перехешируем в bcrypt
+            if not check_password_hash(hashed, password):
+                return False, None
+            return True, self._hash_sync(password)
+        if not bcrypt.checkpw(secret, hashed.encode()):
+            return False, None
+        # $2b$<rounds>$...: другой work factor — перехешировать
+        if int(hashed.split("$")[2]) != self.rounds:
+            return True, self._hash_sync(password)
+        return True, None
+
+    async def _run(self, func: Callable, *args):
+        if self._pending >= self.workers + self.queue_limit:
+            metrics.inc("password_hash.rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        metrics.set("password_hash.queue_depth", self.queue_depth)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            metrics.set("password_hash.queue_depth", self.queue_depth)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    queue_limit=settings.password_hash_queue_limit,
+    rounds=settings.password_bcrypt_rounds,
+)
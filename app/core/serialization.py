@@ -0,0 +1,12 @@
+from decimal import Decimal
+from typing import Any
+
+
+def orjson_default(obj: Any) -> Any:
+    """
+    Сериализация типов, которые orjson не поддерживает напрямую.
+    Decimal отдаётся числом, как и в ORJSONResponse.
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
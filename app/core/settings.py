@@ -1,4 +1,5 @@
 import os
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -26,15 +27,162 @@ class Settings(BaseSettings):
     pg_db: str
     pg_echo: bool = False
 
+    # Пул соединений (на каждый воркер gunicorn)
+    pg_pool_size: int = 10
+    pg_max_overflow: int = 10
+    # Бюджет соединений всех воркеров с одним сервером Postgres (не больше его
+    # max_connections за вычетом служебных). Если задан, пул воркера
+    # урезается до pg_max_connections // web_workers - 1 (LISTEN), см.
+    # database.pool_limits; иначе воркеры открывают до
+    # web_workers * (pg_pool_size + pg_max_overflow + 1) соединений.
+    pg_max_connections: Optional[int] = None
+    pg_pool_timeout: float = 30.0
+    pg_pool_recycle: int = 1800
+    pg_pool_pre_ping: bool = True
+    # Кэш prepared statements asyncpg-диалекта SQLAlchemy (0 — выключен)
+    pg_statement_cache_size: int = 500
+    pg_application_name: str = "tracker"
+    # Доп. параметры сессии Postgres, например {"jit": "off"}
+    pg_server_settings: Dict[str, str] = {}
+    # Подключение через PgBouncer в transaction mode:
+    # отключает именованные prepared statements
+    pg_pgbouncer: bool = False
+    # Реплика для чтения (аналитика, списки); не задана — всё на основном
+    # сервере. После записи пользователя его чтения ещё
+    # pg_replica_read_your_writes_seconds идут на основной сервер.
+    pg_replica_host: Optional[str] = None
+    pg_replica_port: Optional[int] = None
+    pg_replica_read_your_writes_seconds: float = 5.0
+    # Рассылка записей другим воркерам (LISTEN/NOTIFY); при одном воркере не нужна
+    pg_replica_listen: bool = True
+    # Соединений на пул, открываемых при старте воркера (0 — не прогревать)
+    pg_pool_warmup: int = 4
+
+    # gunicorn (gunicorn.conf.py). Воркеров по умолчанию — по числу доступных
+    # ядер; соединения с БД ограничивает pg_max_connections.
+    web_bind: str = "0.0.0.0:8000"
+    web_workers: Optional[int] = None
+    # Перезапуск воркера после N запросов (+ случайно до jitter), чтобы
+    # воркеры не перезапускались одновременно
+    web_max_requests: int = 10000
+    web_max_requests_jitter: int = 1000
+    web_timeout: int = 60
+    web_graceful_timeout: int = 30
+    web_keepalive: int = 5
+    # Цикл событий и HTTP-парсер uvicorn; без uvloop/httptools — asyncio/h11
+    web_loop: str = "uvloop"
+    web_http: str = "httptools"
+
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 64
+    password_bcrypt_rounds: int = 12
+
+    # /api/v1/metrics доступен только с заголовком X-Metrics-Token;
+    # без токена эндпоинт отключён (404)
+    metrics_token: Optional[str] = None
+
+    auth_user_cache_enabled: bool = True
+    auth_user_cache_ttl: int = 300
+    auth_user_cache_size: int = 10000
+    # Межворкерный сброс кэша после изменения профиля (LISTEN/NOTIFY)
+    auth_user_cache_listen: bool = True
+
+    jwt_cache_enabled: bool = True
+    jwt_cache_size: int = 50000
+    jwt_cache_max_ttl: int = 900
+
+    # Категории, создаваемые при регистрации, по локали (из Accept-Language)
+    default_locale: str = "ru"
+    default_categories: Dict[str, List[str]] = {
+        "ru": ["Еда", "Транспорт", "Развлечение", "Услуги", "Другое"],
+        "en": ["Food", "Transport", "Entertainment", "Services", "Other"],
+    }
+    # Цвета назначаются категориям по умолчанию по кругу
+    default_category_palette: List[str] = [
+        "#349DCA",
+        "#F2994A",
+        "#27AE60",
+        "#9B51E0",
+        "#EB5757",
+    ]
+
+    # Кэш резолвинга category_name → id для записи транзакций
+    category_cache_enabled: bool = True
+    category_cache_size: int = 100000
+    category_cache_ttl: int = 600
+    # Межворкерная инвалидация через LISTEN/NOTIFY (не работает через PgBouncer)
+    category_cache_listen: bool = True
+
+    transactions_bulk_limit: int = 1000
+    transactions_stream_chunk_size: int = 500
+    # Пачка строк экспорта; для parquet — размер row group
+    transactions_export_chunk_size: int = 5000
+    # Импорт CSV: строк на пачку (COPY + merge) и сколько ошибок возвращать
+    transactions_import_batch_size: int = 10000
+    transactions_import_max_errors: int = 1000
+
+    # Idempotency-Key: сколько действует ключ; просроченный захватывается
+    # заново, а строки удаляет cleanup-скрипт
+    idempotency_key_ttl_hours: int = 24
+
+    # Прогноз трат (app/services/forecast.py)
+    forecast_lookback_days: int = 84
+    forecast_smoothing_alpha: float = 0.3
+    # Регулярный платёж: траты в один и тот же день месяца N месяцев подряд,
+    # каждый раз не меньше чем в forecast_recurring_spike раз выше обычного дня
+    forecast_recurring_months: int = 3
+    forecast_recurring_tolerance: float = 0.1
+    forecast_recurring_spike: float = 2.0
+    forecast_confidence_z: float = 1.96
+    forecast_batch_size: int = 5000
+
+    # Прогресс целей: темп накоплений — среднее за последние N дней
+    goals_progress_window_days: int = 90
+    goals_progress_batch_size: int = 5000
+
+    # /analytics/dashboard: метрики по очереди в одном соединении;
+    # parallel — каждая в своём соединении (4 соединения на запрос)
+    analytics_dashboard_parallel: bool = False
+    # Метрики на одном снимке (REPEATABLE READ, при parallel —
+    # pg_export_snapshot); False — независимые READ COMMITTED
+    analytics_dashboard_shared_snapshot: bool = True
+
+    # Кэш ответов аналитики (app/services/analytics_cache.py)
+    analytics_cache_enabled: bool = True
+    # "local" — LRU в воркере, "memory" — заглушка общего хранилища,
+    # "package.module:factory" — своя реализация SharedCacheBackend
+    analytics_cache_backend: str = "local"
+    analytics_cache_size: int = 10000
+    analytics_cache_ttl: int = 300
+    # Межворкерная инвалидация локального кэша через LISTEN/NOTIFY
+    analytics_cache_listen: bool = True
+
+    # Помесячные секции transactions (app/services/partitions.py):
+    # воркер создаёт секции на N месяцев вперёд при старте и раз в interval
+    transactions_partition_maintenance: bool = True
+    transactions_partition_months_ahead: int = 3
+    transactions_partition_interval_hours: int = 12
+    transactions_partition_backfill_batch_size: int = 10000
+    # Retention: секции старше N месяцев отсоединяются командой
+    # partition_transactions detach (None — хранить всё). Метрики по rollup
+    # учитывают отсоединённые месяцы; total_sum, списки и экспорт — нет
+    transactions_retention_months: Optional[int] = None
+    transactions_archive_schema: str = "archive"
+
     @property
     def database_dsn(self):
         return f"postgresql+asyncpg://{self.pg_user}:{self.pg_password}@{self.pg_host}:{self.pg_port}/{self.pg_db}"
     
+    @property
+    def database_replica_dsn(self) -> Optional[str]:
+        if not self.pg_replica_host:
+            return None
+        port = self.pg_replica_port or self.pg_port
+        return f"postgresql+asyncpg://{self.pg_user}:{self.pg_password}@{self.pg_replica_host}:{port}/{self.pg_db}"
+
     @property
     def database_dsn_not_async(self):
         return f"postgresql://{self.pg_user}:{self.pg_password}@{self.pg_host}:{self.pg_port}/{self.pg_db}"
 
 
 settings = Settings()
-
-default_categories = ["Еда", "Транспорт", "Развлечение", "Услуги", "Другое"]
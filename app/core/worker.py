@@ -0,0 +1,29 @@
+import importlib.util
+import logging
+
+from uvicorn_worker import UvicornWorker as BaseUvicornWorker
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _select(preferred: str, module: str, fallback: str) -> str:
+    """preferred, если это не module или module установлен; иначе fallback."""
+    if preferred == module and importlib.util.find_spec(module) is None:
+        logger.warning("%s is not installed, falling back to %s", module, fallback)
+        return fallback
+    return preferred
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Воркер gunicorn для приложения: uvloop и httptools (web_loop/web_http),
+    lifespan обязателен — ошибка старта приложения останавливает воркер.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": _select(settings.web_loop, "uvloop", "asyncio"),
+        "http": _select(settings.web_http, "httptools", "h11"),
+        "lifespan": "on",
+    }
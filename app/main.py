@@ -1,10 +1,26 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 
-from app.api.v1 import auth, category, transaction, analytics, goals
+from app.api.v1 import auth, category, transaction, analytics, goals, metrics
+from app.core.database import dispose_engines, warm_up_pools
 from app.core.settings import settings
+from app.core.notify import notify_listener
+from app.services.partitions import partition_maintenance
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up_pools()
+    await notify_listener.start()
+    await partition_maintenance.start()
+    yield
+    await partition_maintenance.stop()
+    await notify_listener.stop()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -12,6 +28,7 @@ app = FastAPI(
     docs_url="/api/openapi",
     openapi_url="/api/openapi.json",
     default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -29,4 +46,5 @@ app.include_router(auth.router, prefix="/api/v1/auth")
 app.include_router(category.router, prefix="/api/v1/category")
 app.include_router(transaction.router, prefix="/api/v1/transaction")
 app.include_router(analytics.router, prefix="/api/v1")
-app.include_router(goals.router, prefix="/api/v1/goals")
\ No newline at end of file
+app.include_router(goals.router, prefix="/api/v1/goals")
+app.include_router(metrics.router, prefix="/api/v1")
\ No newline at end of file
@@ -1,9 +1,21 @@
 from datetime import datetime
 from app.models.base import ModelBase
 from pydantic import EmailStr
-from sqlalchemy import Column, ForeignKey, String, Integer, Numeric, DateTime
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    String,
+    Integer,
+    Numeric,
+    DateTime,
+    Date,
+    Index,
+    UniqueConstraint,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from werkzeug.security import check_password_hash, generate_password_hash
 
 
 class User(ModelBase):
@@ -23,15 +35,14 @@ class User(ModelBase):
     goals = relationship("Goals", back_populates="user", cascade="all, delete")
 
     def __init__(
-        self, email: EmailStr, password: str, username: str, full_name: str
+        self, email: EmailStr, hashed_password: str, username: str, full_name: str
     ) -> None:
+        # Хеш вычисляется заранее через app.core.security.password_hasher,
+        # чтобы не блокировать event loop внутри конструктора модели
         self.email = email
         self.username = username
         self.full_name = full_name
-        self.hashed_password = generate_password_hash(password)
-
-    def check_password(self, password: str) -> bool:
-        return check_password_hash(self.hashed_password, password)
+        self.hashed_password = hashed_password
 
     def __repr__(self) -> str:
         return f"<User {self.email}>"
@@ -40,6 +51,9 @@ class User(ModelBase):
 # ------------------- Category Model -------------------
 class Category(ModelBase):
     __tablename__ = "categories"
+    __table_args__ = (
+        Index("uq_categories_user_id_name", "user_id", "name", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(
@@ -60,6 +74,10 @@ class Category(ModelBase):
 
 
 # ------------------- Transaction Model -------------------
+# После миграций a3d5f7b9c1e2/f2b4d6e8a0c1 таблица секционирована по месяцам
+# timestamp, а первичный ключ в БД — (id, timestamp). Для ORM достаточно id:
+# он уникален (последовательность), а запросы с фильтром по timestamp
+# затрагивают только нужные секции.
 class Transaction(ModelBase):
     __tablename__ = "transactions"
 
@@ -77,6 +95,9 @@ class Transaction(ModelBase):
     timestamp = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     payment_method = Column(String(255), nullable=False)
     payment_type = Column(String(255), nullable=False)
+    # md5 содержимого для дедупликации импорта; заполняется триггером
+    # (функция transaction_content_hash, миграция e4a7b2c9d1f6)
+    content_hash = Column(String(32), nullable=True)
 
     # Relationships
     user = relationship("User", back_populates="transactions")
@@ -91,8 +112,22 @@ class Transaction(ModelBase):
         )
 
 
+Index(
+    "ix_transactions_user_id_timestamp_id",
+    Transaction.user_id,
+    Transaction.timestamp.desc(),
+    Transaction.id,
+)
+Index(
+    "ix_transactions_user_id_content_hash",
+    Transaction.user_id,
+    Transaction.content_hash,
+)
+
+
 class Goals(ModelBase):
     __tablename__ = "goals"
+    __table_args__ = (Index("ix_goals_user_id", "user_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(
@@ -103,7 +138,121 @@ class Goals(ModelBase):
     amount = Column(Numeric(12, 2), nullable=False)
     date_goals = Column(DateTime, nullable=False)
 
-    user = relationship("User", back_populates="achieves")
+    user = relationship("User", back_populates="goals")
 
     def __repr__(self) -> str:
         return f"<Achieve {self.name} (User {self.user_id})>"
+
+
+# ------------------- Daily rollup -------------------
+class DailyUserCategoryTotal(ModelBase):
+    """
+    Предагрегированные суммы транзакций по пользователю, дню (UTC),
+    категории и типу платежа. Поддерживается инкрементально
+    в той же транзакции, что и запись в transactions.
+    """
+
+    __tablename__ = "daily_user_category_totals"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "day",
+            "category_id",
+            "payment_type",
+            name="uq_daily_user_category_totals",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    day = Column(Date, nullable=False)
+    category_id = Column(
+        Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=True
+    )
+    payment_type = Column(String(255), nullable=False)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<DailyUserCategoryTotal User {self.user_id} Day {self.day} "
+            f"Category {self.category_id} {self.payment_type} {self.total_amount}>"
+        )
+
+
+# ------------------- Category running totals -------------------
+class UserCategoryTotal(ModelBase):
+    """
+    Накопительные суммы расходов пользователя по категории за всё время.
+    Обслуживает топ категорий без агрегации по transactions.
+    """
+
+    __tablename__ = "user_category_totals"
+    __table_args__ = (
+        Index(
+            "ix_user_category_totals_user_id_total",
+            "user_id",
+            text("total_amount DESC"),
+        ),
+    )
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    category_id = Column(
+        Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+
+class MonthlyUserCategoryTotal(ModelBase):
+    """
+    Суммы расходов пользователя по категории за календарный месяц (UTC).
+    """
+
+    __tablename__ = "monthly_user_category_totals"
+    __table_args__ = (
+        Index(
+            "ix_monthly_user_category_totals_user_id_month_total",
+            "user_id",
+            "month",
+            text("total_amount DESC"),
+        ),
+    )
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    month = Column(Date, primary_key=True)
+    category_id = Column(
+        Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(ModelBase):
+    """
+    Ответы create-эндпоинтов по Idempotency-Key: повтор запроса с тем же
+    ключом получает сохранённый ответ без повторной записи.
+    Старые ключи удаляет app.scripts.cleanup_idempotency_keys.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_created_at", "created_at"),)
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(64), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSONB, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
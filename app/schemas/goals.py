@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
 
@@ -28,3 +28,12 @@ class GoalResponse(BaseModel):
     date_goals: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class GoalProgress(GoalResponse):
+    saved: Decimal
+    remaining: Decimal
+    days_left: int
+    required_daily: Decimal
+    projected_date: Optional[date]
+    on_track: bool
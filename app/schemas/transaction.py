@@ -1,6 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, ConfigDict
 from enum import Enum
 from fastapi import Form
@@ -43,6 +43,79 @@ class TransactionResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TransactionPage(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
+
+class TransactionBulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class TransactionBulkResponse(BaseModel):
+    created: List[TransactionResponse]
+    errors: List[TransactionBulkError]
+
+
+class TransactionImportOptions(BaseModel):
+    # поле TransactionCreate → заголовок колонки в файле
+    mapping: Dict[str, str] = {}
+    delimiter: str = ","
+    encoding: str = "utf-8"
+    # формат strptime для timestamp; по умолчанию ISO 8601
+    timestamp_format: Optional[str] = None
+    # десятичная запятая в суммах (1 234,56)
+    decimal_comma: bool = False
+    # значения полей, которых нет в файле или которые пусты
+    defaults: Dict[str, Any] = {"quantity": 1}
+    # знак суммы задаёт тип: отрицательная — расход, положительная — доход
+    signed_amounts: bool = False
+
+
+class TransactionImportProgress(BaseModel):
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    categories_created: int = 0
+    done: bool = False
+    errors: List[TransactionBulkError] = []
+
+
+class TotalsBreakdownItem(BaseModel):
+    payment_type: str
+    payment_method: Optional[str] = None
+    total: float
+    count: int
+
+
+class TotalsResponse(BaseModel):
+    total_spent: float
+    total_income: float
+    breakdown: List[TotalsBreakdownItem]
+
+
+class ForecastResponse(BaseModel):
+    spent_to_date: float
+    remaining: float
+    remaining_lower: float
+    remaining_upper: float
+    recurring: float
+    month_total: float
+
+
+class DashboardResponse(BaseModel):
+    # totals и top_categories — за окно date_from/date_to; forecast — до конца
+    # текущего месяца по истории от date_from; daily_spending — за days_back
+    # дней по сегодня независимо от окна
+    totals: TotalsResponse
+    top_categories: List[Dict[str, Any]]
+    daily_spending: List[Dict[str, Any]]
+    forecast: ForecastResponse
+    timings_ms: Dict[str, float]
+
+
 class AnalyticsResponse(BaseModel):
     total_spent: Decimal
 
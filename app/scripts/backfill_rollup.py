@@ -0,0 +1,31 @@
+"""
+Пересчёт таблицы daily_user_category_totals из transactions.
+
+    python -m app.scripts.backfill_rollup [--user-id ID]
+"""
+import argparse
+import asyncio
+from typing import Optional
+
+from app.core.database import async_session, engine
+from app.services.rollup import DailyRollupService
+
+
+async def backfill(user_id: Optional[int] = None) -> None:
+    async with async_session() as session:
+        await DailyRollupService(session).backfill(user_id)
+        await session.commit()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--user-id", type=int, default=None, help="Пересчитать только одного пользователя"
+    )
+    args = parser.parse_args()
+    asyncio.run(backfill(args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Удаление устаревших Idempotency-Key (старше idempotency_key_ttl_hours).
+Удаляет пачками, каждая пачка — отдельная транзакция. Запускать по cron.
+
+    python -m app.scripts.cleanup_idempotency_keys [--batch-size 10000]
+"""
+import argparse
+import asyncio
+
+from app.core.database import async_session, engine
+from app.services.idempotency import IdempotencyService
+
+
+async def cleanup(batch_size: int) -> int:
+    deleted = 0
+    async with async_session() as session:
+        service = IdempotencyService(session)
+        while True:
+            removed = await service.cleanup(batch_size)
+            await session.commit()
+            deleted += removed
+            if removed < batch_size:
+                break
+    await engine.dispose()
+    return deleted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+    print(f"deleted {asyncio.run(cleanup(args.batch_size))} idempotency keys")
+
+
+if __name__ == "__main__":
+    main()
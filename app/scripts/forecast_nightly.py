@@ -0,0 +1,75 @@
+"""
+Ночной пакетный прогноз трат до конца месяца для всех пользователей.
+Пользователи обрабатываются пачками по forecast_batch_size: на пачку —
+один запрос к дневному rollup и один проход NumPy. Результат пишется
+в NDJSON ({"user_id": ..., "remaining": ..., ...} на строку).
+
+    python -m app.scripts.forecast_nightly [--output forecasts.ndjson] [--batch-size N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, datetime, timezone
+from typing import Optional, TextIO
+
+import orjson
+from sqlalchemy import select
+
+from app.core.database import async_session, engine
+from app.core.settings import settings
+from app.models.user import User
+from app.services.forecast import forecast_all
+
+
+async def run(output: TextIO, batch_size: int, today: Optional[date] = None) -> int:
+    today = today or datetime.now(tz=timezone.utc).date()
+    processed = 0
+    last_id = 0
+    async with async_session() as session:
+        while True:
+            user_ids = (
+                await session.scalars(
+                    select(User.id)
+                    .where(User.id > last_id)
+                    .order_by(User.id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not user_ids:
+                break
+            forecasts = await forecast_all(session, user_ids, today)
+            for user_id, forecast in forecasts.items():
+                output.write(
+                    orjson.dumps({"user_id": user_id, **forecast.model_dump()}).decode()
+                    + "\n"
+                )
+            processed += len(user_ids)
+            last_id = user_ids[-1]
+    await engine.dispose()
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=None, help="Файл NDJSON (по умолчанию stdout)")
+    parser.add_argument("--batch-size", type=int, default=settings.forecast_batch_size)
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        processed = asyncio.run(run(output, args.batch_size))
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"forecasted {processed} users in {elapsed:.1f}s "
+        f"({processed / elapsed if elapsed else 0:,.0f} users/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Ночной расчёт прогресса целей для всех пользователей (например, для
+уведомлений «цель под угрозой»). Пользователи обрабатываются пачками по
+goals_progress_batch_size: на пачку — один запрос в своей короткой
+транзакции чтения (на реплике, если она настроена), чтобы не держать снимок
+всю ночь и не мешать vacuum. Результат пишется в NDJSON (одна цель на строку).
+
+    python -m app.scripts.goals_nightly [--output goals.ndjson] [--batch-size N] [--off-track]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, datetime, timezone
+from typing import Optional, TextIO
+
+import orjson
+from sqlalchemy import select
+
+from app.core.database import dispose_engines, routing_session
+from app.core.serialization import orjson_default
+from app.core.settings import settings
+from app.models.user import Goals
+from app.services.goals import GoalsService
+
+
+async def run(
+    output: TextIO, batch_size: int, off_track: bool, today: Optional[date] = None
+) -> int:
+    today = today or datetime.now(tz=timezone.utc).date()
+    processed = 0
+    last_id = 0
+    while True:
+        async with routing_session(info={"replica": True}) as session:
+            user_ids = (
+                await session.scalars(
+                    select(Goals.user_id)
+                    .distinct()
+                    .where(Goals.user_id > last_id)
+                    .order_by(Goals.user_id)
+                    .limit(batch_size)
+                )
+            ).all()
+            if not user_ids:
+                break
+            progress = await GoalsService(session).get_goals_progress_batch(
+                user_ids, today
+            )
+        for goals in progress.values():
+            for goal in goals:
+                if off_track and goal.on_track:
+                    continue
+                output.write(
+                    orjson.dumps(goal.model_dump(), default=orjson_default).decode()
+                    + "\n"
+                )
+        processed += len(user_ids)
+        last_id = user_ids[-1]
+    await dispose_engines()
+    return processed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=None, help="Файл NDJSON (по умолчанию stdout)")
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.goals_progress_batch_size
+    )
+    parser.add_argument(
+        "--off-track", action="store_true", help="Только цели, не укладывающиеся в срок"
+    )
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        processed = asyncio.run(run(output, args.batch_size, args.off_track))
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - started
+    print(f"processed goals of {processed} users in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Импорт CSV-выписки в транзакции пользователя (тот же конвейер, что
+POST /api/v1/transactions/import). Прогресс печатается в stderr,
+итоговый отчёт — JSON в stdout.
+
+    python -m app.scripts.import_transactions --user-id ID --file statement.csv \
+        [--options '{"delimiter": ";", "mapping": {"item": "Описание"}}'] [--batch-size N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Optional
+
+from app.core.database import async_session, engine
+from app.schemas.transaction import TransactionImportOptions, TransactionImportProgress
+from app.services.importer import TransactionImportService
+
+
+async def run(
+    user_id: int,
+    path: str,
+    options: TransactionImportOptions,
+    batch_size: Optional[int] = None,
+) -> TransactionImportProgress:
+    started = time.perf_counter()
+    progress = TransactionImportProgress()
+    with open(path, encoding=options.encoding, newline="") as lines:
+        async with async_session() as session:
+            service = TransactionImportService(session)
+            async for progress in service.import_csv(
+                user_id, lines, options, batch_size
+            ):
+                elapsed = time.perf_counter() - started
+                print(
+                    f"rows={progress.rows} imported={progress.imported} "
+                    f"duplicates={progress.duplicates} invalid={progress.invalid} "
+                    f"({progress.rows / elapsed if elapsed else 0:,.0f} rows/s)",
+                    file=sys.stderr,
+                )
+    await engine.dispose()
+    return progress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--file", required=True)
+    parser.add_argument(
+        "--options", default="{}", help="JSON с параметрами TransactionImportOptions"
+    )
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    options = TransactionImportOptions.model_validate_json(args.options)
+    report = asyncio.run(run(args.user_id, args.file, options, args.batch_size))
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
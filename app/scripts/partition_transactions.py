@@ -0,0 +1,143 @@
+"""
+Обслуживание помесячных секций transactions.
+
+    python -m app.scripts.partition_transactions status
+    python -m app.scripts.partition_transactions ensure [--months-ahead N]
+    python -m app.scripts.partition_transactions migrate [--batch-size N] [--pause S]
+    python -m app.scripts.partition_transactions detach [--keep-months N] [--drop]
+    python -m app.scripts.partition_transactions drop-legacy
+
+Переход на секционированную таблицу:
+    alembic upgrade a3d5f7b9c1e2      # пустая копия + зеркалирующий триггер
+    ... migrate                       # онлайн-перенос существующих строк
+    alembic upgrade head              # переключение таблиц (f2b4d6e8a0c1)
+    ... drop-legacy                   # когда откат больше не нужен
+
+detach отсоединяет секции старше --keep-months (по умолчанию
+transactions_retention_months) и переносит их в схему
+transactions_archive_schema, с --drop — удаляет. Запускать по cron.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.core.database import async_session, engine
+from app.core.settings import settings
+from app.services.partitions import SHADOW_TABLE, TransactionPartitionService
+
+
+async def status() -> None:
+    async with async_session() as session:
+        service = TransactionPartitionService(session)
+        parent = await service.parent()
+        if parent is None:
+            print("transactions is not partitioned (migration a3d5f7b9c1e2 not applied)")
+            return
+        print(f"partitioned table: {parent}")
+        for partition in await service.list_partitions():
+            print(f"  {partition.name}  {partition.month:%Y-%m}  ~{partition.rows} rows")
+
+
+async def ensure(months_ahead: int) -> None:
+    async with async_session() as session:
+        created = await TransactionPartitionService(session).ensure_partitions(
+            months_ahead
+        )
+        await session.commit()
+    print(f"created {len(created)} partitions: {', '.join(created) or '-'}")
+
+
+async def migrate(batch_size: int, pause: float) -> None:
+    started = time.perf_counter()
+    copied_total = 0
+    async with async_session() as session:
+        service = TransactionPartitionService(session)
+        if await service.parent() != SHADOW_TABLE:
+            sys.exit(f"{SHADOW_TABLE} not found: run `alembic upgrade a3d5f7b9c1e2` first")
+        while True:
+            copied, last_id, target_id = await service.backfill_batch(batch_size)
+            await session.commit()
+            copied_total += copied
+            elapsed = time.perf_counter() - started
+            print(
+                f"copied={copied_total} last_id={last_id}/{target_id} "
+                f"({copied_total / elapsed if elapsed else 0:,.0f} rows/s)",
+                file=sys.stderr,
+            )
+            if last_id >= target_id:
+                break
+            if pause:
+                await asyncio.sleep(pause)
+    print("backfill complete, run `alembic upgrade head` to switch tables")
+
+
+async def detach(keep_months: int, drop: bool) -> None:
+    async with async_session() as session:
+        service = TransactionPartitionService(session)
+        for partition in await service.expired_partitions(keep_months):
+            await service.detach(partition.name, drop)
+            await session.commit()
+            print(f"{'dropped' if drop else 'archived'} {partition.name}")
+
+
+async def drop_legacy() -> None:
+    async with async_session() as session:
+        dropped = await TransactionPartitionService(session).drop_legacy()
+        await session.commit()
+    print("dropped transactions_legacy" if dropped else "transactions_legacy not found")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status")
+    ensure_parser = commands.add_parser("ensure")
+    ensure_parser.add_argument(
+        "--months-ahead", type=int, default=settings.transactions_partition_months_ahead
+    )
+    migrate_parser = commands.add_parser("migrate")
+    migrate_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.transactions_partition_backfill_batch_size,
+    )
+    migrate_parser.add_argument(
+        "--pause", type=float, default=0.0, help="Пауза между пачками, секунды"
+    )
+    detach_parser = commands.add_parser("detach")
+    detach_parser.add_argument(
+        "--keep-months", type=int, default=settings.transactions_retention_months
+    )
+    detach_parser.add_argument(
+        "--drop", action="store_true", help="Удалять секции вместо архивации"
+    )
+    commands.add_parser("drop-legacy")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        coro = status()
+    elif args.command == "ensure":
+        coro = ensure(args.months_ahead)
+    elif args.command == "migrate":
+        coro = migrate(args.batch_size, args.pause)
+    elif args.command == "detach":
+        if args.keep_months is None:
+            parser.error("--keep-months is required when transactions_retention_months is unset")
+        coro = detach(args.keep_months, args.drop)
+    else:
+        coro = drop_legacy()
+
+    async def run() -> None:
+        try:
+            await coro
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
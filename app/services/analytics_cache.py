@@ -0,0 +1,276 @@
+import hashlib
+import importlib
+import itertools
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.database import after_commit, notify_on_commit
+from app.core.metrics import metrics
+from app.core.notify import notify_listener
+from app.core.serialization import orjson_default
+from app.core.settings import settings
+
+NOTIFY_CHANNEL = "analytics_cache"
+
+
+class CacheBackend(ABC):
+    """
+    Хранилище ответов аналитики и версий пользователей.
+    Запись кэша адресуется версией пользователя: после записи транзакции
+    версия меняется, и старые записи просто перестают находиться.
+    """
+
+    # версии общие для всех воркеров — межворкерная рассылка не нужна
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def get_version(self, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_version(self, user_id: int) -> None:
+        ...
+
+    def reset(self) -> None:
+        """Сброс после потери уведомлений (см. NotifyListener)."""
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-process LRU. Версии — значения глобального счётчика процесса: версия,
+    потерянная при вытеснении, заменяется новой, а не начинается заново,
+    поэтому вытесненная версия не может совпасть со старыми записями.
+    Другие воркеры узнают о записях через NOTIFY analytics_cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counter = itertools.count(1)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries.set(key, value, ttl)
+
+    async def get_version(self, user_id: int) -> int:
+        version = self._versions.get(user_id)
+        if version is None:
+            version = next(self._counter)
+            self._versions.set(user_id, version)
+        return version
+
+    async def bump_version(self, user_id: int) -> None:
+        self.bump(user_id)
+
+    def bump(self, user_id: int) -> None:
+        self._versions.set(user_id, next(self._counter))
+
+    def reset(self) -> None:
+        self._versions.clear()
+
+
+class SharedCacheBackend(CacheBackend, ABC):
+    """
+    Интерфейс общего для воркеров хранилища (например, Redis: GET,
+    SET ... EX, INCR). Подключается через
+    analytics_cache_backend = "package.module:factory".
+    """
+
+    shared = True
+
+
+class MemorySharedBackend(SharedCacheBackend):
+    """
+    Локальная замена общего хранилища для тестов и разработки:
+    семантика как у внешнего key-value (байты, TTL, атомарный INCR).
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[bytes, float]] = {}
+        self._versions: Dict[int, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+
+    async def get_version(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    async def bump_version(self, user_id: int) -> None:
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+
+def create_backend(name: str) -> CacheBackend:
+    if name == "local":
+        return LocalCacheBackend(
+            maxsize=settings.analytics_cache_size, ttl=settings.analytics_cache_ttl
+        )
+    if name == "memory":
+        return MemorySharedBackend()
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return value
+
+
+class AnalyticsCache:
+    """
+    Кэш ответов аналитики по (user_id, версия пользователя, endpoint,
+    нормализованные параметры). В ключ входит текущий день UTC:
+    прогноз и «последние N дней» зависят от даты.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def params_digest(params: Mapping[str, Any]) -> str:
+        normalized = {
+            name: _normalize(value)
+            for name, value in params.items()
+            if value is not None
+        }
+        normalized["day"] = datetime.now(tz=timezone.utc).date().isoformat()
+        return hashlib.sha1(
+            orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
+
+    async def fetch(
+        self,
+        user_id: int,
+        endpoint: str,
+        params: Mapping[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Tuple[bytes, str]:
+        """
+        Тело ответа (JSON) и его ETag: из кэша или посчитанные compute().
+        Версия читается до расчёта: если во время расчёта пришла запись,
+        результат сохранится под старой версией и не будет прочитан.
+        """
+        version = await self.backend.get_version(user_id)
+        key = f"analytics:{user_id}:{version}:{endpoint}:{self.params_digest(params)}"
+        entry = await self.backend.get(key)
+        if entry is not None:
+            metrics.inc("analytics_cache.hits")
+            etag, body = entry.split(b" ", 1)
+            return body, etag.decode()
+
+        metrics.inc("analytics_cache.misses")
+        body, etag = encode(await compute())
+        await self.backend.set(key, etag.encode() + b" " + body, self.ttl)
+        return body, etag
+
+
+def encode(value: Any) -> Tuple[bytes, str]:
+    body = orjson.dumps(_jsonable(value), default=orjson_default)
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+analytics_cache = AnalyticsCache(
+    create_backend(settings.analytics_cache_backend), ttl=settings.analytics_cache_ttl
+)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {
+        candidate.strip().removeprefix("W/") for candidate in header.split(",")
+    }
+    return "*" in candidates or etag in candidates
+
+
+async def cached_response(
+    request: Request,
+    user_id: int,
+    endpoint: str,
+    params: Mapping[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+) -> Response:
+    """
+    JSON-ответ аналитики с ETag; при совпадении If-None-Match — 304 без тела.
+    """
+    if settings.analytics_cache_enabled:
+        body, etag = await analytics_cache.fetch(user_id, endpoint, params, compute)
+    else:
+        body, etag = encode(await compute())
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        metrics.inc("analytics_cache.not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def invalidate_analytics(session: AsyncSession, user_id: int) -> None:
+    """
+    Меняет версию пользователя после коммита текущей транзакции. Для
+    локального бэкенда остальные воркеры узнают об этом через NOTIFY,
+    который commit отправляет вместе с остальными уведомлениями транзакции.
+    """
+    if not settings.analytics_cache_enabled:
+        return
+    backend = analytics_cache.backend
+    after_commit(session, lambda: backend.bump_version(user_id))
+    if not backend.shared and settings.analytics_cache_listen:
+        notify_on_commit(session, NOTIFY_CHANNEL, str(user_id))
+
+
+def _on_notify(payload: str) -> None:
+    analytics_cache.backend.bump(int(payload))
+
+
+if (
+    settings.analytics_cache_enabled
+    and settings.analytics_cache_listen
+    and isinstance(analytics_cache.backend, LocalCacheBackend)
+):
+    notify_listener.subscribe(
+        NOTIFY_CHANNEL, _on_notify, on_reset=analytics_cache.backend.reset
+    )
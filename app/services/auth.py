@@ -1,54 +1,181 @@
+import hashlib
 import jwt
 from jwt import decode, ExpiredSignatureError, InvalidTokenError
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple, Union
 from functools import lru_cache
 
-from passlib.context import CryptContext
-from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.exceptions import HTTPException
 from fastapi import Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
+from app.core.database import after_commit, get_session, notify_on_commit
+from app.core.notify import notify_listener
 from app.core.settings import settings
-from app.core.database import get_session
-from app.services.database import BaseDb, PostgresqlEngine
+from app.core.security import PasswordHasher, password_hasher
+from app.services.database import BaseDb, get_base_db
 from app.models.user import User
 from app.schemas.user import TwoTokens
 
+NOTIFY_CHANNEL = "user_identity"
 
-class AuthService:
-    def __init__(self, base_db: BaseDb):
-        self.base_db = base_db
-        self.pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-        self.secret_key = settings.authjwt_secret_key
-        self.algorithm = settings.authjwt_algorithm
+class UserIdentity(NamedTuple):
+    id: int
+    email: str
+    username: Optional[str]
+    password_hash_version: str
 
-        # параметры жизни токенов можно вынести в Settings
-        self.access_expires = timedelta(minutes=15)
-        self.refresh_expires = timedelta(days=7)
+    @classmethod
+    def from_user(cls, user: User) -> "UserIdentity":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            password_hash_version=password_hash_version(user.hashed_password),
+        )
+
+
+def password_hash_version(hashed_password: str) -> str:
+    """
+    Короткий отпечаток хеша пароля. Кладётся в токены как claim pwv:
+    после смены пароля (или rehash) старые refresh-токены перестают приниматься.
+    """
+    return hashlib.sha256(hashed_password.encode()).hexdigest()[:16]
+
+
+# id → UserIdentity: позволяет /auth/refresh обходиться без запроса к БД.
+# Кэш локален для воркера; изменения пользователя рассылаются через
+# NOTIFY user_identity, без LISTEN устаревание ограничено auth_user_cache_ttl.
+user_identity_cache = TTLCache(
+    maxsize=settings.auth_user_cache_size, ttl=settings.auth_user_cache_ttl
+)
+
+
+def remember_identity(identity: UserIdentity) -> None:
+    if settings.auth_user_cache_enabled:
+        user_identity_cache.set(identity.id, identity)
+
+
+def forget_identity(user_id: int) -> None:
+    user_identity_cache.pop(user_id)
+
+
+def forget_identity_on_commit(session: AsyncSession, user_id: int) -> None:
+    """
+    Сбрасывает пользователя из кэша после коммита текущей транзакции:
+    до коммита параллельный refresh перечитал бы и закэшировал старую строку.
+    Остальные воркеры получают NOTIFY, отправляемый вместе с COMMIT.
+    """
+    after_commit(session, lambda: forget_identity(user_id))
+    if settings.auth_user_cache_listen:
+        notify_on_commit(session, NOTIFY_CHANNEL, str(user_id))
+
+
+class AuthService:
+    """
+    Лёгкий per-request сервис: репозиторий пользователей поверх сессии запроса
+    плюс ссылки на процессные синглтоны (JwtService, password_hasher).
+    Создание не аллоцирует тяжёлых объектов.
+    """
 
-    # ——— Работа с паролями ———
-    def verify_password(self, plain: str, hashed: str) -> bool:
-        return self.pwd_ctx.verify(plain, hashed)
+    def __init__(
+        self,
+        base_db: BaseDb,
+        jwt_service: Optional["JwtService"] = None,
+        hasher: PasswordHasher = password_hasher,
+        db_session: Optional[AsyncSession] = None,
+    ):
+        self.base_db = base_db
+        self.db = db_session
+        self.jwt = jwt_service or get_jwt_service()
+        self.hasher = hasher
+
+    # ——— Работа с паролями (в пуле потоков password_hasher) ———
+    async def verify_password(
+        self, plain: str, hashed: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self.hasher.verify(plain, hashed)
 
-    def hash_password(self, password: str) -> str:
-        return self.pwd_ctx.hash(password)
+    async def hash_password(self, password: str) -> str:
+        return await self.hasher.hash(password)
 
     # ——— Получение пользователя ———
     async def get_user_by_email(self, email: str) -> Optional[User]:
         user = await self.base_db.get_by_key("email", email, User)
         return user
 
-    async def login(self, email, hashed_password) -> Optional[TwoTokens]:
+    async def login(self, email, password) -> Optional[TwoTokens]:
+        """
+        Проверяет пароль и выдаёт пару токенов. Ровно один запрос пользователя.
+        """
         user = await self.get_user_by_email(email)
-        print(f"User found: {user}")
         if user:
-            if user.check_password(hashed_password):
-                return await self.create_tokens_pair(user)
+            valid, new_hash = await self.verify_password(
+                password, user.hashed_password
+            )
+            if valid:
+                if new_hash:
+                    # прозрачный rehash: сохранится коммитом сессии запроса;
+                    # pwv меняется, кэш других воркеров надо сбросить
+                    user.hashed_password = new_hash
+                    if self.db is not None:
+                        forget_identity_on_commit(self.db, user.id)
+                identity = UserIdentity.from_user(user)
+                remember_identity(identity)
+                return await self.create_tokens_pair(identity)
 
         return None
 
+    async def refresh(self, refresh_token: str) -> Optional[TwoTokens]:
+        """
+        Выдаёт новую пару токенов по refresh-токену.
+        Пользователь берётся из user_identity_cache, при промахе — одним
+        запросом по первичному ключу. Токены, выпущенные до смены пароля
+        (claim pwv не совпадает), отклоняются.
+        """
+        payload = self.verify_jwt(refresh_token)
+        user_id = int(payload["sub"])
+
+        identity = None
+        if settings.auth_user_cache_enabled:
+            identity = user_identity_cache.get(user_id)
+        if identity is None:
+            user = await self.base_db.get_by_id(user_id, User)
+            if not user:
+                return None
+            identity = UserIdentity.from_user(user)
+            remember_identity(identity)
+
+        token_version = payload.get("pwv")
+        if token_version is not None and (
+            token_version != identity.password_hash_version
+        ):
+            return None
+        return await self.create_tokens_pair(identity)
+
+    async def create_tokens_pair(self, user: Union[User, UserIdentity]) -> TwoTokens:
+        return await self.jwt.create_tokens_pair(user)
+
+    def verify_jwt(self, token: str) -> dict:
+        return self.jwt.verify_jwt(token)
+
+
+class JwtService:
+    """
+    Выпуск и проверка JWT. Не зависит от запроса: один экземпляр на процесс
+    (см. get_jwt_service), ключи и параметры читаются из settings один раз.
+    """
+
+    def __init__(self):
+        self.secret_key = settings.authjwt_secret_key
+        self.algorithm = settings.authjwt_algorithm
+
+        # параметры жизни токенов можно вынести в Settings
+        self.access_expires = timedelta(minutes=15)
+        self.refresh_expires = timedelta(days=7)
+
     # ——— Генерация JWT ———
     def _create_token(self, user_data: dict, expires_delta: timedelta) -> str:
         now = datetime.now(tz=timezone.utc)
@@ -57,6 +184,7 @@ class AuthService:
         payload = {
             "sub": str(user_data["id"]),    # уникальный идентификатор пользователя
             "email": user_data["email"],    # почта — опционально, если нужна
+            "pwv": user_data["pwv"],        # версия хеша пароля
             "iat": now,                     # issued at
             "exp": expires_time,            # expiration time
         }
@@ -75,11 +203,14 @@ class AuthService:
         return self._create_token(user_data, self.refresh_expires)
 
     # ——— Создание пары токенов без хранения ———
-    async def create_tokens_pair(self, user: User) -> TwoTokens:
+    async def create_tokens_pair(self, user: Union[User, UserIdentity]) -> TwoTokens:
+        if isinstance(user, User):
+            user = UserIdentity.from_user(user)
         user_data = {
             "email": user.email,
             "username": user.username,
             'id': user.id,
+            "pwv": user.password_hash_version,
         }
         access = self.create_access_token(user_data)
         refresh = self.create_refresh_token(user_data)
@@ -109,10 +240,23 @@ class AuthService:
 
 
 @lru_cache()
+def get_jwt_service() -> JwtService:
+    return JwtService()
+
+
 def get_auth_service(
-    db_session: AsyncSession = Depends(get_session),
+    base_db: BaseDb = Depends(get_base_db),
+    jwt_service: JwtService = Depends(get_jwt_service),
+    db_session: AsyncSession = Depends(get_session, scope="function"),
 ) -> AuthService:
+    return AuthService(base_db, jwt_service, db_session=db_session)
+
+
+def _on_notify(payload: str) -> None:
+    forget_identity(int(payload))
+
 
-    db_engine = PostgresqlEngine(db_session)
-    base_db = BaseDb(db_engine)
-    return AuthService(base_db)
+if settings.auth_user_cache_enabled and settings.auth_user_cache_listen:
+    notify_listener.subscribe(
+        NOTIFY_CHANNEL, _on_notify, on_reset=user_identity_cache.clear
+    )
@@ -1,16 +1,36 @@
-from typing import List
+from typing import List, Optional
 from fastapi import HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.models.user import Category
 from app.core.database import get_session
-from app.core.settings import default_categories
+from app.core.replica import get_read_session, record_write
+from app.core.settings import settings
+from app.services.analytics_cache import invalidate_analytics
+from app.services.category_cache import invalidate_category
+from app.services.database import BaseDb, PostgresqlEngine
+
+
+def resolve_locale(accept_language: Optional[str]) -> str:
+    """
+    Первая локаль из Accept-Language, для которой настроены категории
+    по умолчанию; иначе settings.default_locale.
+    """
+    if accept_language:
+        for part in accept_language.split(","):
+            language = part.split(";")[0].strip().lower()
+            for candidate in (language, language.split("-")[0]):
+                if candidate in settings.default_categories:
+                    return candidate
+    return settings.default_locale
 
 
 class CategoryService:
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
+        self.base_db = BaseDb(PostgresqlEngine(db_session))
 
     async def get_categories(self, user_id: int) -> List[Category]:
         """
@@ -31,54 +51,79 @@ class CategoryService:
     async def create_category(self, user_id: int, name: str, color: str) -> Category:
         """
         Создаёт новую категорию для пользователя.
+        Проверка дубликата и вставка — один INSERT ... ON CONFLICT DO NOTHING
+        RETURNING по уникальному индексу (user_id, name).
         """
-        # Проверим, что такой категории ещё нет
-        existing = await self.db.execute(
-            select(Category).where(Category.user_id == user_id, Category.name == name)
+        stmt = (
+            pg_insert(Category)
+            .values(user_id=user_id, name=name, color=color)
+            .on_conflict_do_nothing(index_elements=["user_id", "name"])
+            .returning(Category)
         )
-        if existing.scalars().first():
+        new_cat = (await self.db.scalars(stmt)).first()
+        if new_cat is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Category with this name already exists",
             )
-        new_cat = Category(user_id=user_id, name=name, color=color)
-        self.db.add(new_cat)
-        await self.db.commit()
-        await self.db.refresh(new_cat)
+        invalidate_category(self.db, user_id, name)
+        record_write(self.db, user_id)
         return new_cat
 
-    async def delete_category(self, category_id: int) -> None:
+    async def delete_category(
+        self, category_id: int, user_id: Optional[int] = None
+    ) -> None:
         """
         Удаляет категорию по её ID.
+        Если передан user_id, категория должна принадлежать этому пользователю.
         """
         category = await self.db.get(Category, category_id)
-        if not category:
+        if not category or (user_id is not None and category.user_id != user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Category not found"
             )
         await self.db.delete(category)
-        await self.db.commit()
+        invalidate_category(self.db, category.user_id, category.name)
+        # топ категорий соединяется с categories — ответы аналитики устарели
+        invalidate_analytics(self.db, category.user_id)
+        record_write(self.db, category.user_id)
 
-    async def create_default_categories(self, user_id: int) -> List[Category]:
+    async def create_default_categories(
+        self, user_id: int, locale: Optional[str] = None
+    ) -> List[Category]:
         """
         Добавляет набор категорий по умолчанию для нового пользователя и возвращает их.
+        Все категории вставляются одним многострочным INSERT ... RETURNING
+        (BaseDb.create_many),
+        цвета берутся из settings.default_category_palette по кругу.
         """
-        default_names = default_categories
-        created = []
-        for name in default_names:
-            cat = Category(user_id=user_id, name=name)
-            self.db.add(cat)
-            created.append(cat)
-        await self.db.commit()
-        for cat in created:
-            await self.db.refresh(cat)
-        return created
+        locale = locale if locale in settings.default_categories else None
+        default_names = settings.default_categories[locale or settings.default_locale]
+        palette = settings.default_category_palette
+        rows = [
+            {
+                "user_id": user_id,
+                "name": name,
+                "color": palette[index % len(palette)] if palette else None,
+            }
+            for index, name in enumerate(default_names)
+        ]
+        categories = await self.base_db.create_many(rows, Category)
+        if categories:
+            record_write(self.db, user_id)
+        return categories
 
 
 # Dependency
 
 
 def get_category_service(
-    db_session: AsyncSession = Depends(get_session),
+    db_session: AsyncSession = Depends(get_session, scope="function"),
+) -> CategoryService:
+    return CategoryService(db_session)
+
+
+def get_read_category_service(
+    db_session: AsyncSession = Depends(get_read_session),
 ) -> CategoryService:
     return CategoryService(db_session)
@@ -0,0 +1,67 @@
+from typing import Optional
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.database import after_commit, notify_on_commit
+from app.core.metrics import metrics
+from app.core.notify import notify_listener
+from app.core.settings import settings
+
+NOTIFY_CHANNEL = "category_cache"
+
+
+class CategoryCache:
+    """
+    Кэш (user_id, name) → category_id для резолвинга category_name
+    на горячем пути записи транзакций. Хранит только существующие категории.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: int, name: str) -> Optional[int]:
+        if not settings.category_cache_enabled:
+            return None
+        category_id = self._cache.get((user_id, name))
+        metrics.inc(
+            "category_cache.hits" if category_id is not None else "category_cache.misses"
+        )
+        return category_id
+
+    def set(self, user_id: int, name: str, category_id: int) -> None:
+        if settings.category_cache_enabled:
+            self._cache.set((user_id, name), category_id)
+
+    def invalidate(self, user_id: int, name: str) -> None:
+        self._cache.pop((user_id, name))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+category_cache = CategoryCache(
+    maxsize=settings.category_cache_size, ttl=settings.category_cache_ttl
+)
+
+
+def invalidate_category(session: AsyncSession, user_id: int, name: str) -> None:
+    """
+    Сбрасывает запись кэша после коммита текущей транзакции: локально —
+    через after_commit, в остальных воркерах — через NOTIFY, который
+    commit отправляет перед COMMIT (слушатели получат его только при фиксации).
+    """
+    after_commit(session, lambda: category_cache.invalidate(user_id, name))
+    if settings.category_cache_listen:
+        payload = orjson.dumps({"user_id": user_id, "name": name}).decode()
+        notify_on_commit(session, NOTIFY_CHANNEL, payload)
+
+
+def _on_notify(payload: str) -> None:
+    data = orjson.loads(payload)
+    category_cache.invalidate(int(data["user_id"]), data["name"])
+
+
+if settings.category_cache_enabled and settings.category_cache_listen:
+    notify_listener.subscribe(NOTIFY_CHANNEL, _on_notify, on_reset=category_cache.clear)
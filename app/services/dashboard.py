@@ -0,0 +1,138 @@
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import async_session, pool_limits
+from app.core.metrics import metrics
+from app.core.replica import get_read_session_factory
+from app.core.settings import settings
+from app.schemas.transaction import DashboardResponse
+from app.services.transaction import AnalyticsService
+
+# формат идентификатора из pg_export_snapshot(), например 00000003-0000001B-1
+SNAPSHOT_ID = re.compile(r"^[0-9A-F]+-[0-9A-F]+(-[0-9]+)?$")
+
+Metric = Callable[[AnalyticsService], Awaitable[Any]]
+
+
+class DashboardService:
+    """
+    Все метрики дашборда за один вызов. По умолчанию метрики считаются
+    по очереди в одной сессии — одно соединение из пула на запрос.
+    При analytics_dashboard_parallel каждая метрика идёт в своей сессии
+    параллельно; такой запрос держит len(метрик) соединений сразу, поэтому
+    число параллельных дашбордов ограничено семафором по размеру пула —
+    иначе запросы, захватившие первое соединение, ждали бы друг друга.
+    При analytics_dashboard_shared_snapshot сессии работают в REPEATABLE READ
+    на одном снимке (pg_export_snapshot), так что метрики согласованы.
+    """
+
+    _parallel_slots: Optional[asyncio.Semaphore] = None
+
+    def __init__(self, session_factory=async_session):
+        self.session_factory = session_factory
+
+    @classmethod
+    def parallel_slots(cls, connections: int) -> asyncio.Semaphore:
+        if cls._parallel_slots is None:
+            pool = sum(pool_limits())
+            cls._parallel_slots = asyncio.Semaphore(max(1, pool // connections))
+        return cls._parallel_slots
+
+    async def build(
+        self,
+        user_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        top_n: int = 5,
+        days_back: int = 30,
+    ) -> DashboardResponse:
+        """
+        Окно date_from/date_to применяется так же, как в отдельных
+        эндпоинтах: totals и top_categories — за окно, forecast — до конца
+        текущего месяца с историей от date_from, daily_spending — за
+        days_back дней по сегодня.
+        """
+        specs: Dict[str, Metric] = {
+            "totals": lambda service: service.get_total_spent(
+                user_id, date_from, date_to
+            ),
+            "top_categories": lambda service: service.get_top_categories(
+                user_id, top_n, date_from, date_to
+            ),
+            "daily_spending": lambda service: service.get_daily_spending(
+                user_id, days_back
+            ),
+            "forecast": lambda service: service.forecast(user_id, date_from),
+        }
+        names = list(specs)
+        if settings.analytics_dashboard_parallel:
+            async with self.parallel_slots(len(names)):
+                results = await self._parallel(specs)
+        else:
+            results = await self._sequential(specs)
+
+        payload = {name: value for name, (value, _) in zip(names, results)}
+        timings = {name: elapsed for name, (_, elapsed) in zip(names, results)}
+        for name, elapsed in timings.items():
+            metrics.observe(f"analytics.dashboard.{name}_ms", elapsed)
+        return DashboardResponse(**payload, timings_ms=timings)
+
+    async def _sequential(self, specs: Dict[str, Metric]) -> List[Tuple[Any, float]]:
+        async with self.session_factory() as session:
+            if settings.analytics_dashboard_shared_snapshot:
+                await self._repeatable_read(session)
+            return [await self._timed(metric, session) for metric in specs.values()]
+
+    async def _parallel(self, specs: Dict[str, Metric]) -> List[Tuple[Any, float]]:
+        ordered = list(specs.values())
+        async with self.session_factory() as leader:
+            snapshot = None
+            if settings.analytics_dashboard_shared_snapshot:
+                await self._repeatable_read(leader)
+                snapshot = await leader.scalar(text("SELECT pg_export_snapshot()"))
+            # снимок живёт, пока открыта транзакция leader
+            return await asyncio.gather(
+                self._timed(ordered[0], leader),
+                *(self._in_own_session(metric, snapshot) for metric in ordered[1:]),
+            )
+
+    async def _in_own_session(
+        self, metric: Metric, snapshot: Optional[str]
+    ) -> Tuple[Any, float]:
+        async with self.session_factory() as session:
+            if snapshot is not None:
+                await self._repeatable_read(session)
+                await self._import_snapshot(session, snapshot)
+            return await self._timed(metric, session)
+
+    @staticmethod
+    async def _timed(metric: Metric, session: AsyncSession) -> Tuple[Any, float]:
+        started = time.perf_counter()
+        value = await metric(AnalyticsService(session))
+        return value, round((time.perf_counter() - started) * 1000, 2)
+
+    @staticmethod
+    async def _repeatable_read(session: AsyncSession) -> None:
+        await session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"}
+        )
+
+    @staticmethod
+    async def _import_snapshot(session: AsyncSession, snapshot: str) -> None:
+        # SET TRANSACTION SNAPSHOT не принимает параметры — проверяем формат
+        if not SNAPSHOT_ID.match(snapshot):
+            raise ValueError(f"unexpected snapshot id: {snapshot!r}")
+        await session.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+
+
+def get_dashboard_service(
+    session_factory=Depends(get_read_session_factory),
+) -> DashboardService:
+    return DashboardService(session_factory)
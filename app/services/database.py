@@ -1,11 +1,72 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
 from uuid import UUID
 
-from app.models.base import ModelBase
-from sqlalchemy import select
+from fastapi import Depends
+from sqlalchemy import delete, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.database import get_session
+from app.models.base import ModelBase
+
+# Условия: {"поле": значение} (список значений — IN) или выражения SQLAlchemy
+Filters = Union[Mapping[str, Any], Sequence[Any]]
+
+# Предел параметров одного запроса в протоколе Postgres
+MAX_BIND_PARAMS = 32767
+
+# Ячейка многострочного VALUES без значения — значение колонки по умолчанию
+DEFAULT = literal_column("DEFAULT")
+
+
+def _criteria(filters: Optional[Filters], Object: Any) -> List[Any]:
+    if not filters:
+        return []
+    if isinstance(filters, Mapping):
+        return [
+            getattr(Object, key).in_(value)
+            if isinstance(value, (list, tuple, set, frozenset))
+            else getattr(Object, key) == value
+            for key, value in filters.items()
+        ]
+    return list(filters)
+
+
+def _rows(objects_data: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Строки для многострочного INSERT с одинаковым набором колонок —
+    объединением полей всех элементов (model_dump(exclude_unset) даёт
+    разные наборы); отсутствующие поля получают DEFAULT, а не NULL.
+    """
+    rows = [
+        data.model_dump(exclude_unset=True) if hasattr(data, "model_dump") else dict(data)
+        for data in objects_data
+    ]
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return [{column: row.get(column, DEFAULT) for column in columns} for row in rows]
+
+
+def _chunks(rows: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+    """
+    Многострочный INSERT — один запрос, пока число параметров не превышает
+    предел протокола; иначе строки делятся на минимальное число запросов.
+    Строки уже приведены _rows к общему набору колонок.
+    """
+    size = max(1, MAX_BIND_PARAMS // max(len(rows[0]), 1))
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
 
 class AsyncDbEngine(ABC):
     @abstractmethod
@@ -25,7 +86,49 @@ class AsyncDbEngine(ABC):
         pass
 
     @abstractmethod
-    async def list_all(self, Object: Any) -> List[Any]:
+    async def list_all(
+        self,
+        Object: Any,
+        filters: Optional[Filters] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def get_many(self, object_ids: Sequence[Any], Object: Any) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def create_many(self, objects_data: Iterable[Any], Object: Any) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def upsert_many(
+        self,
+        objects_data: Iterable[Any],
+        Object: Any,
+        index_elements: Sequence[str],
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        pass
+
+    @abstractmethod
+    async def update_where(
+        self, filters: Filters, values: Mapping[str, Any], Object: Any
+    ) -> int:
+        pass
+
+    @abstractmethod
+    async def delete_where(self, filters: Filters, Object: Any) -> int:
+        pass
+
+    @abstractmethod
+    def iter_all(
+        self,
+        Object: Any,
+        filters: Optional[Filters] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[List[Any]]:
         pass
 
 
@@ -38,42 +141,178 @@ class PostgresqlEngine(AsyncDbEngine):
         result = await self.db_session.execute(query)
         return result.scalar_one_or_none()
 
+    # Методы записи не коммитят: единственный commit выполняет get_session
+    # в конце запроса (unit of work).
+
     async def create(self, object_data: Any, Object: Any) -> Any:
         new_object = object_data
         self.db_session.add(new_object)
-        await self.db_session.commit()
-        await self.db_session.refresh(new_object)
+        # INSERT ... RETURNING заполняет id и серверные значения по умолчанию
+        await self.db_session.flush()
         return new_object
 
     async def update(
         self, object_id: UUID, object_data: Any, Object: Any
     ) -> Optional[Any]:
-        obj = await self.get_by_id(object_id, Object)
-        if obj:
-            if hasattr(object_data, "dict"):
-                update_data = object_data.dict(exclude_unset=True)
-            else:
-                update_data = object_data
-
-            for key, value in update_data.items():
-                setattr(obj, key, value)
-
-            await self.db_session.commit()
-            await self.db_session.refresh(obj)
+        if hasattr(object_data, "dict"):
+            update_data = object_data.dict(exclude_unset=True)
+        else:
+            update_data = object_data
+        if not update_data:
+            return await self.get_by_id(object_id, Object)
 
-        return obj
+        query = (
+            update(Object)
+            .where(Object.id == object_id)
+            .values(**update_data)
+            .returning(Object)
+        )
+        result = await self.db_session.execute(query)
+        return result.scalar_one_or_none()
 
     async def delete(self, object_id: UUID, Object: Any) -> None:
-        obj = await self.get_by_id(object_id, Object)
-        if obj:
-            await self.db_session.delete(obj)
-            await self.db_session.commit()
+        await self.db_session.execute(delete(Object).where(Object.id == object_id))
 
-    async def list_all(self, Object: Any) -> List[Any]:
-        query = select(Object)
+    async def list_all(
+        self,
+        Object: Any,
+        filters: Optional[Filters] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        query = select(Object).where(*_criteria(filters, Object))
+        if limit is not None:
+            query = query.order_by(Object.id).limit(limit)
         result = await self.db_session.execute(query)
         return result.scalars().all()
 
+    # Пакетные операции: каждая — один set-based запрос вместо цикла
+    # по объектам.
+
+    async def get_many(self, object_ids: Sequence[Any], Object: Any) -> List[Any]:
+        """Объекты по списку id одним SELECT ... WHERE id IN (...)."""
+        if not object_ids:
+            return []
+        result = await self.db_session.execute(
+            select(Object).where(Object.id.in_(object_ids))
+        )
+        return result.scalars().all()
+
+    async def create_many(self, objects_data: Iterable[Any], Object: Any) -> List[Any]:
+        """
+        Многострочный INSERT ... RETURNING. Элементы — dict или pydantic-модели;
+        возвращает созданные объекты в том же порядке.
+        """
+        rows = _rows(objects_data)
+        if not rows:
+            return []
+        created = []
+        for chunk in _chunks(rows):
+            result = await self.db_session.scalars(
+                pg_insert(Object).values(chunk).returning(Object)
+            )
+            created.extend(result.all())
+        return created
+
+    async def upsert_many(
+        self,
+        objects_data: Iterable[Any],
+        Object: Any,
+        index_elements: Sequence[str],
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        """
+        INSERT ... ON CONFLICT (index_elements) DO UPDATE. update_fields —
+        поля, перезаписываемые при конфликте (по умолчанию все переданные,
+        кроме ключа); пустой список — DO NOTHING, тогда возвращаются только
+        вставленные строки. Дубликаты ключа во входных данных схлопываются
+        (последний побеждает): Postgres не обновляет строку дважды за запрос.
+        """
+        rows = _rows(objects_data)
+        if not rows:
+            return []
+        rows = list(
+            {tuple(row[key] for key in index_elements): row for row in rows}.values()
+        )
+        if update_fields is None:
+            update_fields = [key for key in rows[0] if key not in index_elements]
+
+        upserted = []
+        for chunk in _chunks(rows):
+            stmt = pg_insert(Object).values(chunk)
+            if update_fields:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={field: stmt.excluded[field] for field in update_fields},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+            result = await self.db_session.scalars(
+                stmt.returning(Object),
+                execution_options={"populate_existing": True},
+            )
+            upserted.extend(result.all())
+        return upserted
+
+    async def update_where(
+        self, filters: Filters, values: Mapping[str, Any], Object: Any
+    ) -> int:
+        """
+        UPDATE ... WHERE filters одним запросом; возвращает число строк.
+        Уже загруженные в сессию объекты не синхронизируются.
+        """
+        criteria = _criteria(filters, Object)
+        if not criteria:
+            raise ValueError("update_where requires at least one filter")
+        if not values:
+            return 0
+        result = await self.db_session.execute(
+            update(Object)
+            .where(*criteria)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def delete_where(self, filters: Filters, Object: Any) -> int:
+        """DELETE ... WHERE filters одним запросом; возвращает число строк."""
+        criteria = _criteria(filters, Object)
+        if not criteria:
+            raise ValueError("delete_where requires at least one filter")
+        result = await self.db_session.execute(
+            delete(Object)
+            .where(*criteria)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def iter_all(
+        self,
+        Object: Any,
+        filters: Optional[Filters] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Все объекты пачками по chunk_size. Keyset-пагинация по id: каждая
+        пачка — отдельный индексный запрос без OFFSET и серверного курсора,
+        поэтому работает и через PgBouncer, а память не растёт с размером таблицы.
+        """
+        criteria = _criteria(filters, Object)
+        last_id = None
+        while True:
+            query = select(Object).where(*criteria)
+            if last_id is not None:
+                query = query.where(Object.id > last_id)
+            result = await self.db_session.execute(
+                query.order_by(Object.id).limit(chunk_size)
+            )
+            chunk = result.scalars().all()
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1].id
+
     async def execute(self, query) -> Any:
         result = await self.db_session.execute(query)
         return result
@@ -97,8 +336,46 @@ class BaseDb:
     async def delete(self, object_id: UUID, Object: Any) -> None:
         await self.db_engine.delete(object_id, Object)
 
-    async def list_all(self, Object: Any) -> List[Any]:
-        return await self.db_engine.list_all(Object)
+    async def list_all(
+        self,
+        Object: Any,
+        filters: Optional[Filters] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        return await self.db_engine.list_all(Object, filters, limit)
+
+    async def get_many(self, object_ids: Sequence[Any], Object: Any) -> List[Any]:
+        return await self.db_engine.get_many(object_ids, Object)
+
+    async def create_many(self, objects_data: Iterable[Any], Object: Any) -> List[Any]:
+        return await self.db_engine.create_many(objects_data, Object)
+
+    async def upsert_many(
+        self,
+        objects_data: Iterable[Any],
+        Object: Any,
+        index_elements: Sequence[str],
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> List[Any]:
+        return await self.db_engine.upsert_many(
+            objects_data, Object, index_elements, update_fields
+        )
+
+    async def update_where(
+        self, filters: Filters, values: Mapping[str, Any], Object: Any
+    ) -> int:
+        return await self.db_engine.update_where(filters, values, Object)
+
+    async def delete_where(self, filters: Filters, Object: Any) -> int:
+        return await self.db_engine.delete_where(filters, Object)
+
+    def iter_all(
+        self,
+        Object: Any,
+        filters: Optional[Filters] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[List[Any]]:
+        return self.db_engine.iter_all(Object, filters, chunk_size)
 
     async def get_by_key(self, key: str, value: Any, Object: Any) -> Optional[Any]:
         query = select(Object).where(getattr(Object, key) == value)
@@ -107,3 +384,12 @@ class BaseDb:
 
     async def execute(self, query) -> Any:
         return await self.db_engine.execute(query)
+
+
+def get_base_db(db_session: AsyncSession = Depends(get_session, scope="function")) -> BaseDb:
+    """
+    Per-request репозиторий поверх сессии запроса.
+    FastAPI кэширует зависимость в рамках запроса, поэтому сервисы
+    одного обработчика разделяют один BaseDb.
+    """
+    return BaseDb(PostgresqlEngine(db_session))
@@ -0,0 +1,203 @@
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import Row, select
+
+from app.core.serialization import orjson_default
+from app.core.settings import settings
+from app.models.user import Category, Transaction
+from app.services.transaction import TransactionService
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet-экспорт недоступен без pyarrow
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = (
+    "id",
+    "timestamp",
+    "item",
+    "quantity",
+    "location",
+    "amount",
+    "payment_method",
+    "payment_type",
+    "category",
+)
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class TransactionExportService(TransactionService):
+    """
+    Выгрузка истории транзакций. Строки читаются серверным курсором
+    пачками по transactions_export_chunk_size; каждая пачка сериализуется
+    в буфер, который сразу отдаётся клиенту и очищается, поэтому
+    расход памяти не зависит от длины истории.
+    """
+
+    async def rows(
+        self,
+        user_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[Sequence[Row]]:
+        chunk_size = chunk_size or settings.transactions_export_chunk_size
+        stmt = (
+            select(
+                Transaction.id,
+                Transaction.timestamp,
+                Transaction.item,
+                Transaction.quantity,
+                Transaction.location,
+                Transaction.amount,
+                Transaction.payment_method,
+                Transaction.payment_type,
+                Category.name.label("category"),
+            )
+            .outerjoin(Category, Transaction.category_id == Category.id)
+            .where(*self._period_filters(user_id, date_from, date_to))
+            .order_by(Transaction.timestamp.desc(), Transaction.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(stmt)
+        async for chunk in result.partitions(chunk_size):
+            yield chunk
+
+    async def export(
+        self,
+        export_format: str,
+        user_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        chunks = self.rows(user_id, date_from, date_to)
+        if export_format == "csv":
+            writer = csv_chunks
+        elif export_format == "ndjson":
+            writer = ndjson_chunks
+        else:
+            writer = parquet_chunks
+        async for data in writer(chunks):
+            yield data
+
+
+def check_format(export_format: str) -> None:
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, expected one of: {', '.join(EXPORT_FORMATS)}",
+        )
+    if export_format == "parquet" and pa is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow",
+        )
+
+
+async def csv_chunks(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for chunk in chunks:
+        writer.writerows(
+            (row[0], row[1].isoformat(), *row[2:]) for row in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # пустая выгрузка — только заголовок
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_chunks(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield b"".join(
+            orjson.dumps(
+                row._asdict(),
+                default=orjson_default,
+                option=orjson.OPT_APPEND_NEWLINE,
+            )
+            for row in chunk
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Файл для ParquetWriter, который копит записанные байты
+    до следующего drain() вместо записи на диск.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _parquet_schema():
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+            ("item", pa.string()),
+            ("quantity", pa.int32()),
+            ("location", pa.string()),
+            ("amount", pa.decimal128(12, 2)),
+            ("payment_method", pa.string()),
+            ("payment_type", pa.string()),
+            ("category", pa.string()),
+        ]
+    )
+
+
+async def parquet_chunks(chunks: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """
+    Parquet потоком: каждая пачка строк — отдельная row group, записанные
+    байты отдаются сразу. Футер с метаданными уходит последним.
+    """
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [
+                        pa.array(values, type=field.type)
+                        for values, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,299 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.models.user import DailyUserCategoryTotal
+from app.schemas.transaction import ForecastResponse, PaymentType
+from app.services.rollup import utc_day
+
+
+class ForecastBatch(NamedTuple):
+    """
+    Прогноз для пачки пользователей: каждое поле — массив формы (n_users,).
+    remaining — траты с сегодняшнего дня до конца месяца включительно.
+    """
+
+    spent_to_date: np.ndarray
+    remaining: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    recurring: np.ndarray
+
+
+def month_bounds(today: date) -> Tuple[date, date]:
+    """Первый день текущего и первый день следующего месяца."""
+    month_start = today.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, next_month
+
+
+def history_start(today: date, fit_days: int, recurring_months: int) -> date:
+    """
+    Начало окна истории: fit_days для уровня и сезонности, но не позже
+    начала месяца recurring_months назад — детектору нужны полные месяцы.
+    """
+    month_start, _ = month_bounds(today)
+    recurring_start = month_start
+    for _ in range(recurring_months):
+        recurring_start = (recurring_start - timedelta(days=1)).replace(day=1)
+    return min(today - timedelta(days=fit_days), recurring_start)
+
+
+def _calendar(start: date, days: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """День недели (0 — пн), день месяца (0-based) и месяц для days дней от start."""
+    dates = np.datetime64(start, "D") + np.arange(days)
+    months = dates.astype("datetime64[M]")
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    days_of_month = (dates - months.astype("datetime64[D]")).astype(np.int64)
+    return weekdays, days_of_month, months
+
+
+def detect_recurring(
+    history: np.ndarray,
+    start: date,
+    today: date,
+    months: int,
+    tolerance: float,
+    spike: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Регулярные платежи по дням месяца, форма (n_users, 31).
+    Обычный уровень пользователя — медиана дневных трат за последние months
+    полных месяцев. День считается регулярным, если в каждом из этих месяцев
+    траты в этот день были не меньше spike × обычный уровень и их коэффициент
+    вариации не больше tolerance. Значение — медианная сумма сверх обычного
+    уровня, иначе 0; поэтому равномерные ежедневные траты регулярными не считаются.
+    """
+    spike = settings.forecast_recurring_spike if spike is None else spike
+    n_users, days = history.shape
+    recurring = np.zeros((n_users, 31))
+    if months <= 0 or days == 0:
+        return recurring
+
+    _, days_of_month, month_of_day = _calendar(start, days)
+    current = np.datetime64(today, "M")
+    cube = np.zeros((n_users, months, 31))
+    for k in range(months):
+        mask = month_of_day == current - (k + 1)
+        if not mask.any():
+            return recurring
+        cube[:, k, days_of_month[mask]] = history[:, mask]
+
+    window = (month_of_day >= current - months) & (month_of_day < current)
+    usual = np.median(history[:, window], axis=1)[:, None]
+
+    present = (cube > 0).all(axis=1)
+    spiking = (cube >= spike * usual[:, :, None]).all(axis=1)
+    mean = cube.mean(axis=1)
+    stable = cube.std(axis=1) <= tolerance * mean
+    excess = np.median(cube, axis=1) - usual
+    return np.where(present & spiking & stable, excess, 0.0)
+
+
+def weekday_factors(series: np.ndarray, weekdays: np.ndarray) -> np.ndarray:
+    """
+    Мультипликативная недельная сезонность, форма (n_users, 7):
+    средняя трата в день недели, делённая на среднюю трату за день.
+    """
+    onehot = np.eye(7)[weekdays]
+    counts = onehot.sum(axis=0)
+    means = np.divide(
+        series @ onehot, counts, out=np.zeros((series.shape[0], 7)), where=counts > 0
+    )
+    overall = series.mean(axis=1, keepdims=True) if series.shape[1] else means[:, :1]
+    factors = np.divide(
+        means, overall, out=np.ones_like(means), where=overall > 0
+    )
+    factors[:, counts == 0] = 1.0
+    return factors
+
+
+def exponential_smoothing(series: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Простое экспоненциальное сглаживание по времени, векторизованное
+    по пользователям. Возвращает уровень и СКО ошибки прогноза на шаг вперёд.
+    """
+    n_users, days = series.shape
+    if days == 0:
+        return np.zeros(n_users), np.zeros(n_users)
+    level = series[:, : min(days, 7)].mean(axis=1)
+    squared = np.zeros(n_users)
+    for t in range(1, days):
+        error = series[:, t] - level
+        squared += error * error
+        level = level + alpha * error
+    sigma = np.sqrt(squared / max(days - 1, 1))
+    return level, sigma
+
+
+def forecast_batch(
+    history: np.ndarray,
+    start: date,
+    today: date,
+    fit_days: Optional[int] = None,
+    alpha: Optional[float] = None,
+    recurring_months: Optional[int] = None,
+    recurring_tolerance: Optional[float] = None,
+    z: Optional[float] = None,
+) -> ForecastBatch:
+    """
+    Прогноз трат до конца месяца по матрице дневных трат history
+    (n_users × дни с start по вчера включительно).
+
+    1. Регулярные платежи выделяются из ряда (detect_recurring) и в прогнозе
+       добавляются суммой в свои оставшиеся дни месяца.
+    2. По последним fit_days дням очищенного ряда считаются недельная
+       сезонность и уровень экспоненциального сглаживания.
+    3. Остаток месяца = уровень × сезонный коэффициент по каждому дню +
+       регулярные платежи; полосы — ±z·σ·√h.
+    """
+    fit_days = settings.forecast_lookback_days if fit_days is None else fit_days
+    alpha = settings.forecast_smoothing_alpha if alpha is None else alpha
+    if recurring_months is None:
+        recurring_months = settings.forecast_recurring_months
+    if recurring_tolerance is None:
+        recurring_tolerance = settings.forecast_recurring_tolerance
+    z = settings.forecast_confidence_z if z is None else z
+
+    history = np.asarray(history, dtype=np.float64)
+    n_users, days = history.shape
+    weekdays, days_of_month, month_of_day = _calendar(start, days)
+
+    recurring_by_day = detect_recurring(
+        history, start, today, recurring_months, recurring_tolerance
+    )
+    cleaned = np.clip(history - recurring_by_day[:, days_of_month], 0.0, None)
+
+    fit_from = max(days - max(fit_days, 0), 0)
+    fit = cleaned[:, fit_from:]
+    factors = weekday_factors(fit, weekdays[fit_from:])
+    deseasonalized = np.divide(
+        fit,
+        factors[:, weekdays[fit_from:]],
+        out=np.zeros_like(fit),
+        where=factors[:, weekdays[fit_from:]] > 0,
+    )
+    level, sigma = exponential_smoothing(deseasonalized, alpha)
+
+    _, next_month = month_bounds(today)
+    horizon = (next_month - today).days
+    horizon_weekdays, horizon_days_of_month, _ = _calendar(today, horizon)
+    baseline = level * factors[:, horizon_weekdays].sum(axis=1)
+    recurring = recurring_by_day[:, horizon_days_of_month].sum(axis=1)
+    remaining = baseline + recurring
+
+    band = z * sigma * np.sqrt(horizon)
+    spent_to_date = history[:, month_of_day == np.datetime64(today, "M")].sum(axis=1)
+    return ForecastBatch(
+        spent_to_date=spent_to_date,
+        remaining=remaining,
+        lower=np.clip(remaining - band, recurring, None),
+        upper=remaining + band,
+        recurring=recurring,
+    )
+
+
+class ForecastService:
+    """
+    Прогноз трат по дневному rollup: история всех нужных пользователей
+    читается одним запросом, расчёт — forecast_batch на NumPy.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def load_history(
+        self,
+        start: date,
+        end: date,
+        user_ids: Optional[Sequence[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Матрица дневных расходов за [start, end): (id пользователей, n_users × дни).
+        Без user_ids — все пользователи, у которых были траты в окне.
+        """
+        stmt = (
+            select(
+                DailyUserCategoryTotal.user_id,
+                DailyUserCategoryTotal.day,
+                func.sum(DailyUserCategoryTotal.total_amount),
+            )
+            .where(
+                DailyUserCategoryTotal.payment_type == PaymentType.expense.value,
+                DailyUserCategoryTotal.day >= start,
+                DailyUserCategoryTotal.day < end,
+            )
+            .group_by(DailyUserCategoryTotal.user_id, DailyUserCategoryTotal.day)
+        )
+        if user_ids is not None:
+            stmt = stmt.where(DailyUserCategoryTotal.user_id.in_(user_ids))
+        rows = (await self.db.execute(stmt)).all()
+
+        if user_ids is not None:
+            ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+        else:
+            ids = np.unique(np.fromiter((row[0] for row in rows), np.int64, len(rows)))
+        history = np.zeros((len(ids), (end - start).days))
+        if rows:
+            row_users = np.fromiter((row[0] for row in rows), np.int64, len(rows))
+            columns = np.fromiter(
+                ((row[1] - start).days for row in rows), np.int64, len(rows)
+            )
+            amounts = np.fromiter((row[2] for row in rows), np.float64, len(rows))
+            np.add.at(history, (np.searchsorted(ids, row_users), columns), amounts)
+        return ids, history
+
+    async def forecast_users(
+        self,
+        user_ids: Optional[Sequence[int]] = None,
+        today: Optional[date] = None,
+        fit_days: Optional[int] = None,
+    ) -> Tuple[np.ndarray, ForecastBatch]:
+        """
+        Пакетный прогноз (ночные задачи): один запрос и один проход NumPy
+        на всю пачку пользователей.
+        """
+        today = today or datetime.now(tz=timezone.utc).date()
+        fit_days = settings.forecast_lookback_days if fit_days is None else fit_days
+        start = history_start(today, fit_days, settings.forecast_recurring_months)
+        ids, history = await self.load_history(start, today, user_ids)
+        return ids, forecast_batch(history, start, today, fit_days=fit_days)
+
+    async def forecast_user(
+        self, user_id: int, date_from: Optional[datetime] = None
+    ) -> ForecastResponse:
+        """
+        Прогноз для одного пользователя. date_from ограничивает окно,
+        по которому оцениваются уровень и сезонность.
+        """
+        today = datetime.now(tz=timezone.utc).date()
+        fit_days = None
+        if date_from is not None:
+            fit_days = max((today - utc_day(date_from)).days, 0)
+        _, batch = await self.forecast_users([user_id], today, fit_days)
+        return forecast_response(batch, 0)
+
+
+def forecast_response(batch: ForecastBatch, index: int) -> ForecastResponse:
+    return ForecastResponse(
+        spent_to_date=round(float(batch.spent_to_date[index]), 2),
+        remaining=round(float(batch.remaining[index]), 2),
+        remaining_lower=round(float(batch.lower[index]), 2),
+        remaining_upper=round(float(batch.upper[index]), 2),
+        recurring=round(float(batch.recurring[index]), 2),
+        month_total=round(
+            float(batch.spent_to_date[index] + batch.remaining[index]), 2
+        ),
+    )
+
+
+async def forecast_all(
+    session: AsyncSession, user_ids: Sequence[int], today: Optional[date] = None
+) -> Dict[int, ForecastResponse]:
+    """Прогнозы для списка пользователей в виде {user_id: ForecastResponse}."""
+    ids, batch = await ForecastService(session).forecast_users(user_ids, today)
+    return {int(user_id): forecast_response(batch, i) for i, user_id in enumerate(ids)}
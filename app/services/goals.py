@@ -1,11 +1,118 @@
-from typing import List, Optional
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
 from fastapi import HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import (
+    Date,
+    Integer,
+    Numeric,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
 
-from app.models.user import Goals
-from app.schemas.goals import GoalCreate, GoalUpdate
+from app.models.user import DailyUserCategoryTotal, Goals
+from app.schemas.goals import GoalCreate, GoalProgress, GoalUpdate
+from app.schemas.transaction import PaymentType
 from app.core.database import get_session
+from app.core.replica import get_read_session, record_write
+from app.core.settings import settings
+
+
+def _goals_progress_query(user_ids: Sequence[int], today: date):
+    """
+    Прогресс всех целей пользователей user_ids одним запросом.
+
+    Накопления пользователя — доходы минус расходы за всё время (из дневного
+    rollup) — распределяются по целям в порядке срока: цель получает
+    min(amount, остаток после более ранних целей). Прогнозная дата
+    достижения — когда накопления дорастут до суммы этой и всех более ранних
+    целей при среднем дневном накоплении за goals_progress_window_days.
+    """
+    window = settings.goals_progress_window_days
+    signed = case(
+        (
+            DailyUserCategoryTotal.payment_type == PaymentType.income.value,
+            DailyUserCategoryTotal.total_amount,
+        ),
+        else_=-DailyUserCategoryTotal.total_amount,
+    )
+    totals = (
+        select(
+            DailyUserCategoryTotal.user_id,
+            func.sum(signed).label("net"),
+            func.coalesce(
+                func.sum(signed).filter(
+                    DailyUserCategoryTotal.day > today - timedelta(days=window)
+                ),
+                0,
+            ).label("recent_net"),
+        )
+        .where(DailyUserCategoryTotal.user_id.in_(user_ids))
+        .group_by(DailyUserCategoryTotal.user_id)
+        .cte("totals")
+    )
+    ranked = (
+        select(
+            Goals,
+            func.sum(Goals.amount)
+            .over(partition_by=Goals.user_id, order_by=(Goals.date_goals, Goals.id))
+            .label("cumulative"),
+        )
+        .where(Goals.user_id.in_(user_ids))
+        .subquery("ranked")
+    )
+
+    net = func.coalesce(totals.c.net, 0)
+    recent_net = func.coalesce(totals.c.recent_net, 0)
+    saved = func.greatest(
+        func.least(net - (ranked.c.cumulative - ranked.c.amount), ranked.c.amount), 0
+    )
+    remaining = ranked.c.amount - saved
+    days_left = cast(ranked.c.date_goals, Date) - literal(today, Date)
+    projected = case(
+        (remaining <= 0, literal(today, Date)),
+        (
+            recent_net > 0,
+            literal(today, Date)
+            + cast(
+                func.ceil((ranked.c.cumulative - net) * window / recent_net), Integer
+            ),
+        ),
+        else_=None,
+    )
+    return (
+        select(
+            ranked.c.id,
+            ranked.c.user_id,
+            ranked.c.name,
+            ranked.c.description,
+            ranked.c.amount,
+            ranked.c.date_goals,
+            cast(saved, Numeric(12, 2)).label("saved"),
+            cast(remaining, Numeric(12, 2)).label("remaining"),
+            days_left.label("days_left"),
+            cast(
+                case(
+                    (remaining <= 0, 0),
+                    else_=remaining / func.greatest(days_left, 1),
+                ),
+                Numeric(12, 2),
+            ).label("required_daily"),
+            projected.label("projected_date"),
+            func.coalesce(projected <= cast(ranked.c.date_goals, Date), False).label(
+                "on_track"
+            ),
+        )
+        .outerjoin(totals, totals.c.user_id == ranked.c.user_id)
+        .order_by(ranked.c.user_id, ranked.c.date_goals, ranked.c.id)
+    )
 
 
 class GoalsService:
@@ -16,6 +123,30 @@ class GoalsService:
         result = await self.db.execute(select(Goals).where(Goals.user_id == user_id))
         return result.scalars().all()
 
+    async def get_goals_progress(
+        self, user_id: int, today: Optional[date] = None
+    ) -> List[GoalProgress]:
+        """
+        Цели пользователя с прогрессом: накоплено, требуемый дневной темп
+        и прогнозная дата достижения — одним запросом, без выгрузки транзакций.
+        """
+        progress = await self.get_goals_progress_batch([user_id], today)
+        return progress.get(user_id, [])
+
+    async def get_goals_progress_batch(
+        self, user_ids: Sequence[int], today: Optional[date] = None
+    ) -> Dict[int, List[GoalProgress]]:
+        """
+        Пакетный вариант для ночных задач: прогресс целей всех user_ids
+        одним запросом. Пользователи без целей в результат не попадают.
+        """
+        today = today or datetime.now(tz=timezone.utc).date()
+        result = await self.db.execute(_goals_progress_query(user_ids, today))
+        progress: Dict[int, List[GoalProgress]] = defaultdict(list)
+        for row in result:
+            progress[row.user_id].append(GoalProgress.model_validate(row))
+        return dict(progress)
+
     async def get_goal(self, goal_id: int, user_id: int) -> Goals:
         goal = await self.db.get(Goals, goal_id)
         if not goal or goal.user_id != user_id:
@@ -25,32 +156,59 @@ class GoalsService:
         return goal
 
     async def create_goal(self, user_id: int, data: GoalCreate) -> Goals:
-        goal = Goals(
-            user_id=user_id,
-            name=data.name,
-            description=data.description,
-            amount=data.amount,
-            date_goals=data.date_goals,
+        stmt = (
+            insert(Goals)
+            .values(
+                user_id=user_id,
+                name=data.name,
+                description=data.description,
+                amount=data.amount,
+                date_goals=data.date_goals,
+            )
+            .returning(Goals)
         )
-        self.db.add(goal)
-        await self.db.commit()
-        await self.db.refresh(goal)
+        goal = (await self.db.scalars(stmt)).one()
+        record_write(self.db, user_id)
         return goal
 
     async def update_goal(self, goal_id: int, user_id: int, data: GoalUpdate) -> Goals:
-        goal = await self.get_goal(goal_id, user_id)
         update_data = data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(goal, field, value)
-        await self.db.commit()
-        await self.db.refresh(goal)
+        if not update_data:
+            return await self.get_goal(goal_id, user_id)
+        stmt = (
+            update(Goals)
+            .where(Goals.id == goal_id, Goals.user_id == user_id)
+            .values(**update_data)
+            .returning(Goals)
+        )
+        goal = (await self.db.scalars(stmt)).first()
+        if goal is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Goal not found"
+            )
+        record_write(self.db, user_id)
         return goal
 
     async def delete_goal(self, goal_id: int, user_id: int) -> None:
-        goal = await self.get_goal(goal_id, user_id)
-        await self.db.delete(goal)
-        await self.db.commit()
+        stmt = (
+            delete(Goals)
+            .where(Goals.id == goal_id, Goals.user_id == user_id)
+            .returning(Goals.id)
+        )
+        if (await self.db.execute(stmt)).first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Goal not found"
+            )
+        record_write(self.db, user_id)
+
+
+def get_goals_service(
+    db_session: AsyncSession = Depends(get_session, scope="function"),
+) -> GoalsService:
+    return GoalsService(db_session)
 
 
-def get_goals_service(db_session: AsyncSession = Depends(get_session)) -> GoalsService:
+def get_read_goals_service(
+    db_session: AsyncSession = Depends(get_read_session),
+) -> GoalsService:
     return GoalsService(db_session)
@@ -0,0 +1,175 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional, Type
+
+import orjson
+from fastapi import Depends, HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_session
+from app.core.metrics import metrics
+from app.core.settings import settings
+from app.models.user import IdempotencyKey
+
+
+def request_hash(payload: Any) -> str:
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump(mode="json")
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class IdempotencyService:
+    """
+    Idempotency-Key для create-эндпоинтов. Работает в сессии запроса,
+    поэтому захват ключа, создание объекта и сохранение ответа фиксируются
+    одним commit: параллельный повтор ждёт на конфликте INSERT и после
+    коммита первого запроса получает уже готовый ответ, а при откате
+    первого — выполняется как новый. Ключи старше idempotency_key_ttl_hours
+    считаются свободными, даже если cleanup их ещё не удалил.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def run(
+        self,
+        user_id: int,
+        key: Optional[str],
+        endpoint: str,
+        payload: Any,
+        status_code: int,
+        response_model: Type[BaseModel],
+        create: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Без ключа просто вызывает create(). С ключом — возвращает сохранённый
+        ответ, если ключ уже использован, иначе вызывает create() и сохраняет
+        его результат.
+        """
+        if key is None:
+            return await create()
+
+        stored = await self.claim(user_id, key, endpoint, request_hash(payload))
+        if stored is not None:
+            metrics.inc("idempotency.replays")
+            return stored
+
+        result = await create()
+        body = response_model.model_validate(result).model_dump(mode="json")
+        await self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(status_code=status_code, response=body)
+        )
+        return result
+
+    async def claim(
+        self, user_id: int, key: str, endpoint: str, payload_hash: str
+    ) -> Optional[Response]:
+        """
+        Захватывает ключ: для нового ключа это один INSERT ... ON CONFLICT
+        DO NOTHING RETURNING. При повторе сохранённый ответ читается
+        отдельным SELECT — без новой версии строки и без её блокировки.
+        Просроченный ключ захватывается заново. Возвращает None, если ключ
+        захвачен, иначе ответ для повтора.
+        """
+        inserted = await self.db.scalar(
+            pg_insert(IdempotencyKey)
+            .values(
+                user_id=user_id, key=key, endpoint=endpoint, request_hash=payload_hash
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+            .returning(IdempotencyKey.created_at)
+        )
+        if inserted is not None:
+            return None
+
+        row = (
+            await self.db.execute(
+                select(
+                    IdempotencyKey.endpoint,
+                    IdempotencyKey.request_hash,
+                    IdempotencyKey.status_code,
+                    IdempotencyKey.response,
+                    IdempotencyKey.created_at,
+                ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            )
+        ).one_or_none()
+        if row is None:
+            # ключ удалил cleanup между INSERT и SELECT
+            return await self.claim(user_id, key, endpoint, payload_hash)
+        if row.created_at < self.expires_before():
+            if await self.reclaim(user_id, key, endpoint, payload_hash):
+                return None
+            # ключ успел захватить параллельный запрос — читаем его ответ
+            return await self.claim(user_id, key, endpoint, payload_hash)
+
+        if row.endpoint != endpoint or row.request_hash != payload_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request",
+            )
+        return Response(
+            content=orjson.dumps(row.response),
+            status_code=row.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    async def reclaim(
+        self, user_id: int, key: str, endpoint: str, payload_hash: str
+    ) -> bool:
+        """
+        Захватывает просроченный ключ как новый. Условие на created_at
+        перепроверяется после блокировки строки, поэтому из параллельных
+        повторов ключ получает только один.
+        """
+        reclaimed = await self.db.scalar(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.created_at < self.expires_before(),
+            )
+            .values(
+                endpoint=endpoint,
+                request_hash=payload_hash,
+                status_code=None,
+                response=None,
+                created_at=func.now(),
+            )
+            .returning(IdempotencyKey.key)
+        )
+        return reclaimed is not None
+
+    @staticmethod
+    def expires_before() -> datetime:
+        return datetime.now(tz=timezone.utc) - timedelta(
+            hours=settings.idempotency_key_ttl_hours
+        )
+
+    async def cleanup(self, batch_size: int = 10000) -> int:
+        """
+        Удаляет ключи старше idempotency_key_ttl_hours пачками по batch_size,
+        чтобы не держать длинных блокировок. Возвращает число удалённых.
+        """
+        expired = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(IdempotencyKey.created_at < self.expires_before())
+            .limit(batch_size)
+        )
+        result = await self.db.execute(
+            delete(IdempotencyKey).where(
+                tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+            )
+        )
+        return result.rowcount
+
+
+def get_idempotency_service(
+    db_session: AsyncSession = Depends(get_session, scope="function"),
+) -> IdempotencyService:
+    return IdempotencyService(db_session)
@@ -0,0 +1,350 @@
+import codecs
+import csv
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import func, select, text
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import commit
+from app.core.replica import record_write
+from app.core.settings import settings
+from app.models.user import Category, Transaction
+from app.schemas.transaction import (
+    PaymentType,
+    TransactionBulkError,
+    TransactionCreate,
+    TransactionImportOptions,
+    TransactionImportProgress,
+)
+from app.services.analytics_cache import invalidate_analytics
+from app.services.transaction import TransactionService
+
+STAGING_TABLE = "transaction_import_staging"
+SEEN_TABLE = "transaction_import_seen"
+STAGING_COLUMNS = (
+    "line",
+    "timestamp",
+    "item",
+    "quantity",
+    "location",
+    "amount",
+    "payment_method",
+    "payment_type",
+    "category_name",
+)
+
+CREATE_TEMP_TABLES = (
+    f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        line integer NOT NULL,
+        timestamp timestamptz NOT NULL,
+        item text NOT NULL,
+        quantity integer NOT NULL,
+        location text,
+        amount numeric(12, 2) NOT NULL,
+        payment_method text NOT NULL,
+        payment_type text NOT NULL,
+        category_name text
+    ) ON COMMIT DROP
+    """,
+    f"""
+    CREATE TEMP TABLE {SEEN_TABLE} (
+        content_hash text PRIMARY KEY,
+        n integer NOT NULL
+    ) ON COMMIT DROP
+    """,
+)
+
+# Дубликат — строка, чей номер вхождения в файле (среди строк с тем же
+# content_hash) не больше числа таких строк у пользователя до импорта.
+# Повторный импорт того же файла ничего не добавляет, а одинаковые
+# строки внутри файла (два кофе за день) не схлопываются.
+MERGE = text(
+    f"""
+    WITH staged AS (
+        SELECT
+            s.*,
+            transaction_content_hash(
+                s.timestamp, s.amount, s.item, s.payment_method, s.payment_type
+            ) AS content_hash
+        FROM {STAGING_TABLE} s
+    ),
+    numbered AS (
+        SELECT
+            staged.*,
+            row_number() OVER (PARTITION BY staged.content_hash ORDER BY staged.line)
+                + coalesce(seen.n, 0) AS occurrence
+        FROM staged
+        LEFT JOIN {SEEN_TABLE} seen ON seen.content_hash = staged.content_hash
+    ),
+    existing AS (
+        SELECT t.content_hash, count(*) AS n
+        FROM transactions t
+        WHERE t.user_id = :user_id
+          AND t.id <= :max_id
+          AND t.content_hash IN (SELECT content_hash FROM staged)
+        GROUP BY t.content_hash
+    ),
+    seen_update AS (
+        INSERT INTO {SEEN_TABLE} (content_hash, n)
+        SELECT content_hash, count(*) FROM staged GROUP BY content_hash
+        ON CONFLICT (content_hash) DO UPDATE SET n = {SEEN_TABLE}.n + excluded.n
+    )
+    INSERT INTO transactions (
+        user_id, category_id, item, quantity, location, amount,
+        timestamp, payment_method, payment_type
+    )
+    SELECT
+        :user_id, c.id, n.item, n.quantity, n.location, n.amount,
+        n.timestamp, n.payment_method, n.payment_type
+    FROM numbered n
+    LEFT JOIN existing e ON e.content_hash = n.content_hash
+    LEFT JOIN categories c ON c.user_id = :user_id AND c.name = n.category_name
+    WHERE n.occurrence > coalesce(e.n, 0)
+    RETURNING user_id, timestamp, category_id, payment_type, amount
+    """
+)
+
+
+def _parse_amount(value, options: TransactionImportOptions):
+    if not isinstance(value, str):
+        return value
+    value = value.strip().replace("\xa0", "").replace(" ", "")
+    if options.decimal_comma:
+        value = value.replace(".", "").replace(",", ".")
+    return Decimal(value)
+
+
+def row_to_transaction(
+    raw: Dict[str, str], options: TransactionImportOptions
+) -> TransactionCreate:
+    """
+    Строка CSV → TransactionCreate по mapping/defaults из options.
+    Ошибки разбора и валидации поднимаются как ValueError/ValidationError.
+    """
+    data = {}
+    for field in TransactionCreate.model_fields:
+        value = raw.get(options.mapping.get(field, field))
+        if value is None or value == "":
+            value = options.defaults.get(field)
+        data[field] = value
+
+    timestamp = data["timestamp"]
+    if isinstance(timestamp, str) and options.timestamp_format:
+        data["timestamp"] = datetime.strptime(timestamp, options.timestamp_format)
+
+    try:
+        amount = _parse_amount(data["amount"], options)
+    except InvalidOperation:
+        raise ValueError(f"invalid amount: {data['amount']!r}")
+    if options.signed_amounts and amount is not None:
+        data["payment_type"] = (
+            PaymentType.expense if amount < 0 else PaymentType.income
+        )
+        amount = abs(amount)
+    data["amount"] = amount
+    return TransactionCreate.model_validate(data)
+
+
+class CsvRows:
+    """
+    Строки CSV из бинарного файла. Файл декодируется построчно, поэтому
+    ошибка кодировки или формата CSV сообщается с номером строки файла
+    (HTTPException 400), а не падает из середины потока.
+    """
+
+    def __init__(self, file: BinaryIO, options: TransactionImportOptions) -> None:
+        self.file = file
+        self.encoding = options.encoding
+        self.line = 0
+        try:
+            self._decoder = codecs.getincrementaldecoder(options.encoding)()
+        except LookupError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Неизвестная кодировка: {options.encoding}",
+            )
+        self._reader = csv.DictReader(self._lines(), delimiter=options.delimiter)
+
+    def _error(self, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Строка {self.line} файла: {detail}",
+        )
+
+    def _lines(self) -> Iterator[str]:
+        try:
+            for raw in self.file:
+                self.line += 1
+                yield self._decoder.decode(raw)
+            tail = self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise self._error(f"не удалось декодировать как {self.encoding}")
+        if tail:
+            yield tail
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        while True:
+            try:
+                row = next(self._reader)
+            except StopIteration:
+                return
+            except csv.Error as exc:
+                raise self._error(str(exc))
+            yield row
+
+
+def check_csv(file: BinaryIO, options: TransactionImportOptions) -> None:
+    """
+    Проверяет кодировку и формат всего файла и возвращается к началу.
+    Вызывается до начала потокового ответа, пока ещё можно ответить 400.
+    """
+    for _ in CsvRows(file, options):
+        pass
+    file.seek(0)
+
+
+def parse_batch(
+    rows: Iterator[Tuple[int, Dict[str, str]]],
+    size: int,
+    options: TransactionImportOptions,
+) -> Tuple[int, List[Tuple[int, TransactionCreate]], List[Tuple[int, str]]]:
+    """
+    Читает и валидирует очередную пачку строк: (прочитано, валидные, ошибки).
+    Синхронная — выполняется в пуле потоков.
+    """
+    batch = list(islice(rows, size))
+    valid, errors = [], []
+    for line, raw in batch:
+        try:
+            valid.append((line, row_to_transaction(raw, options)))
+        except (ValueError, ValidationError) as exc:
+            errors.append((line, _error_detail(exc)))
+    return len(batch), valid, errors
+
+
+def _error_detail(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        error = exc.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        return f"{location}: {error['msg']}" if location else error["msg"]
+    return str(exc)
+
+
+class TransactionImportService(TransactionService):
+    """
+    Импорт выписок. Файл читается потоком и обрабатывается пачками по
+    transactions_import_batch_size строк: разбор и валидация (в пуле
+    потоков, чтобы не блокировать event loop), создание недостающих
+    категорий, COPY пачки во временную staging-таблицу и один merge-запрос
+    с дедупликацией по content_hash. Весь импорт — одна транзакция:
+    при ошибке или обрыве соединения не остаётся частично загруженных данных.
+    """
+
+    async def import_csv(
+        self,
+        user_id: int,
+        file: BinaryIO,
+        options: TransactionImportOptions,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[TransactionImportProgress]:
+        """
+        Выполняет импорт и после каждой пачки отдаёт накопленный прогресс;
+        последний элемент (done=True) содержит ошибки строк.
+        """
+        batch_size = batch_size or settings.transactions_import_batch_size
+        progress = TransactionImportProgress()
+        errors: List[TransactionBulkError] = []
+
+        for statement in CREATE_TEMP_TABLES:
+            await self.db.execute(text(statement))
+        max_id = await self.db.scalar(select(func.coalesce(func.max(Transaction.id), 0)))
+
+        rows = enumerate(CsvRows(file, options), start=1)
+        while True:
+            count, valid, invalid = await run_in_threadpool(
+                parse_batch, rows, batch_size, options
+            )
+            if not count:
+                break
+            progress.invalid += len(invalid)
+            for line, detail in invalid:
+                if len(errors) < settings.transactions_import_max_errors:
+                    errors.append(TransactionBulkError(index=line, detail=detail))
+            records = [self._staging_record(line, data) for line, data in valid]
+
+            progress.rows += count
+            if records:
+                progress.categories_created += await self._create_categories(
+                    user_id, {record[-1] for record in records if record[-1]}
+                )
+                imported = await self._load(user_id, records, max_id)
+                progress.imported += imported
+                progress.duplicates += len(records) - imported
+            yield progress.model_copy()
+
+        if progress.imported:
+            invalidate_analytics(self.db, user_id)
+            record_write(self.db, user_id)
+        await commit(self.db)
+        yield progress.model_copy(update={"done": True, "errors": errors})
+
+    @staticmethod
+    def _staging_record(line: int, data: TransactionCreate) -> Tuple:
+        timestamp = data.timestamp or datetime.now(tz=timezone.utc)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return (
+            line,
+            timestamp,
+            data.item,
+            data.quantity,
+            data.location,
+            data.amount,
+            data.payment_method.value,
+            data.payment_type.value,
+            data.category_name,
+        )
+
+    async def _create_categories(self, user_id: int, names: set) -> int:
+        """
+        Создаёт отсутствующие категории одним INSERT ... ON CONFLICT DO NOTHING
+        (BaseDb.upsert_many), возвращает число созданных.
+        """
+        created = await self.base_db.upsert_many(
+            [{"user_id": user_id, "name": name} for name in names],
+            Category,
+            index_elements=["user_id", "name"],
+            update_fields=[],
+        )
+        return len(created)
+
+    async def _load(self, user_id: int, records: List[Tuple], max_id: int) -> int:
+        """
+        COPY пачки в staging, merge в transactions, обновление rollup.
+        Возвращает число вставленных строк.
+        """
+        await self.db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            STAGING_TABLE, records=records, columns=STAGING_COLUMNS
+        )
+        inserted = (
+            await self.db.execute(MERGE, {"user_id": user_id, "max_id": max_id})
+        ).all()
+        await self.rollup.apply(inserted)
+        return len(inserted)
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import async_session
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "transactions_p"
+DEFAULT_PARTITION = "transactions_default"
+SHADOW_TABLE = "transactions_partitioned"
+LEGACY_TABLE = "transactions_legacy"
+
+# Одна пачка онлайн-переноса. FOR SHARE ждёт параллельные UPDATE/DELETE
+# переносимых строк и не даёт им пройти до коммита пачки: иначе устаревшая
+# версия строки могла бы попасть в копию после того, как триггер уже
+# отзеркалил изменение. ON CONFLICT пропускает строки, уже записанные триггером.
+BACKFILL_BATCH = text(
+    f"""
+    WITH batch AS (
+        SELECT * FROM transactions
+        WHERE id > :last_id AND id <= :target_id
+        ORDER BY id
+        LIMIT :batch_size
+        FOR SHARE
+    ),
+    copied AS (
+        INSERT INTO {SHADOW_TABLE} SELECT * FROM batch
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT max(batch.id) AS last_id, (SELECT count(*) FROM copied) AS copied
+    FROM batch
+    """
+)
+
+
+class Partition(NamedTuple):
+    name: str
+    month: date
+    rows: int
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class TransactionPartitionService:
+    """
+    Обслуживание помесячных секций transactions (миграции a3d5f7b9c1e2,
+    f2b4d6e8a0c1): создание будущих секций, онлайн-перенос данных
+    в секционированную таблицу и отсоединение старых секций.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def parent(self) -> Optional[str]:
+        """
+        Секционированная таблица: transactions_partitioned до переключения,
+        transactions после; None, если миграция не применена.
+        """
+        return await self.db.scalar(
+            text(
+                "SELECT inhparent::regclass::text FROM pg_inherits "
+                "WHERE inhrelid = to_regclass(:name)"
+            ),
+            {"name": DEFAULT_PARTITION},
+        )
+
+    async def ensure_partitions(
+        self, months_ahead: Optional[int] = None, today: Optional[date] = None
+    ) -> List[str]:
+        """
+        Создаёт недостающие секции с текущего месяца на months_ahead вперёд.
+        Возвращает имена созданных.
+        """
+        if await self.parent() is None:
+            return []
+        months_ahead = (
+            settings.transactions_partition_months_ahead
+            if months_ahead is None
+            else months_ahead
+        )
+        today = today or datetime.now(tz=timezone.utc).date()
+        current = today.replace(day=1)
+        created = []
+        for offset in range(months_ahead + 1):
+            name = await self.db.scalar(
+                text("SELECT create_transaction_partition(:month)"),
+                {"month": add_months(current, offset)},
+            )
+            if name is not None:
+                created.append(name)
+        return created
+
+    async def list_partitions(self) -> List[Partition]:
+        """Помесячные секции (без секции по умолчанию) по возрастанию месяца."""
+        parent = await self.parent()
+        if parent is None:
+            return []
+        result = await self.db.execute(
+            text(
+                "SELECT c.relname, c.reltuples::bigint AS rows "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent) AND c.relname LIKE :pattern "
+                "ORDER BY c.relname"
+            ),
+            {"parent": parent, "pattern": f"{PARTITION_PREFIX}%"},
+        )
+        return [
+            Partition(
+                name=row.relname,
+                month=datetime.strptime(
+                    row.relname[len(PARTITION_PREFIX):], "%Y%m"
+                ).date(),
+                rows=max(row.rows, 0),
+            )
+            for row in result
+        ]
+
+    async def backfill_batch(self, batch_size: int) -> Tuple[int, int, int]:
+        """
+        Переносит очередную пачку строк transactions в секционированную копию.
+        Прогресс хранится в transactions_partition_backfill, поэтому перенос
+        можно прерывать и продолжать. Возвращает (copied, last_id, target_id).
+        """
+        await self.db.execute(
+            text(
+                "INSERT INTO transactions_partition_backfill (id, target_id, last_id) "
+                "SELECT 1, coalesce(max(id), 0), 0 FROM transactions "
+                "ON CONFLICT (id) DO NOTHING"
+            )
+        )
+        state = (
+            await self.db.execute(
+                text(
+                    "SELECT target_id, last_id FROM transactions_partition_backfill "
+                    "WHERE id = 1 FOR UPDATE"
+                )
+            )
+        ).one()
+        if state.last_id >= state.target_id:
+            return 0, state.last_id, state.target_id
+
+        batch = (
+            await self.db.execute(
+                BACKFILL_BATCH,
+                {
+                    "last_id": state.last_id,
+                    "target_id": state.target_id,
+                    "batch_size": batch_size,
+                },
+            )
+        ).one()
+        last_id = state.target_id if batch.last_id is None else batch.last_id
+        await self.db.execute(
+            text(
+                "UPDATE transactions_partition_backfill SET last_id = :last_id, "
+                "finished_at = CASE WHEN :last_id >= target_id THEN now() END "
+                "WHERE id = 1"
+            ),
+            {"last_id": last_id},
+        )
+        return batch.copied, last_id, state.target_id
+
+    async def expired_partitions(
+        self, months: int, today: Optional[date] = None
+    ) -> List[Partition]:
+        """Секции, целиком лежащие раньше, чем months месяцев назад."""
+        today = today or datetime.now(tz=timezone.utc).date()
+        cutoff = add_months(today.replace(day=1), -months)
+        return [
+            partition
+            for partition in await self.list_partitions()
+            if add_months(partition.month, 1) <= cutoff
+        ]
+
+    async def detach(self, partition: str, drop: bool = False) -> None:
+        """
+        Отсоединяет секцию и переносит её в схему transactions_archive_schema
+        (или удаляет, если drop). Строки пропадают из transactions, но остаются
+        учтёнными в rollup-таблицах: топ категорий, дневные траты и цели
+        (источник — rollup) их по-прежнему учитывают. total_sum, списки
+        и экспорт читают transactions и покрывают лишь хранимые месяцы.
+        DETACH ... CONCURRENTLY несовместим с секцией по умолчанию, поэтому
+        отсоединение — короткая блокировка родителя с lock_timeout;
+        коммитить стоит после каждой секции.
+        """
+        parent = await self.parent()
+        await self.db.execute(text("SET LOCAL lock_timeout = '5s'"))
+        await self.db.execute(
+            text(f'ALTER TABLE {parent} DETACH PARTITION "{partition}"')
+        )
+        if drop:
+            await self.db.execute(text(f'DROP TABLE "{partition}"'))
+            return
+        schema = settings.transactions_archive_schema
+        await self.db.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        await self.db.execute(text(f'ALTER TABLE "{partition}" SET SCHEMA "{schema}"'))
+
+    async def drop_legacy(self) -> bool:
+        """
+        Удаляет старую несекционированную таблицу после переключения
+        (после этого миграцию f2b4d6e8a0c1 откатить нельзя).
+        """
+        if await self.db.scalar(text(f"SELECT to_regclass('{LEGACY_TABLE}')")) is None:
+            return False
+        await self.db.execute(text("DROP TRIGGER transactions_mirror ON transactions"))
+        await self.db.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        return True
+
+
+class PartitionMaintenance:
+    """
+    Фоновая задача воркера: при старте и раз в
+    transactions_partition_interval_hours создаёт будущие секции.
+    Под gunicorn включена только в одном воркере (enabled, см.
+    gunicorn.conf.py); параллельные вызовы при этом всё равно безопасны.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if settings.transactions_partition_maintenance and self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with async_session() as session:
+                    created = await TransactionPartitionService(
+                        session
+                    ).ensure_partitions()
+                    await session.commit()
+                if created:
+                    logger.info("created transaction partitions: %s", ", ".join(created))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("transaction partition maintenance failed")
+            await asyncio.sleep(settings.transactions_partition_interval_hours * 3600)
+
+
+partition_maintenance = PartitionMaintenance()
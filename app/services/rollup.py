@@ -0,0 +1,237 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import (
+    DailyUserCategoryTotal,
+    MonthlyUserCategoryTotal,
+    Transaction,
+    UserCategoryTotal,
+)
+from app.schemas.transaction import PaymentType
+
+
+def utc_day(timestamp: datetime) -> date:
+    """
+    День транзакции в UTC. Наивные datetime считаются UTC
+    (по умолчанию timestamp заполняется datetime.utcnow()).
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def utc_day_sql(column):
+    """
+    SQL-аналог utc_day для колонки timestamptz.
+    """
+    return func.date(func.timezone("UTC", column))
+
+
+def _upsert_cte(table, rows: List[dict], conflict: Dict[str, Any], name: str):
+    """
+    INSERT ... ON CONFLICT DO UPDATE, прибавляющий total_amount/txn_count,
+    оформленный как CTE, чтобы несколько таблиц обновлялись одним запросом.
+    """
+    stmt = pg_insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        **conflict,
+        set_={
+            "total_amount": table.c.total_amount + stmt.excluded.total_amount,
+            "txn_count": table.c.txn_count + stmt.excluded.txn_count,
+        },
+    )
+    return stmt.cte(name)
+
+
+class DailyRollupService:
+    """
+    Инкрементальное ведение агрегатов по транзакциям:
+    - daily_user_category_totals — дни × категории × тип платежа;
+    - user_category_totals — расходы по категории за всё время;
+    - monthly_user_category_totals — расходы по категории за месяц.
+    Методы не коммитят: изменения попадают в транзакцию вызывающего сервиса.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def apply(self, transactions: Iterable[Any], sign: int = 1) -> None:
+        """
+        Добавляет (sign=1) или вычитает (sign=-1) транзакции из агрегатов.
+        Пачка сворачивается по ключам в Python, все три таблицы обновляются
+        одним запросом из data-modifying CTE с INSERT ... ON CONFLICT DO UPDATE.
+        """
+        daily: Dict[Tuple, list] = defaultdict(lambda: [Decimal(0), 0])
+        for txn in transactions:
+            key = (
+                txn.user_id,
+                utc_day(txn.timestamp),
+                txn.category_id,
+                str(getattr(txn.payment_type, "value", txn.payment_type)),
+            )
+            daily[key][0] += Decimal(txn.amount) * sign
+            daily[key][1] += sign
+        if not daily:
+            return
+
+        all_time: Dict[Tuple, list] = defaultdict(lambda: [Decimal(0), 0])
+        monthly: Dict[Tuple, list] = defaultdict(lambda: [Decimal(0), 0])
+        for (user_id, day, category_id, payment_type), (total, count) in daily.items():
+            if category_id is None or payment_type != PaymentType.expense.value:
+                continue
+            for bucket, key in (
+                (all_time, (user_id, category_id)),
+                (monthly, (user_id, day.replace(day=1), category_id)),
+            ):
+                bucket[key][0] += total
+                bucket[key][1] += count
+
+        ctes = [
+            _upsert_cte(
+                DailyUserCategoryTotal.__table__,
+                [
+                    {
+                        "user_id": user_id,
+                        "day": day,
+                        "category_id": category_id,
+                        "payment_type": payment_type,
+                        "total_amount": total,
+                        "txn_count": count,
+                    }
+                    for (user_id, day, category_id, payment_type), (total, count)
+                    in daily.items()
+                ],
+                {"constraint": "uq_daily_user_category_totals"},
+                "daily",
+            )
+        ]
+        if all_time:
+            ctes.append(
+                _upsert_cte(
+                    UserCategoryTotal.__table__,
+                    [
+                        {
+                            "user_id": user_id,
+                            "category_id": category_id,
+                            "total_amount": total,
+                            "txn_count": count,
+                        }
+                        for (user_id, category_id), (total, count) in all_time.items()
+                    ],
+                    {"index_elements": ["user_id", "category_id"]},
+                    "all_time",
+                )
+            )
+            ctes.append(
+                _upsert_cte(
+                    MonthlyUserCategoryTotal.__table__,
+                    [
+                        {
+                            "user_id": user_id,
+                            "month": month,
+                            "category_id": category_id,
+                            "total_amount": total,
+                            "txn_count": count,
+                        }
+                        for (user_id, month, category_id), (total, count)
+                        in monthly.items()
+                    ],
+                    {"index_elements": ["user_id", "month", "category_id"]},
+                    "monthly",
+                )
+            )
+        await self.db.execute(select(literal(1)).add_cte(*ctes))
+
+    async def backfill(self, user_id: Optional[int] = None) -> None:
+        """
+        Пересчитывает агрегаты целиком (или для одного пользователя):
+        дневные суммы — из transactions, накопительные — из дневных.
+        """
+        day = utc_day_sql(Transaction.timestamp)
+        source = select(
+            Transaction.user_id,
+            day,
+            Transaction.category_id,
+            Transaction.payment_type,
+            func.sum(Transaction.amount),
+            func.count(),
+        )
+        if user_id is not None:
+            source = source.where(Transaction.user_id == user_id)
+        source = source.group_by(
+            Transaction.user_id,
+            day,
+            Transaction.category_id,
+            Transaction.payment_type,
+        )
+
+        for model in (
+            DailyUserCategoryTotal,
+            UserCategoryTotal,
+            MonthlyUserCategoryTotal,
+        ):
+            clear = delete(model)
+            if user_id is not None:
+                clear = clear.where(model.user_id == user_id)
+            await self.db.execute(clear)
+
+        await self.db.execute(
+            insert(DailyUserCategoryTotal).from_select(
+                [
+                    "user_id",
+                    "day",
+                    "category_id",
+                    "payment_type",
+                    "total_amount",
+                    "txn_count",
+                ],
+                source,
+            )
+        )
+
+        expenses = [
+            DailyUserCategoryTotal.payment_type == PaymentType.expense.value,
+            DailyUserCategoryTotal.category_id.is_not(None),
+        ]
+        if user_id is not None:
+            expenses.append(DailyUserCategoryTotal.user_id == user_id)
+        month = func.date(func.date_trunc("month", DailyUserCategoryTotal.day))
+        await self.db.execute(
+            insert(UserCategoryTotal).from_select(
+                ["user_id", "category_id", "total_amount", "txn_count"],
+                select(
+                    DailyUserCategoryTotal.user_id,
+                    DailyUserCategoryTotal.category_id,
+                    func.sum(DailyUserCategoryTotal.total_amount),
+                    func.sum(DailyUserCategoryTotal.txn_count),
+                )
+                .where(*expenses)
+                .group_by(
+                    DailyUserCategoryTotal.user_id, DailyUserCategoryTotal.category_id
+                ),
+            )
+        )
+        await self.db.execute(
+            insert(MonthlyUserCategoryTotal).from_select(
+                ["user_id", "month", "category_id", "total_amount", "txn_count"],
+                select(
+                    DailyUserCategoryTotal.user_id,
+                    month,
+                    DailyUserCategoryTotal.category_id,
+                    func.sum(DailyUserCategoryTotal.total_amount),
+                    func.sum(DailyUserCategoryTotal.txn_count),
+                )
+                .where(*expenses)
+                .group_by(
+                    DailyUserCategoryTotal.user_id,
+                    month,
+                    DailyUserCategoryTotal.category_id,
+                ),
+            )
+        )
@@ -1,18 +1,59 @@
-from typing import List, Optional, Dict
-from datetime import datetime, date, timedelta
+import base64
+from typing import AsyncIterator, List, Optional, Dict, Sequence, Tuple, Union
+from datetime import datetime, date, timedelta, timezone
 from fastapi import HTTPException, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert, delete, and_, or_
 
-from app.models.user import Transaction, Category
-from app.schemas.transaction import TransactionCreate
+from app.models.user import (
+    Transaction,
+    Category,
+    DailyUserCategoryTotal,
+    MonthlyUserCategoryTotal,
+    UserCategoryTotal,
+)
+from app.schemas.transaction import (
+    TransactionCreate,
+    TransactionBulkError,
+    TransactionBulkResponse,
+    TransactionResponse,
+    TransactionPage,
+    PaymentType,
+    ForecastResponse,
+    TotalsBreakdownItem,
+    TotalsResponse,
+)
 from app.core.database import get_session
-from app.core.settings import default_categories
+from app.core.replica import get_read_session, record_write
+from app.core.settings import settings
+from app.services.analytics_cache import invalidate_analytics
+from app.services.category_cache import category_cache
+from app.services.database import BaseDb, PostgresqlEngine
+from app.services.forecast import ForecastService
+from app.services.rollup import DailyRollupService, utc_day
+
+
+def _encode_cursor(timestamp: datetime, transaction_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, transaction_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(transaction_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
 
 
 class TransactionService:
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
+        self.base_db = BaseDb(PostgresqlEngine(db_session))
+        self.rollup = DailyRollupService(db_session)
 
     async def get_transactions(
         self,
@@ -27,18 +68,93 @@ class TransactionService:
         :param date_from: начальная дата (включительно)
         :param date_to: конечная дата (включительно)
         """
-        stmt = select(Transaction).where(Transaction.user_id == user_id)
-        if date_from and date_to:
+        stmt = self._transactions_query(user_id, date_from, date_to)
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_transactions_page(
+        self,
+        user_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> TransactionPage:
+        """
+        Возвращает страницу транзакций пользователя (keyset-пагинация).
+        Порядок: timestamp DESC, id ASC. next_cursor указывает на последнюю
+        строку страницы и передаётся в следующий запрос как cursor.
+        """
+        stmt = self._transactions_query(user_id, date_from, date_to)
+        if cursor:
+            timestamp, transaction_id = _decode_cursor(cursor)
             stmt = stmt.where(
-                Transaction.timestamp >= date_from, Transaction.timestamp <= date_to
+                or_(
+                    Transaction.timestamp < timestamp,
+                    and_(
+                        Transaction.timestamp == timestamp,
+                        Transaction.id > transaction_id,
+                    ),
+                )
             )
-        elif date_from:
-            stmt = stmt.where(Transaction.timestamp >= date_from)
-        elif date_to:
-            stmt = stmt.where(Transaction.timestamp <= date_to)
+        stmt = stmt.order_by(Transaction.timestamp.desc(), Transaction.id).limit(
+            limit + 1
+        )
+        result = await self.db.scalars(stmt)
+        rows = result.all()
 
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].timestamp, rows[-1].id)
+        return TransactionPage(
+            items=[TransactionResponse.model_validate(txn) for txn in rows],
+            next_cursor=next_cursor,
+        )
+
+    async def stream_transactions(
+        self,
+        user_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[Sequence[Transaction]]:
+        """
+        Читает транзакции пользователя серверным курсором и отдаёт их пачками
+        по chunk_size строк, не загружая всю историю в память.
+        """
+        chunk_size = chunk_size or settings.transactions_stream_chunk_size
+        stmt = (
+            self._transactions_query(user_id, date_from, date_to)
+            .order_by(Transaction.timestamp.desc(), Transaction.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream_scalars(stmt)
+        async for chunk in result.partitions(chunk_size):
+            yield chunk
+
+    @staticmethod
+    def _transactions_query(
+        user_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ):
+        return select(Transaction).where(
+            *TransactionService._period_filters(user_id, date_from, date_to)
+        )
+
+    @staticmethod
+    def _period_filters(
+        user_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> list:
+        filters = [Transaction.user_id == user_id]
+        if date_from:
+            filters.append(Transaction.timestamp >= date_from)
+        if date_to:
+            filters.append(Transaction.timestamp <= date_to)
+        return filters
 
     async def get_transaction(self, transaction_id: int, user_id: int) -> Transaction:
         """
@@ -58,41 +174,175 @@ class TransactionService:
         Создаёт новую транзакцию для пользователя.
         """
         category_id: Optional[int] = None
+        cached = False
         if data.category_name:
-            q = select(Category).where(
+            category_id = category_cache.get(user_id, data.category_name)
+            cached = category_id is not None
+        if data.category_name and category_id is None:
+            q = select(Category.id).where(
                 Category.user_id == user_id, Category.name == data.category_name
             )
             res = await self.db.execute(q)
-            category = res.scalars().first()
-            if not category:
+            category_id = res.scalar()
+            if category_id is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Category '{data.category_name}' not found for user",
                 )
-            category_id = category.id
-        txn = Transaction(
-            user_id=user_id,
-            category_id=category_id,
-            item=data.item,
-            quantity=data.quantity,
-            location=data.location,
-            amount=data.amount,
-            timestamp=data.timestamp or datetime.utcnow(),
-            payment_method=data.payment_method,
-            payment_type=data.payment_type,
-        )
-        self.db.add(txn)
-        await self.db.commit()
-        await self.db.refresh(txn)
+            category_cache.set(user_id, data.category_name, category_id)
+        values = self._transaction_values(user_id, data, category_id)
+        if cached:
+            values["category_id"] = self._checked_category_id(
+                user_id, data.category_name, category_id
+            )
+        stmt = insert(Transaction).values(values).returning(Transaction)
+        txn = (await self.db.scalars(stmt)).one()
+        if cached and txn.category_id is None:
+            # категорию удалили или переименовали: строку убираем и
+            # резолвим имя заново по БД (404, если категории больше нет)
+            await self._discard_stale([txn], user_id, [data.category_name])
+            return await self.create_transaction(user_id, data)
+        await self.rollup.apply([txn])
+        invalidate_analytics(self.db, user_id)
+        record_write(self.db, user_id)
         return txn
 
+    async def create_transactions_bulk(
+        self, user_id: int, items: List[TransactionCreate]
+    ) -> TransactionBulkResponse:
+        """
+        Массово создаёт транзакции пользователя.
+        Все category_name резолвятся одним запросом, валидные строки вставляются
+        многострочным INSERT ... RETURNING (BaseDb.create_many). Строки с ошибками не прерывают
+        пакет и возвращаются в errors с индексом исходного элемента.
+        """
+        if len(items) > settings.transactions_bulk_limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch size exceeds {settings.transactions_bulk_limit} items",
+            )
+
+        names = {item.category_name for item in items if item.category_name}
+        category_ids: Dict[str, int] = {}
+        for name in names:
+            category_id = category_cache.get(user_id, name)
+            if category_id is not None:
+                category_ids[name] = category_id
+        cached = dict(category_ids)
+        missing = names - category_ids.keys()
+        if missing:
+            res = await self.db.execute(
+                select(Category.name, Category.id).where(
+                    Category.user_id == user_id, Category.name.in_(missing)
+                )
+            )
+            for row in res:
+                category_ids[row.name] = row.id
+                category_cache.set(user_id, row.name, row.id)
+
+        rows = []
+        errors = []
+        for index, item in enumerate(items):
+            if item.category_name and item.category_name not in category_ids:
+                errors.append(
+                    TransactionBulkError(
+                        index=index,
+                        detail=f"Category '{item.category_name}' not found for user",
+                    )
+                )
+                continue
+            values = self._transaction_values(
+                user_id, item, category_ids.get(item.category_name)
+            )
+            if item.category_name in cached:
+                values["category_id"] = self._checked_category_id(
+                    user_id, item.category_name, cached[item.category_name]
+                )
+            rows.append(values)
+
+        created = []
+        if rows:
+            result = await self.base_db.create_many(rows, Transaction)
+            found = {txn.category_id for txn in result}
+            stale = [
+                name for name, category_id in cached.items() if category_id not in found
+            ]
+            if stale:
+                # часть id из кэша устарела: пакет убираем и повторяем,
+                # устаревшие имена резолвятся уже по БД
+                await self._discard_stale(result, user_id, stale)
+                return await self.create_transactions_bulk(user_id, items)
+            created = [TransactionResponse.model_validate(txn) for txn in result]
+            await self.rollup.apply(created)
+            invalidate_analytics(self.db, user_id)
+            record_write(self.db, user_id)
+        return TransactionBulkResponse(created=created, errors=errors)
+
+    @staticmethod
+    def _checked_category_id(user_id: int, name: str, category_id: int):
+        """
+        Id категории из кэша проверяется в самом INSERT: если категорию
+        удалили или переименовали, подзапрос вернёт NULL вместо нарушения FK.
+        """
+        return (
+            select(Category.id)
+            .where(
+                Category.id == category_id,
+                Category.user_id == user_id,
+                Category.name == name,
+            )
+            .scalar_subquery()
+        )
+
+    async def _discard_stale(
+        self, created: Sequence[Transaction], user_id: int, names: Sequence[str]
+    ) -> None:
+        """
+        Удаляет только что вставленные строки (rollup к ним ещё не применён)
+        и сбрасывает устаревшие записи кэша категорий.
+        """
+        await self.db.execute(
+            delete(Transaction).where(Transaction.id.in_([txn.id for txn in created]))
+        )
+        for name in names:
+            category_cache.invalidate(user_id, name)
+
+    @staticmethod
+    def _transaction_values(
+        user_id: int, data: TransactionCreate, category_id: Optional[int]
+    ) -> dict:
+        """
+        Значения колонок новой транзакции из входной схемы.
+        """
+        return {
+            "user_id": user_id,
+            "category_id": category_id,
+            "item": data.item,
+            "quantity": data.quantity,
+            "location": data.location,
+            "amount": data.amount,
+            "timestamp": data.timestamp or datetime.utcnow(),
+            "payment_method": data.payment_method.value,
+            "payment_type": data.payment_type.value,
+        }
+
     async def delete_transaction(self, transaction_id: int, user_id: int) -> None:
         """
         Удаляет транзакцию по ID, если она принадлежит пользователю.
         """
-        txn = await self.get_transaction(transaction_id, user_id)
-        await self.db.delete(txn)
-        await self.db.commit()
+        stmt = (
+            delete(Transaction)
+            .where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+            .returning(Transaction)
+        )
+        txn = (await self.db.scalars(stmt)).first()
+        if txn is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
+            )
+        await self.rollup.apply([txn], sign=-1)
+        invalidate_analytics(self.db, user_id)
+        record_write(self.db, user_id)
 
 
 class AnalyticsService(TransactionService):
@@ -106,12 +356,49 @@ class AnalyticsService(TransactionService):
         user_id: int,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-    ) -> float:
+        by_payment_method: bool = False,
+    ) -> TotalsResponse:
         """
-        Возвращает общую сумму потраченных средств пользователем.
+        Возвращает суммы расходов и доходов пользователя за период.
+        Считается одним агрегирующим запросом с группировкой по payment_type
+        (и payment_method, если by_payment_method=True) по transactions
+        с точными границами периода, поэтому месяцы, отсоединённые по
+        retention (app/services/partitions.py), в сумму не входят.
         """
-        transactions = await self.get_transactions(user_id, date_from, date_to)
-        return sum(txn.amount for txn in transactions)
+        group_by = [Transaction.payment_type]
+        if by_payment_method:
+            group_by.append(Transaction.payment_method)
+        stmt = (
+            select(
+                *group_by,
+                func.sum(Transaction.amount).label("total"),
+                func.count().label("count"),
+            )
+            .where(*self._period_filters(user_id, date_from, date_to))
+            .group_by(*group_by)
+            .order_by(*group_by)
+        )
+        result = await self.db.execute(stmt)
+        rows = result.all()
+
+        totals = {PaymentType.expense.value: 0.0, PaymentType.income.value: 0.0}
+        breakdown = []
+        for row in rows:
+            total = float(row.total)
+            totals[row.payment_type] = totals.get(row.payment_type, 0.0) + total
+            breakdown.append(
+                TotalsBreakdownItem(
+                    payment_type=row.payment_type,
+                    payment_method=row.payment_method if by_payment_method else None,
+                    total=total,
+                    count=row.count,
+                )
+            )
+        return TotalsResponse(
+            total_spent=totals[PaymentType.expense.value],
+            total_income=totals[PaymentType.income.value],
+            breakdown=breakdown,
+        )
 
     async def get_top_categories(
         self,
@@ -122,24 +409,45 @@ class AnalyticsService(TransactionService):
     ) -> List[Dict[str, float]]:
         """
         Возвращает топ N категорий по сумме трат.
-        Формат: [{'category_id': int, 'total_spent': float}, ...]
+        Без границ периода читает user_category_totals, для текущего месяца
+        (date_from — его первый день, date_to не задан) —
+        monthly_user_category_totals: это index-only top-N без агрегации.
+        Произвольный период считается по дневному rollup, поэтому
+        его границы округляются до дня (UTC).
+        Формат: [{'category_name': str, 'total_spent': float}, ...]
         """
-
-        stmt = (
-            select(
-                Category.name.label('category_name'),
-                func.sum(Transaction.amount).label('total_spent')
+        month_start = datetime.now(tz=timezone.utc).date().replace(day=1)
+        if date_from is None and date_to is None:
+            stmt = self._top_from_totals(
+                UserCategoryTotal, [UserCategoryTotal.user_id == user_id], n
+            )
+        elif (
+            date_to is None
+            and date_from is not None
+            and utc_day(date_from) == month_start
+        ):
+            stmt = self._top_from_totals(
+                MonthlyUserCategoryTotal,
+                [
+                    MonthlyUserCategoryTotal.user_id == user_id,
+                    MonthlyUserCategoryTotal.month == month_start,
+                ],
+                n,
+            )
+        else:
+            total = func.sum(DailyUserCategoryTotal.total_amount)
+            stmt = (
+                select(
+                    Category.name.label('category_name'),
+                    total.label('total_spent'),
+                )
+                .join(Category, DailyUserCategoryTotal.category_id == Category.id)
+                .where(*self._expense_rollup_filters(user_id, date_from, date_to))
+                .group_by(Category.name)
+                .having(func.sum(DailyUserCategoryTotal.txn_count) > 0)
+                .order_by(total.desc())
+                .limit(n)
             )
-            .join(Category, Transaction.category_id == Category.id)
-            .where(Transaction.user_id == user_id)
-        )
-        if date_from:
-            stmt = stmt.where(Transaction.timestamp >= date_from)
-        if date_to:
-            stmt = stmt.where(Transaction.timestamp <= date_to)
-        stmt = stmt.group_by(Category.name)
-        stmt = stmt.order_by(func.sum(Transaction.amount).desc())
-        stmt = stmt.limit(n)
 
         result = await self.db.execute(stmt)
         rows = result.all()
@@ -148,32 +456,43 @@ class AnalyticsService(TransactionService):
             for row in rows
         ]
 
+    @staticmethod
+    def _top_from_totals(model, filters, n: int):
+        """
+        Top-N по накопительной таблице: строки уже агрегированы по категории,
+        порядок отдаёт индекс (user_id, ..., total_amount DESC).
+        """
+        return (
+            select(
+                Category.name.label('category_name'),
+                model.total_amount.label('total_spent'),
+            )
+            .join(Category, model.category_id == Category.id)
+            .where(*filters, model.txn_count > 0)
+            .order_by(model.total_amount.desc())
+            .limit(n)
+        )
+
     async def get_daily_spending(
         self, user_id: int, days_back: int = 30
     ) -> List[Dict[str, float]]:
         """
         Динамика ежедневных трат за последние days_back дней.
         Формат: [{'date': 'YYYY-MM-DD', 'total_spent': float}, ...]
+        Дни — UTC, как и ключи дневного rollup.
         """
-        end_date = date.today()
+        end_date = utc_day(datetime.now(timezone.utc))
         start_date = end_date - timedelta(days=days_back)
 
         stmt = (
             select(
-                func.date(Transaction.timestamp).label("date"),
-                func.sum(Transaction.amount).label("total_spent"),
+                DailyUserCategoryTotal.day.label("date"),
+                func.sum(DailyUserCategoryTotal.total_amount).label("total_spent"),
             )
-            .where(
-                Transaction.user_id == user_id,
-                Transaction.timestamp
-                >= datetime.combine(start_date, datetime.min.time()),
-                Transaction.timestamp
-                <= datetime.combine(end_date, datetime.max.time()),
-            )
-            .group_by(func.date(Transaction.timestamp))
+            .where(*self._expense_rollup_filters(user_id, start_date, end_date))
+            .group_by(DailyUserCategoryTotal.day)
+            .order_by(DailyUserCategoryTotal.day)
         )
-
-        stmt = stmt.order_by(func.date(Transaction.timestamp))
         result = await self.db.execute(stmt)
         rows = result.all()
         # заполняем пропущенные дни
@@ -190,43 +509,61 @@ class AnalyticsService(TransactionService):
         self, user_id: int, date_from: datetime = None
     ) -> float:
         """
-        Прогноз суммы трат до конца текущего месяца на основе среднего дневного расхода.
-        Если date_from указан, расчёт от этой даты; иначе — с начала месяца.
+        Прогноз суммы трат с сегодняшнего дня до конца текущего месяца
+        (см. app.services.forecast: недельная сезонность, экспоненциальное
+        сглаживание, регулярные платежи). Если date_from указан, уровень
+        и сезонность оцениваются по истории начиная с этой даты.
         """
-        today = date.today()
-        # начало расчёта
-        if date_from:
-            start = date_from.date()
-        else:
-            start = today.replace(day=1)
+        forecast = await self.forecast(user_id, date_from)
+        return forecast.remaining
 
-        # получаем реальные траты с start по today
-        stmt = select(func.sum(Transaction.amount)).where(
-            Transaction.user_id == user_id,
-            Transaction.timestamp >= datetime.combine(start, datetime.min.time()),
-            Transaction.timestamp <= datetime.combine(today, datetime.max.time()),
-        )
-        result = await self.db.execute(stmt)
-        total_spent = result.scalar() or 0.0
+    async def forecast(
+        self, user_id: int, date_from: datetime = None
+    ) -> ForecastResponse:
+        """
+        Прогноз до конца месяца с доверительным интервалом и выделенными
+        регулярными платежами.
+        """
+        return await ForecastService(self.db).forecast_user(user_id, date_from)
 
-        days_used = (today - start).days + 1
-        avg_per_day = total_spent / days_used if days_used > 0 else 0.0
+    @staticmethod
+    def _expense_rollup_filters(
+        user_id: int,
+        day_from: Optional[Union[date, datetime]] = None,
+        day_to: Optional[Union[date, datetime]] = None,
+    ) -> list:
+        """
+        Фильтры по дневному rollup: расходы пользователя за дни [day_from, day_to].
+        datetime-границы приводятся к дню в UTC.
+        """
+        filters = [
+            DailyUserCategoryTotal.user_id == user_id,
+            DailyUserCategoryTotal.payment_type == PaymentType.expense.value,
+        ]
+        if isinstance(day_from, datetime):
+            day_from = utc_day(day_from)
+        if isinstance(day_to, datetime):
+            day_to = utc_day(day_to)
+        if day_from:
+            filters.append(DailyUserCategoryTotal.day >= day_from)
+        if day_to:
+            filters.append(DailyUserCategoryTotal.day <= day_to)
+        return filters
 
-        # сколько дней осталось до конца месяца
-        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
-        days_left = (next_month - today).days
 
-        forecast = avg_per_day * days_left
-        return float(forecast)
+def get_transaction_service(
+    db_session: AsyncSession = Depends(get_session, scope="function"),
+) -> TransactionService:
+    return TransactionService(db_session)
 
 
-def get_transaction_service(
-    db_session: AsyncSession = Depends(get_session),
+def get_read_transaction_service(
+    db_session: AsyncSession = Depends(get_read_session),
 ) -> TransactionService:
     return TransactionService(db_session)
 
 
 def get_analytics_service(
-    db_session: AsyncSession = Depends(get_session),
+    db_session: AsyncSession = Depends(get_read_session),
 ) -> AnalyticsService:
     return AnalyticsService(db_session)
@@ -1,43 +1,56 @@
-from functools import lru_cache
-
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
 from app.core.database import get_session
-from app.services.database import BaseDb
+from app.core.security import password_hasher
+from app.services.auth import forget_identity_on_commit
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
-from app.services.database import BaseDb, PostgresqlEngine
+from app.services.database import BaseDb, get_base_db
 
 
 class UserService:
-    def __init__(self, base_db: BaseDb) -> None:
+    def __init__(self, base_db: BaseDb, db_session: AsyncSession) -> None:
         self.base_db = base_db
+        self.db = db_session
 
     async def create_user(self, user_create: UserCreate) -> UserResponse:
-        user = User(**user_create.dict())
-        new_user = await self.base_db.create(user, User)
-        return UserResponse.from_orm(new_user)
-
-
-async def update_user(self, user_id: int, data: UserUpdate) -> UserResponse:
-    # достаем существующего пользователя
-    user = await self.base_db.get_by_pk(user_id, User)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # применяем только те поля, что пришли
-    for field, value in data.dict(exclude_unset=True).items():
-        setattr(user, field, value)
-
-    await self.base_db.commit()
-    await self.base_db.refresh(user)
-    return UserResponse.from_orm(user)
-
-
-@lru_cache()
-def get_user_service(db_session: AsyncSession = Depends(get_session)) -> UserService:
-
-    db_engine = PostgresqlEngine(db_session)
-    base_db = BaseDb(db_engine)
-    return UserService(base_db)
+        """
+        Создаёт пользователя одним INSERT ... ON CONFLICT DO NOTHING RETURNING:
+        проверка занятости email/username не требует отдельного SELECT.
+        """
+        hashed_password = await password_hasher.hash(user_create.password)
+        stmt = (
+            pg_insert(User)
+            .values(
+                **user_create.dict(exclude={"password"}),
+                hashed_password=hashed_password,
+            )
+            .on_conflict_do_nothing()
+            .returning(User.id, User.email, User.username, User.full_name)
+        )
+        new_user = (await self.base_db.execute(stmt)).first()
+        if new_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Пользователь с таким email или username уже существует",
+            )
+        return UserResponse.model_validate(new_user)
+
+    async def update_user(self, user_id: int, data: UserUpdate) -> UserResponse:
+        # применяем только те поля, что пришли
+        user = await self.base_db.update(user_id, data, User)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # профиль изменился — кэш refresh-пути больше не актуален
+        forget_identity_on_commit(self.db, user_id)
+        return UserResponse.from_orm(user)
+
+
+def get_user_service(
+    base_db: BaseDb = Depends(get_base_db),
+    db_session: AsyncSession = Depends(get_session, scope="function"),
+) -> UserService:
+    return UserService(base_db, db_session)
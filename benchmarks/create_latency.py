@@ -0,0 +1,101 @@
+"""
+p50/p99 задержки create-эндпоинтов на запущенном сервере.
+Регистрирует временного пользователя, затем последовательно создаёт
+категории, цели и транзакции.
+
+    python -m benchmarks.create_latency [--base-url http://localhost:8000] [--requests 500]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, q: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(q) - 1]
+
+
+async def timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> float:
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    return elapsed
+
+
+async def run(base_url: str, requests: int) -> None:
+    suffix = uuid.uuid4().hex[:12]
+    email = f"bench-{suffix}@example.com"
+    async with httpx.AsyncClient(base_url=f"{base_url}/api/v1") as client:
+        await client.post(
+            "/auth/create",
+            json={
+                "email": email,
+                "username": f"bench-{suffix}",
+                "full_name": "Bench",
+                "password": "bench-password",
+            },
+        )
+        tokens = (
+            await client.post(
+                "/auth/login", json={"email": email, "password": "bench-password"}
+            )
+        ).json()
+        client.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+
+        cases = {
+            "POST category": lambda i: (
+                "POST",
+                "/category/categories/",
+                {"json": {"name": f"cat-{i}", "color": "#349DCA"}},
+            ),
+            "POST goals": lambda i: (
+                "POST",
+                "/goals/goals",
+                {
+                    "json": {
+                        "name": f"goal-{i}",
+                        "amount": "1000.00",
+                        "date_goals": "2030-01-01T00:00:00",
+                    }
+                },
+            ),
+            "POST transaction": lambda i: (
+                "POST",
+                "/transaction/transactions",
+                {
+                    "json": {
+                        "category_name": "cat-0",
+                        "item": f"item-{i}",
+                        "quantity": 1,
+                        "amount": "9.99",
+                        "payment_method": "Cash",
+                        "payment_type": "Expense",
+                    }
+                },
+            ),
+        }
+        for name, build in cases.items():
+            samples = []
+            for i in range(requests):
+                method, url, kwargs = build(i)
+                samples.append(await timed(client, method, url, **kwargs))
+            print(
+                f"{name:<18} p50={percentile(samples, 50):7.2f} ms  "
+                f"p99={percentile(samples, 99):7.2f} ms"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Накладные расходы на разрешение зависимостей для типичных маршрутов.
+Запросы идут через ASGI-транспорт httpx; сессии создаются, но к БД
+не обращаются, поэтому сервер Postgres не нужен.
+
+    python -m benchmarks.dependency_overhead [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.core.jwt import get_current_payload
+from app.services.auth import AuthService, get_auth_service, get_jwt_service
+from app.services.transaction import TransactionService, get_transaction_service
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/baseline")
+    async def baseline():
+        return {}
+
+    @app.get("/payload")
+    async def payload_only(payload: dict = Depends(get_current_payload)):
+        return {}
+
+    @app.get("/auth")
+    async def auth_service(
+        payload: dict = Depends(get_current_payload),
+        service: AuthService = Depends(get_auth_service),
+    ):
+        return {}
+
+    @app.get("/transactions")
+    async def transaction_service(
+        payload: dict = Depends(get_current_payload),
+        service: TransactionService = Depends(get_transaction_service),
+    ):
+        return {}
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, headers) -> float:
+    for _ in range(100):
+        await client.get(path, headers=headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(requests: int) -> None:
+    token = get_jwt_service().create_access_token(
+        {"id": 1, "email": "bench@example.com", "pwv": "bench"}
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        baseline = await measure(client, "/baseline", requests, headers)
+        print(f"{'/baseline':<16}{baseline:8.1f} us/req")
+        for path in ("/payload", "/auth", "/transactions"):
+            elapsed = await measure(client, path, requests, headers)
+            print(f"{path:<16}{elapsed:8.1f} us/req  (+{elapsed - baseline:.1f} us DI)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
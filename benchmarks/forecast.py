@@ -0,0 +1,59 @@
+"""
+Пропускная способность пакетного прогноза (users/s) на синтетических
+дневных рядах, без БД. Для сравнения — тот же forecast_batch,
+вызываемый по одному пользователю.
+
+    python -m benchmarks.forecast [--users 10000] [--single 500]
+"""
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+
+from app.core.settings import settings
+from app.services.forecast import forecast_batch, history_start
+
+
+def synthetic_history(users: int, start: date, days: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    weekly = 1.0 + 0.4 * np.sin(2 * np.pi * ((start.weekday() + np.arange(days)) % 7) / 7)
+    history = rng.gamma(2.0, 15.0, (users, days)) * weekly
+    history *= rng.random((users, days)) < 0.7
+    dates = np.datetime64(start, "D") + np.arange(days)
+    day_of_month = (dates - dates.astype("datetime64[M]")).astype(np.int64)
+    rent_day = rng.integers(0, 28, users)
+    history[day_of_month[None, :] == rent_day[:, None]] += 500.0
+    return history
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--single", type=int, default=500)
+    args = parser.parse_args()
+
+    today = date.today()
+    start = history_start(
+        today, settings.forecast_lookback_days, settings.forecast_recurring_months
+    )
+    history = synthetic_history(args.users, start, (today - start).days)
+
+    started = time.perf_counter()
+    batch = forecast_batch(history, start, today)
+    batched = args.users / (time.perf_counter() - started)
+
+    single = min(args.single, args.users)
+    started = time.perf_counter()
+    for i in range(single):
+        forecast_batch(history[i : i + 1], start, today)
+    one_by_one = single / (time.perf_counter() - started)
+
+    print(f"history: {history.shape[1]} days")
+    print(f"batch:      {batched:,.0f} users/s")
+    print(f"one by one: {one_by_one:,.0f} users/s")
+    print(f"users with recurring payments left this month: {(batch.recurring > 0).sum()}")
+
+
+if __name__ == "__main__":
+    main()
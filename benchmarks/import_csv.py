@@ -0,0 +1,108 @@
+"""
+Пропускная способность импорта CSV (COPY в staging + merge) на 1M строк.
+
+Генерирует выписку во временный файл, импортирует её существующему
+пользователю, затем повторяет импорт того же файла (все строки должны
+оказаться дубликатами). После прогона загруженные строки удаляются,
+а агрегаты пользователя пересчитываются (если не указан --keep).
+
+    python -m benchmarks.import_csv --user-id ID [--rows 1000000] [--batch-size 10000] [--keep]
+"""
+import argparse
+import asyncio
+import csv
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+
+from app.core.database import async_session, engine
+from app.models.user import Transaction
+from app.schemas.transaction import TransactionImportOptions
+from app.services.importer import TransactionImportService
+from app.services.rollup import DailyRollupService
+
+ITEM_PREFIX = "bench-import"
+CATEGORIES = ["Еда", "Транспорт", "Развлечение", "Услуги", "Другое", "Импорт"]
+
+
+def write_statement(path: str, rows: int) -> None:
+    rng = random.Random(0)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["timestamp", "item", "amount", "payment_method", "payment_type", "category_name"]
+        )
+        for index in range(rows):
+            writer.writerow(
+                [
+                    (start + timedelta(seconds=rng.randrange(6 * 365 * 86400))).isoformat(),
+                    f"{ITEM_PREFIX}-{index % 5000}",
+                    f"{rng.uniform(1, 5000):.2f}",
+                    "Debit Card",
+                    "Expense" if rng.random() < 0.9 else "Income",
+                    rng.choice(CATEGORIES),
+                ]
+            )
+
+
+async def import_file(user_id: int, path: str, batch_size: int):
+    started = time.perf_counter()
+    with open(path, newline="") as lines:
+        async with async_session() as session:
+            service = TransactionImportService(session)
+            async for progress in service.import_csv(
+                user_id, lines, TransactionImportOptions(), batch_size
+            ):
+                pass
+    return progress, time.perf_counter() - started
+
+
+async def cleanup(user_id: int) -> None:
+    async with async_session() as session:
+        await session.execute(
+            delete(Transaction).where(
+                Transaction.user_id == user_id,
+                Transaction.item.like(f"{ITEM_PREFIX}-%"),
+            )
+        )
+        await DailyRollupService(session).backfill(user_id)
+        await session.commit()
+
+
+async def run(user_id: int, rows: int, batch_size: int, keep: bool) -> None:
+    with tempfile.NamedTemporaryFile(suffix=".csv") as statement:
+        started = time.perf_counter()
+        write_statement(statement.name, rows)
+        print(f"generated {rows} rows in {time.perf_counter() - started:.1f}s")
+
+        for title in ("first import", "re-import"):
+            progress, elapsed = await import_file(user_id, statement.name, batch_size)
+            print(
+                f"{title}: {elapsed:.1f}s, {progress.rows / elapsed:,.0f} rows/s, "
+                f"imported={progress.imported} duplicates={progress.duplicates} "
+                f"invalid={progress.invalid}"
+            )
+
+    if not keep:
+        await cleanup(user_id)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--keep", action="store_true", help="Не удалять загруженные строки"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id, args.rows, args.batch_size, args.keep))
+
+
+if __name__ == "__main__":
+    main()
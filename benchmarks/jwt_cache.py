@@ -0,0 +1,58 @@
+"""
+Пропускная способность аутентифицированного маршрута с кэшем проверенных
+JWT и без него. Запросы идут через ASGI-транспорт httpx, без сети и БД.
+
+    python -m benchmarks.jwt_cache [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.core.jwt import get_current_payload, verified_tokens
+from app.core.settings import settings
+from app.services.auth import get_jwt_service
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(payload: dict = Depends(get_current_payload)):
+        return {"sub": payload["sub"]}
+
+    return app
+
+
+async def run(requests: int, cache_enabled: bool, token: str) -> float:
+    settings.jwt_cache_enabled = cache_enabled
+    verified_tokens.clear()
+    transport = httpx.ASGITransport(app=build_app())
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/ping", headers=headers)
+            response.raise_for_status()
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = get_jwt_service().create_access_token(
+        {"id": 1, "email": "bench@example.com", "pwv": "bench"}
+    )
+    without_cache = asyncio.run(run(args.requests, False, token))
+    with_cache = asyncio.run(run(args.requests, True, token))
+    print(f"without cache: {without_cache:,.0f} req/s")
+    print(f"with cache:    {with_cache:,.0f} req/s")
+    print(f"hits={verified_tokens.hits} misses={verified_tokens.misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Сравнение планов горячих запросов до и после составных индексов.
+
+Создаёт изолированную схему bench, засевает её (по умолчанию 10M транзакций),
+печатает EXPLAIN (ANALYZE, BUFFERS) без индексов и с индексами из миграции
+8c2e4b7a9d13, затем удаляет схему. Рабочие таблицы не затрагиваются.
+
+    python -m benchmarks.query_plans [--rows 10000000] [--users 10000] [--keep]
+"""
+import argparse
+import time
+
+import psycopg2
+
+from app.core.settings import settings
+
+SCHEMA = "bench"
+
+SETUP = """
+DROP SCHEMA IF EXISTS {schema} CASCADE;
+CREATE SCHEMA {schema};
+CREATE TABLE {schema}.categories (
+    id serial PRIMARY KEY,
+    user_id integer NOT NULL,
+    name varchar(255) NOT NULL,
+    color varchar(7)
+);
+CREATE TABLE {schema}.goals (
+    id serial PRIMARY KEY,
+    user_id integer NOT NULL,
+    name varchar(255) NOT NULL,
+    description varchar(500),
+    amount numeric(12, 2) NOT NULL,
+    date_goals timestamp NOT NULL
+);
+CREATE TABLE {schema}.transactions (
+    id serial PRIMARY KEY,
+    user_id integer NOT NULL,
+    category_id integer,
+    item varchar(255) NOT NULL,
+    quantity integer NOT NULL,
+    location varchar(255),
+    amount numeric(12, 2) NOT NULL,
+    timestamp timestamptz NOT NULL,
+    payment_method varchar(255) NOT NULL,
+    payment_type varchar(255) NOT NULL
+);
+"""
+
+SEED = """
+INSERT INTO {schema}.categories (user_id, name)
+SELECT u, n
+FROM generate_series(1, %(users)s) AS u,
+     unnest(ARRAY['Еда', 'Транспорт', 'Развлечение', 'Услуги', 'Другое']) AS n;
+
+INSERT INTO {schema}.goals (user_id, name, amount, date_goals)
+SELECT u, 'goal', 1000, now() + interval '90 days'
+FROM generate_series(1, %(users)s) AS u;
+
+INSERT INTO {schema}.transactions
+    (user_id, category_id, item, quantity, amount, timestamp,
+     payment_method, payment_type)
+SELECT
+    1 + (g %% %(users)s),
+    NULL,
+    'item',
+    1,
+    round((random() * 1000)::numeric, 2),
+    now() - random() * interval '1095 days',
+    'Cash',
+    CASE WHEN random() < 0.9 THEN 'Expense' ELSE 'Income' END
+FROM generate_series(1, %(rows)s) AS g;
+
+ANALYZE {schema}.categories;
+ANALYZE {schema}.goals;
+ANALYZE {schema}.transactions;
+"""
+
+INDEXES = """
+CREATE INDEX ix_transactions_user_id_timestamp_id
+    ON {schema}.transactions (user_id, timestamp DESC, id);
+CREATE UNIQUE INDEX uq_categories_user_id_name
+    ON {schema}.categories (user_id, name);
+CREATE INDEX ix_goals_user_id ON {schema}.goals (user_id);
+ANALYZE {schema}.categories;
+ANALYZE {schema}.goals;
+ANALYZE {schema}.transactions;
+"""
+
+QUERIES = {
+    "transactions page": """
+        SELECT * FROM {schema}.transactions
+        WHERE user_id = 42
+        ORDER BY timestamp DESC, id
+        LIMIT 50
+    """,
+    "transactions period sum": """
+        SELECT payment_type, sum(amount), count(*) FROM {schema}.transactions
+        WHERE user_id = 42
+          AND timestamp >= now() - interval '30 days'
+        GROUP BY payment_type
+    """,
+    "category by name": """
+        SELECT id FROM {schema}.categories
+        WHERE user_id = 42 AND name = 'Еда'
+    """,
+    "goals by user": """
+        SELECT * FROM {schema}.goals WHERE user_id = 42
+    """,
+}
+
+
+def explain_all(cursor, title: str) -> None:
+    print(f"\n===== {title} =====")
+    for name, query in QUERIES.items():
+        cursor.execute(
+            "EXPLAIN (ANALYZE, BUFFERS) " + query.format(schema=SCHEMA)
+        )
+        print(f"\n--- {name}")
+        for (line,) in cursor.fetchall():
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument(
+        "--keep", action="store_true", help="Не удалять схему bench после прогона"
+    )
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(settings.database_dsn_not_async)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(SETUP.format(schema=SCHEMA))
+            cursor.execute(
+                SEED.format(schema=SCHEMA), {"rows": args.rows, "users": args.users}
+            )
+            print(f"seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+            explain_all(cursor, "without indexes")
+
+            started = time.perf_counter()
+            cursor.execute(INDEXES.format(schema=SCHEMA))
+            print(f"\nindexes built in {time.perf_counter() - started:.1f}s")
+
+            explain_all(cursor, "with indexes")
+
+            if not args.keep:
+                cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Проверка маршрутизации чтений на реплику и read-your-writes.
+
+Нужны две базы: основная (PG_HOST/PG_PORT) и реплика (PG_REPLICA_HOST/
+PG_REPLICA_PORT). Вместо настоящей реплики подойдёт второй локальный
+экземпляр Postgres или тот же сервер на другом адресе: сервер определяется
+по inet_server_addr()/inet_server_port() и pg_is_in_recovery().
+
+Скрипт показывает, куда идут чтения пользователя до записи, сразу после
+неё и по истечении окна pg_replica_read_your_writes_seconds, затем
+сравнивает время аналитического запроса на основном сервере и на реплике.
+
+    PG_REPLICA_HOST=... python -m benchmarks.replica_routing --user-id ID [--runs 50]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.database import (
+    async_session,
+    commit,
+    engine,
+    replica_engine,
+    routing_session,
+)
+from app.core.replica import read_session_factory, record_write
+from app.core.settings import settings
+from app.services.transaction import AnalyticsService
+
+SERVER = text(
+    "SELECT inet_server_addr()::text || ':' || inet_server_port() AS server, "
+    "pg_is_in_recovery() AS standby"
+)
+
+
+async def server_of_reads(user_id: int) -> str:
+    async with read_session_factory(user_id)() as session:
+        row = (await session.execute(SERVER)).one()
+    return f"{row.server} ({'standby' if row.standby else 'primary'})"
+
+
+async def simulate_write(user_id: int) -> None:
+    """Пустая транзакция на основном сервере, отмеченная как запись."""
+    async with async_session() as session:
+        record_write(session, user_id)
+        await commit(session)
+
+
+async def time_analytics(user_id: int, replica: bool, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        async with routing_session(info={"replica": replica}) as session:
+            started = time.perf_counter()
+            await AnalyticsService(session).get_total_spent(user_id)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+async def run(user_id: int, runs: int) -> None:
+    if replica_engine is None:
+        raise SystemExit("PG_REPLICA_HOST is not set")
+    window = settings.pg_replica_read_your_writes_seconds
+
+    print(f"before write:      {await server_of_reads(user_id)}")
+    await simulate_write(user_id)
+    print(f"right after write: {await server_of_reads(user_id)}")
+    await asyncio.sleep(window + 0.1)
+    print(f"after {window:.0f}s window:  {await server_of_reads(user_id)}")
+
+    primary = await time_analytics(user_id, False, runs)
+    replica = await time_analytics(user_id, True, runs)
+    print(f"get_total_spent median: primary {primary:.2f} ms, replica {replica:.2f} ms")
+
+    await engine.dispose()
+    await replica_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id, args.runs))
+
+
+if __name__ == "__main__":
+    main()
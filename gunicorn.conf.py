@@ -0,0 +1,71 @@
+"""
+Конфигурация gunicorn для продакшена:
+
+    gunicorn app.main:app
+
+gunicorn читает этот файл из текущего каталога автоматически. Параметры
+берутся из Settings (web_*), см. app/core/settings.py.
+"""
+import math
+import os
+
+from app.core.settings import settings
+
+
+def cpu_count() -> int:
+    """Доступные процессу ядра с учётом affinity и квоты cgroup v2 (контейнер)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+bind = settings.web_bind
+# Асинхронный воркер держит много соединений сам, поэтому воркеров — по ядрам
+workers = settings.web_workers or cpu_count()
+# Приложение импортируется ниже (preload_app): пулы делят pg_max_connections
+# на итоговое число воркеров (database.pool_limits)
+settings.web_workers = workers
+worker_class = "app.core.worker.UvicornWorker"
+
+max_requests = settings.web_max_requests
+max_requests_jitter = settings.web_max_requests_jitter
+timeout = settings.web_timeout
+graceful_timeout = settings.web_graceful_timeout
+keepalive = settings.web_keepalive
+
+# Приложение импортируется один раз в master до fork: быстрее старт
+# и перезапуск воркеров, общий copy-on-write код. Соединения с БД
+# открываются только в воркерах (lifespan).
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    # Обслуживание секций transactions — в одном воркере: роль получает
+    # новый воркер, если её нет ни у одного живого (преемник перезапущенного)
+    worker.partition_maintenance = not any(
+        getattr(other, "partition_maintenance", False)
+        for other in server.WORKERS.values()
+    )
+
+
+def post_fork(server, worker):
+    # Пулы, созданные при импорте в master, не должны делиться с воркерами
+    from app.core.database import engine, replica_engine
+    from app.services.partitions import partition_maintenance
+
+    for target in (engine, replica_engine):
+        if target is not None:
+            target.sync_engine.dispose(close=False)
+    partition_maintenance.enabled = worker.partition_maintenance
@@ -0,0 +1,13 @@
+import os
+
+# Settings требует параметры подключения; тесты в базу не ходят, кроме
+# тестов SQL-запросов, которые запускаются только с TEST_DATABASE_URL
+for name, value in {
+    "AUTHJWT_SECRET_KEY": "test-secret",
+    "PG_USER": "test",
+    "PG_PASSWORD": "test",
+    "PG_HOST": "localhost",
+    "PG_PORT": "5432",
+    "PG_DB": "test",
+}.items():
+    os.environ.setdefault(name, value)
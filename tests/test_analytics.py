@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.transaction import AnalyticsService
+
+
+class EmptyResult:
+    def all(self):
+        return []
+
+
+class FakeSession:
+    async def execute(self, stmt):
+        return EmptyResult()
+
+
+def test_daily_spending_window_ends_on_utc_today(monkeypatch):
+    monkeypatch.setenv("TZ", "Pacific/Kiritimati")  # UTC+14
+    import time
+
+    time.tzset()
+    try:
+        days = asyncio.run(AnalyticsService(FakeSession()).get_daily_spending(1, 7))
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+    assert len(days) == 8
+    assert days[-1]["date"] == datetime.now(timezone.utc).date().isoformat()
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return EmptyResult()
+
+
+def test_totals_use_exact_intraday_bounds_in_both_modes():
+    date_from = datetime(2026, 10, 1, 12, 30, tzinfo=timezone.utc)
+    date_to = datetime(2026, 10, 2, 8, 0, tzinfo=timezone.utc)
+    session = RecordingSession()
+    service = AnalyticsService(session)
+    asyncio.run(service.get_total_spent(1, date_from, date_to))
+    asyncio.run(service.get_total_spent(1, date_from, date_to, by_payment_method=True))
+    dialect = postgresql.dialect()
+    plain, detailed = (stmt.compile(dialect=dialect) for stmt in session.statements)
+    for compiled in (plain, detailed):
+        assert "FROM transactions" in str(compiled)
+        assert "daily_user_category_totals" not in str(compiled)
+        bounds = sorted(v for v in compiled.params.values() if isinstance(v, datetime))
+        assert bounds == [date_from, date_to]
+    assert "payment_method" in str(detailed)
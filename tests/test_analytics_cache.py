@@ -0,0 +1,109 @@
+import asyncio
+
+from starlette.requests import Request
+
+from app.core.database import commit
+from app.services import analytics_cache as module
+from app.services.analytics_cache import (
+    NOTIFY_CHANNEL,
+    AnalyticsCache,
+    LocalCacheBackend,
+    MemorySharedBackend,
+    cached_response,
+    invalidate_analytics,
+)
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.executed = []
+
+    async def execute(self, stmt, params=None):
+        self.executed.append(params)
+
+    async def commit(self):
+        pass
+
+
+def request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def counter():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"total_spent": len(calls)}
+
+    return calls, compute
+
+
+def test_version_bump_invalidates_entries():
+    cache = AnalyticsCache(MemorySharedBackend(), ttl=60)
+    calls, compute = counter()
+
+    async def scenario():
+        first = await cache.fetch(1, "total_sum", {"limit": 5}, compute)
+        again = await cache.fetch(1, "total_sum", {"limit": 5}, compute)
+        other = await cache.fetch(2, "total_sum", {"limit": 5}, compute)
+        await cache.backend.bump_version(1)
+        fresh = await cache.fetch(1, "total_sum", {"limit": 5}, compute)
+        return first, again, other, fresh
+
+    first, again, other, fresh = asyncio.run(scenario())
+    assert first == again
+    assert len(calls) == 3
+    assert fresh[1] != first[1]
+    assert other[1] != first[1]
+
+
+def test_etag_and_not_modified(monkeypatch):
+    monkeypatch.setattr(
+        module, "analytics_cache", AnalyticsCache(MemorySharedBackend(), ttl=60)
+    )
+    calls, compute = counter()
+
+    async def scenario():
+        ok = await cached_response(request(), 1, "total_sum", {}, compute)
+        etag = ok.headers["etag"]
+        not_modified = await cached_response(request(etag), 1, "total_sum", {}, compute)
+        weak = await cached_response(request(f"W/{etag}"), 1, "total_sum", {}, compute)
+        return ok, not_modified, weak
+
+    ok, not_modified, weak = asyncio.run(scenario())
+    assert ok.status_code == 200 and ok.body == b'{"total_spent":1}'
+    assert not_modified.status_code == 304 and not_modified.body == b""
+    assert not_modified.headers["etag"] == ok.headers["etag"]
+    assert weak.status_code == 304
+    assert len(calls) == 1
+
+
+def test_invalidation_waits_for_commit(monkeypatch):
+    backend = LocalCacheBackend(maxsize=10, ttl=60)
+    monkeypatch.setattr(module, "analytics_cache", AnalyticsCache(backend, ttl=60))
+    session = FakeSession()
+
+    async def scenario():
+        before = await backend.get_version(1)
+        invalidate_analytics(session, 1)
+        invalidate_analytics(session, 1)
+        pending = await backend.get_version(1)
+        await commit(session)
+        return before, pending, await backend.get_version(1)
+
+    before, pending, after = asyncio.run(scenario())
+    assert before == pending != after
+    assert session.executed == [{"channels": [NOTIFY_CHANNEL], "payloads": ["1"]}]
+
+
+def test_shared_backend_needs_no_notify(monkeypatch):
+    monkeypatch.setattr(
+        module, "analytics_cache", AnalyticsCache(MemorySharedBackend(), ttl=60)
+    )
+    session = FakeSession()
+    invalidate_analytics(session, 1)
+    asyncio.run(commit(session))
+    assert session.executed == []
@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.settings import settings
+from app.models.user import Category
+from app.services import database
+from app.services.category import CategoryService
+from app.services.database import DEFAULT, BaseDb, PostgresqlEngine, _chunks, _rows
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.statements = []
+
+    async def scalars(self, stmt, execution_options=None):
+        self.statements.append(stmt)
+        return FakeResult(
+            [
+                {getattr(column, "key", column): value for column, value in row.items()}
+                for row in stmt._multi_values[0]
+            ]
+        )
+
+
+def sql(stmt):
+    return str(stmt.compile(dialect=postgresql.asyncpg.dialect()))
+
+
+def test_rows_share_the_union_of_columns():
+    rows = _rows([{"user_id": 1, "name": "a"}, {"user_id": 1, "color": "#fff"}])
+    assert [list(row) for row in rows] == [["user_id", "name", "color"]] * 2
+    assert rows[0]["color"] is DEFAULT and rows[1]["name"] is DEFAULT
+
+
+def test_chunks_respect_the_bind_limit(monkeypatch):
+    monkeypatch.setattr(database, "MAX_BIND_PARAMS", 10)
+    rows = _rows([{"user_id": 1}] + [{"user_id": 1, "name": "a", "color": "b"}] * 6)
+    # размер пачки считается по общему набору колонок, а не по первой строке
+    assert [len(chunk) for chunk in _chunks(rows)] == [3, 3, 1]
+
+
+def test_create_many_renders_default_for_missing_fields():
+    session = FakeSession()
+    created = asyncio.run(
+        BaseDb(PostgresqlEngine(session)).create_many(
+            [{"user_id": 1, "name": "a"}, {"user_id": 1, "name": "b", "color": "#fff"}],
+            Category,
+        )
+    )
+    assert len(created) == 2 and len(session.statements) == 1
+    assert "DEFAULT), (" in sql(session.statements[0])
+
+
+def test_upsert_many_collapses_duplicate_keys():
+    session = FakeSession()
+    asyncio.run(
+        BaseDb(PostgresqlEngine(session)).upsert_many(
+            [{"user_id": 1, "name": "a"}, {"user_id": 1, "name": "a"}],
+            Category,
+            index_elements=["user_id", "name"],
+            update_fields=[],
+        )
+    )
+    statement = sql(session.statements[0])
+    assert "), (" not in statement
+    assert "ON CONFLICT (user_id, name) DO NOTHING" in statement
+
+
+def test_default_categories_are_one_insert(monkeypatch):
+    monkeypatch.setattr(settings, "default_categories", {"ru": ["Еда", "Транспорт"]})
+    monkeypatch.setattr(settings, "default_category_palette", ["#111"])
+    session = FakeSession()
+    created = asyncio.run(CategoryService(session).create_default_categories(1, "ru"))
+    assert [row["name"] for row in created] == ["Еда", "Транспорт"]
+    assert len(session.statements) == 1
@@ -0,0 +1,110 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.sql.dml import Delete, Insert
+
+from app.schemas.transaction import TransactionCreate
+from app.services.category_cache import category_cache
+from app.services.transaction import TransactionService
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalar(self):
+        return self._rows[0] if self._rows else None
+
+    def one(self):
+        return self._rows[0]
+
+    def all(self):
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class FakeSession:
+    """
+    Вставка возвращает category_id = NULL, пока id не взят из БД:
+    так выглядит INSERT с устаревшим id из кэша.
+    """
+
+    def __init__(self, category_id):
+        self.info = {}
+        self.category_id = category_id
+        self.inserted = []
+        self.deleted = 0
+        self.next_id = 100
+
+    async def execute(self, stmt, params=None):
+        if isinstance(stmt, Delete):
+            self.deleted += 1
+            return FakeResult([])
+        return FakeResult([self.category_id])
+
+    async def scalars(self, stmt):
+        assert isinstance(stmt, Insert)
+        rows = stmt._multi_values[0] if stmt._multi_values else [stmt._values]
+        created = []
+        for row in rows:
+            row = {getattr(column, "key", column): value for column, value in row.items()}
+            value = row["category_id"]
+            value = getattr(value, "value", value)
+            self.next_id += 1
+            created.append(
+                SimpleNamespace(
+                    id=self.next_id,
+                    category_id=value if isinstance(value, int) else None,
+                )
+            )
+        self.inserted.append(created)
+        return FakeResult(created)
+
+
+def service(session, monkeypatch):
+    svc = TransactionService(session)
+
+    async def apply(rows, sign=1):
+        pass
+
+    monkeypatch.setattr(svc.rollup, "apply", apply)
+    return svc
+
+
+def item():
+    return TransactionCreate(
+        category_name="Еда",
+        item="хлеб",
+        quantity=1,
+        location="дом",
+        amount=Decimal("10"),
+        payment_method="Cash",
+        payment_type="Expense",
+    )
+
+
+def test_stale_cached_category_is_resolved_again(monkeypatch):
+    category_cache.set(1, "Еда", 5)
+    session = FakeSession(category_id=7)
+
+    txn = asyncio.run(service(session, monkeypatch).create_transaction(1, item()))
+
+    assert txn.category_id == 7
+    assert session.deleted == 1
+    assert category_cache.get(1, "Еда") == 7
+
+
+def test_deleted_cached_category_is_404(monkeypatch):
+    category_cache.set(1, "Еда", 5)
+    session = FakeSession(category_id=None)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(service(session, monkeypatch).create_transaction(1, item()))
+
+    assert error.value.status_code == 404
+    assert category_cache.get(1, "Еда") is None
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.core.settings import settings
+from app.schemas.transaction import ForecastResponse, TotalsResponse
+from app.services.dashboard import DashboardService
+from app.services.transaction import AnalyticsService
+
+
+class FakeSession:
+    open = 0
+    peak = 0
+
+    async def __aenter__(self):
+        FakeSession.open += 1
+        FakeSession.peak = max(FakeSession.peak, FakeSession.open)
+        return self
+
+    async def __aexit__(self, *exc):
+        FakeSession.open -= 1
+
+    async def connection(self, execution_options=None):
+        pass
+
+    async def scalar(self, stmt):
+        return "00000003-0000001B-1"
+
+    async def execute(self, stmt):
+        pass
+
+
+def fake_metrics(monkeypatch):
+    async def totals(self, *args):
+        await asyncio.sleep(0)
+        return TotalsResponse(total_spent=1, total_income=0, breakdown=[])
+
+    async def listing(self, *args):
+        await asyncio.sleep(0)
+        return []
+
+    async def forecast(self, *args):
+        await asyncio.sleep(0)
+        return ForecastResponse(
+            spent_to_date=0,
+            remaining=0,
+            remaining_lower=0,
+            remaining_upper=0,
+            recurring=0,
+            month_total=0,
+        )
+
+    monkeypatch.setattr(AnalyticsService, "get_total_spent", totals)
+    monkeypatch.setattr(AnalyticsService, "get_top_categories", listing)
+    monkeypatch.setattr(AnalyticsService, "get_daily_spending", listing)
+    monkeypatch.setattr(AnalyticsService, "forecast", forecast)
+
+
+def build_many(count):
+    service = DashboardService(FakeSession)
+
+    async def run():
+        await asyncio.gather(*(service.build(1) for _ in range(count)))
+
+    FakeSession.peak = 0
+    asyncio.run(run())
+    return FakeSession.peak
+
+
+def test_dashboard_uses_one_connection(monkeypatch):
+    fake_metrics(monkeypatch)
+    monkeypatch.setattr(settings, "analytics_dashboard_parallel", False)
+    assert build_many(1) == 1
+
+
+def test_parallel_dashboards_fit_the_pool(monkeypatch):
+    fake_metrics(monkeypatch)
+    monkeypatch.setattr(settings, "analytics_dashboard_parallel", True)
+    monkeypatch.setattr(settings, "pg_pool_size", 6)
+    monkeypatch.setattr(settings, "pg_max_overflow", 2)
+    monkeypatch.setattr(DashboardService, "_parallel_slots", None)
+    # 8 соединений — два дашборда по 4 одновременно
+    assert build_many(10) == 8
+
+
+def test_window_reaches_the_metrics_that_use_it(monkeypatch):
+    fake_metrics(monkeypatch)
+    monkeypatch.setattr(settings, "analytics_dashboard_parallel", False)
+    calls = {}
+
+    def recording(name, original):
+        async def metric(self, *args):
+            calls[name] = args
+            return await original(self, *args)
+
+        monkeypatch.setattr(AnalyticsService, name, metric)
+
+    for name in (
+        "get_total_spent",
+        "get_top_categories",
+        "get_daily_spending",
+        "forecast",
+    ):
+        recording(name, getattr(AnalyticsService, name))
+    date_from = datetime(2026, 9, 1, tzinfo=timezone.utc)
+    date_to = datetime(2026, 9, 30, tzinfo=timezone.utc)
+
+    asyncio.run(DashboardService(FakeSession).build(1, date_from, date_to, 3, 14))
+
+    assert calls == {
+        "get_total_spent": (1, date_from, date_to),
+        "get_top_categories": (1, 3, date_from, date_to),
+        "get_daily_spending": (1, 14),
+        "forecast": (1, date_from),
+    }
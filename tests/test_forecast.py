@@ -0,0 +1,70 @@
+from datetime import date
+
+import numpy as np
+
+from app.services.forecast import (
+    detect_recurring,
+    forecast_batch,
+    history_start,
+    weekday_factors,
+)
+
+TODAY = date(2026, 10, 17)
+START = history_start(TODAY, 84, 3)
+DAYS = (TODAY - START).days
+
+
+def daily(amount, **by_day_of_month):
+    """Ряд с amount в день и добавками в заданные дни месяца (d1=..., d20=...)."""
+    series = np.full(DAYS, float(amount))
+    for offset in range(DAYS):
+        extra = by_day_of_month.get(f"d{date.fromordinal(START.toordinal() + offset).day}")
+        if extra:
+            series[offset] += extra
+    return series
+
+
+def test_steady_spender_has_no_recurring_payments():
+    history = np.stack([daily(10)])
+    recurring = detect_recurring(history, START, TODAY, 3, 0.1)
+    assert not recurring.any()
+
+
+def test_recurring_payment_is_the_spike_above_the_usual_level():
+    history = np.stack([daily(10, d1=500), daily(0, d20=300)])
+    recurring = detect_recurring(history, START, TODAY, 3, 0.1)
+    assert recurring[0, 0] == 500
+    assert recurring[1, 19] == 300
+    assert np.count_nonzero(recurring) == 2
+
+
+def test_irregular_spike_is_not_recurring():
+    history = daily(10, d5=500)
+    history[(date(2026, 8, 5) - START).days] = 10
+    recurring = detect_recurring(history[None, :], START, TODAY, 3, 0.1)
+    assert not recurring.any()
+
+
+def test_weekday_factors():
+    weekdays = (START.weekday() + np.arange(DAYS)) % 7
+    series = np.where(weekdays >= 5, 20.0, 10.0)[None, :]
+    factors = weekday_factors(series, weekdays)
+    assert factors[0, 5] == factors[0, 6]
+    assert np.allclose(factors[0, :5] * 2, factors[0, 5])
+    assert np.allclose(weekday_factors(np.zeros((1, DAYS)), weekdays), 1.0)
+
+
+def test_forecast_for_steady_spender():
+    batch = forecast_batch(np.stack([daily(10)]), START, TODAY, fit_days=84)
+    assert batch.spent_to_date[0] == 160
+    assert np.isclose(batch.remaining[0], 150)
+    assert batch.recurring[0] == 0
+    assert np.isclose(batch.lower[0], 150) and np.isclose(batch.upper[0], 150)
+
+
+def test_forecast_adds_recurring_payments_left_this_month():
+    history = np.stack([daily(10, d1=500, d20=300)])
+    batch = forecast_batch(history, START, TODAY, fit_days=84)
+    assert batch.spent_to_date[0] == 160 + 500
+    assert np.isclose(batch.recurring[0], 300)
+    assert np.isclose(batch.remaining[0], 150 + 300)
@@ -0,0 +1,200 @@
+import asyncio
+import io
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.base import ModelBase
+from app.models.user import Category, DailyUserCategoryTotal, Goals, User
+from app.schemas.goals import GoalProgress
+from app.scripts import goals_nightly
+from app.services.goals import GoalsService
+
+TODAY = date(2026, 10, 17)
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+class BatchSession:
+    """Сессия скрипта: на каждую пачку — своя, события пишутся в log."""
+
+    def __init__(self, log, batches):
+        self.log = log
+        self.batches = batches
+
+    async def __aenter__(self):
+        self.log.append("open")
+        return self
+
+    async def __aexit__(self, *exc):
+        self.log.append("close")
+
+    async def scalars(self, stmt):
+        self.log.append("select users")
+        return self
+
+    def all(self):
+        return self.batches.pop(0) if self.batches else []
+
+
+def test_nightly_run_uses_a_short_transaction_per_batch(monkeypatch):
+    log = []
+    batches = [[1, 2], [3]]
+    monkeypatch.setattr(
+        goals_nightly,
+        "routing_session",
+        lambda info: BatchSession(log, batches) if info == {"replica": True} else None,
+    )
+
+    async def progress(self, user_ids, today):
+        log.append(f"progress {list(user_ids)}")
+        return {
+            user_id: [
+                GoalProgress(
+                    id=user_id,
+                    user_id=user_id,
+                    name="goal",
+                    description=None,
+                    amount=Decimal(100),
+                    date_goals=datetime(2026, 12, 1),
+                    saved=Decimal(0),
+                    remaining=Decimal(100),
+                    days_left=45,
+                    required_daily=Decimal("2.22"),
+                    projected_date=None,
+                    on_track=user_id != 2,
+                )
+            ]
+            for user_id in user_ids
+        }
+
+    async def dispose():
+        log.append("dispose")
+
+    monkeypatch.setattr(GoalsService, "get_goals_progress_batch", progress)
+    monkeypatch.setattr(goals_nightly, "dispose_engines", dispose)
+    output = io.StringIO()
+
+    processed = asyncio.run(goals_nightly.run(output, 2, off_track=True, today=TODAY))
+
+    assert processed == 3
+    batch = ["open", "select users", "progress {}", "close"]
+    assert log == (
+        [event.format([1, 2]) for event in batch]
+        + [event.format([3]) for event in batch]
+        + ["open", "select users", "close", "dispose"]
+    )
+    assert output.getvalue().count("\n") == 1 and '"user_id":2' in output.getvalue()
+
+
+async def _progress_from_postgres(rows) -> dict:
+    """
+    Выполняет _goals_progress_query на TEST_DATABASE_URL во временной схеме;
+    транзакция откатывается, поэтому база остаётся нетронутой.
+    """
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                await connection.execute(text("CREATE SCHEMA goals_progress_test"))
+                await connection.execute(
+                    text("SET LOCAL search_path TO goals_progress_test")
+                )
+                await connection.run_sync(
+                    ModelBase.metadata.create_all,
+                    tables=[
+                        User.__table__,
+                        Category.__table__,
+                        Goals.__table__,
+                        DailyUserCategoryTotal.__table__,
+                    ],
+                )
+                for model, values in rows:
+                    await connection.execute(insert(model), values)
+                session = AsyncSession(bind=connection)
+                return await GoalsService(session).get_goals_progress_batch(
+                    [1, 2], TODAY
+                )
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+def rollup(user_id, day, payment_type, amount):
+    return {
+        "user_id": user_id,
+        "day": day,
+        "category_id": None,
+        "payment_type": payment_type,
+        "total_amount": amount,
+        "txn_count": 1,
+    }
+
+
+def goal(goal_id, user_id, amount, deadline):
+    return {
+        "id": goal_id,
+        "user_id": user_id,
+        "name": f"goal {goal_id}",
+        "amount": amount,
+        "date_goals": deadline,
+    }
+
+
+@pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="нужен PostgreSQL: задайте TEST_DATABASE_URL"
+)
+def test_goals_progress_query():
+    progress = asyncio.run(
+        _progress_from_postgres(
+            [
+                (
+                    User,
+                    [
+                        {"id": 1, "email": "a@example.com", "hashed_password": "x"},
+                        {"id": 2, "email": "b@example.com", "hashed_password": "x"},
+                    ],
+                ),
+                (
+                    DailyUserCategoryTotal,
+                    [
+                        # пользователь 1: накоплено 500, за окно — минус 500
+                        rollup(1, date(2026, 1, 10), "income", 1000),
+                        rollup(1, date(2026, 10, 10), "expense", 500),
+                        # пользователь 2: накоплено 50, всё за окно
+                        rollup(2, date(2026, 10, 7), "income", 50),
+                    ],
+                ),
+                (
+                    Goals,
+                    [
+                        goal(1, 1, 400, datetime(2026, 12, 1)),
+                        goal(2, 1, 300, datetime(2026, 11, 1)),
+                        goal(3, 2, 200, datetime(2026, 10, 7)),
+                    ],
+                ),
+            ]
+        )
+    )
+
+    # накопления распределяются по целям в порядке срока
+    earlier, later = progress[1]
+    assert (earlier.id, earlier.saved, earlier.remaining) == (2, 300, 0)
+    assert earlier.required_daily == 0
+    assert earlier.projected_date == TODAY and earlier.on_track
+    assert (later.id, later.saved, later.remaining) == (1, 200, 200)
+    assert later.days_left == 45
+    assert later.required_daily == Decimal("4.44")
+    # при неположительных накоплениях за окно дата достижения не прогнозируется
+    assert later.projected_date is None and not later.on_track
+
+    # у просроченной цели весь остаток нужен сразу
+    (overdue,) = progress[2]
+    assert (overdue.saved, overdue.remaining, overdue.days_left) == (50, 150, -10)
+    assert overdue.required_daily == 150
+    assert overdue.projected_date == date(2027, 7, 14) and not overdue.on_track
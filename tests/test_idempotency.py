@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.sql.dml import Insert, Update
+
+from app.services.idempotency import IdempotencyService
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def one_or_none(self):
+        return self.row
+
+
+class FakeSession:
+    """Таблица idempotency_keys из одной строки (или пустая)."""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.statements = []
+
+    async def scalar(self, stmt):
+        self.statements.append(type(stmt).__name__)
+        now = datetime.now(tz=timezone.utc)
+        if isinstance(stmt, Insert):
+            if self.row is not None:
+                return None
+            self.row = stored("POST /goals", "hash", created_at=now)
+            return now
+        assert isinstance(stmt, Update)
+        self.row = stored("POST /goals", "hash", created_at=now)
+        return "key"
+
+    async def execute(self, stmt):
+        self.statements.append(type(stmt).__name__)
+        return FakeResult(self.row)
+
+
+def stored(endpoint, payload_hash, created_at=None, response=None):
+    return SimpleNamespace(
+        endpoint=endpoint,
+        request_hash=payload_hash,
+        status_code=201 if response is not None else None,
+        response=response,
+        created_at=created_at or datetime.now(tz=timezone.utc),
+    )
+
+
+def claim(session, payload_hash="hash"):
+    service = IdempotencyService(session)
+    return asyncio.run(service.claim(1, "key", "POST /goals", payload_hash))
+
+
+def test_new_key_is_a_single_insert():
+    session = FakeSession()
+    assert claim(session) is None
+    assert session.statements == ["Insert"]
+
+
+def test_replay_reads_without_writing():
+    session = FakeSession(stored("POST /goals", "hash", response={"id": 7}))
+    response = claim(session)
+    assert response.status_code == 201
+    assert response.body == b'{"id":7}'
+    assert response.headers["idempotent-replayed"] == "true"
+    assert session.statements == ["Insert", "Select"]
+
+
+def test_reuse_with_other_payload_is_422():
+    session = FakeSession(stored("POST /goals", "hash", response={"id": 7}))
+    with pytest.raises(HTTPException) as error:
+        claim(session, payload_hash="other")
+    assert error.value.status_code == 422
+
+
+def test_expired_key_is_claimed_again():
+    old = datetime.now(tz=timezone.utc) - timedelta(days=30)
+    session = FakeSession(stored("POST /goals", "other", old, response={"id": 7}))
+    assert claim(session) is None
+    assert session.statements == ["Insert", "Select", "Update"]
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.core.database import commit
+from app.services.auth import (
+    NOTIFY_CHANNEL,
+    UserIdentity,
+    _on_notify,
+    forget_identity_on_commit,
+    remember_identity,
+    user_identity_cache,
+)
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.executed = []
+        self.committed = False
+
+    async def execute(self, stmt, params=None):
+        self.executed.append(params)
+
+    async def commit(self):
+        self.committed = True
+
+
+def identity(user_id):
+    return UserIdentity(user_id, f"{user_id}@example.com", None, "pwv")
+
+
+def test_identity_is_evicted_only_after_commit():
+    session = FakeSession()
+    remember_identity(identity(1))
+    forget_identity_on_commit(session, 1)
+    forget_identity_on_commit(session, 1)
+    assert user_identity_cache.get(1) == identity(1)
+
+    asyncio.run(commit(session))
+
+    assert user_identity_cache.get(1) is None
+    # одно уведомление, отправленное одним запросом до COMMIT
+    assert session.executed == [{"channels": [NOTIFY_CHANNEL], "payloads": ["1"]}]
+    assert session.committed
+
+
+def test_notification_evicts_identity_in_other_workers():
+    remember_identity(identity(2))
+    _on_notify("2")
+    assert user_identity_cache.get(2) is None
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemas.transaction import TransactionImportOptions
+from app.services.importer import CsvRows, check_csv, parse_batch
+
+HEADER = "timestamp,item,amount,payment_method,payment_type,category_name\n"
+ROW = "2026-10-01T12:00:00,хлеб,10.50,Cash,Expense,Еда\n"
+
+
+def upload(text, encoding="utf-8"):
+    return io.BytesIO(text.encode(encoding) if isinstance(text, str) else text)
+
+
+def test_rows_are_parsed_in_batches():
+    options = TransactionImportOptions()
+    data = HEADER + ROW * 3 + "x,y,z,Cash,Expense,\n"
+    rows = enumerate(CsvRows(upload(data), options), start=1)
+
+    count, valid, errors = parse_batch(rows, 3, options)
+    assert (count, len(valid), errors) == (3, 3, [])
+    assert valid[0][1].item == "хлеб"
+
+    count, valid, errors = parse_batch(rows, 3, options)
+    assert count == 1 and valid == []
+    assert errors[0][0] == 4
+
+    assert parse_batch(rows, 3, options)[0] == 0
+
+
+def test_other_encodings():
+    options = TransactionImportOptions(encoding="cp1251")
+    rows = list(CsvRows(upload(HEADER + ROW, "cp1251"), options))
+    assert rows[0]["item"] == "хлеб"
+
+
+def test_bad_encoding_is_400_with_line():
+    data = (HEADER + ROW + ROW).encode() + b"\xff\xfe,broken\n"
+    with pytest.raises(HTTPException) as error:
+        check_csv(upload(data), TransactionImportOptions())
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith("Строка 4 файла")
+
+
+def test_malformed_csv_is_400_with_line():
+    data = HEADER + ROW + '2026-10-01,"' + "x" * 200_000 + '",1,Cash,Expense,\n'
+    with pytest.raises(HTTPException) as error:
+        check_csv(upload(data), TransactionImportOptions())
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith("Строка 3 файла")
+
+
+def test_unknown_encoding_is_400():
+    with pytest.raises(HTTPException) as error:
+        CsvRows(upload(HEADER), TransactionImportOptions(encoding="nope"))
+    assert error.value.status_code == 400
+
+
+def test_check_rewinds_the_file():
+    file = upload(HEADER + ROW)
+    check_csv(file, TransactionImportOptions())
+    assert file.read().decode() == HEADER + ROW
@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import metrics as metrics_api
+from app.core.settings import settings
+
+
+def test_metrics_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", None)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(metrics_api.get_metrics("anything"))
+    assert exc.value.status_code == 404
+
+
+def test_metrics_require_matching_token(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(metrics_api.get_metrics(token))
+        assert exc.value.status_code == 401
+    assert isinstance(asyncio.run(metrics_api.get_metrics("s3cret")), dict)
@@ -0,0 +1,98 @@
+import asyncio
+
+from app.core import replica
+from app.core.database import commit
+from app.core.replica import NOTIFY_CHANNEL, ReadYourWrites
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.executed = []
+
+    async def execute(self, stmt, params=None):
+        self.executed.append(params)
+
+    async def commit(self):
+        pass
+
+
+class Clock:
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def routed_to_replica(user_id):
+    return replica.read_session_factory(user_id)()["replica"]
+
+
+def test_reads_go_to_primary_inside_the_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    monkeypatch.setattr(replica, "replica_engine", object())
+    monkeypatch.setattr(replica, "read_your_writes", ReadYourWrites(window=5))
+    monkeypatch.setattr(replica, "routing_session", lambda info: info)
+    session = FakeSession()
+
+    replica.record_write(session, 1)
+    assert routed_to_replica(1)  # до коммита запись не видна
+
+    asyncio.run(commit(session))
+    assert session.executed == [{"channels": [NOTIFY_CHANNEL], "payloads": ["1"]}]
+    assert not routed_to_replica(1)
+    assert routed_to_replica(2)
+
+    clock.now += 4.9
+    assert not routed_to_replica(1)
+    clock.now += 0.2
+    assert routed_to_replica(1)
+
+
+def test_listener_reset_sends_everyone_to_primary(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    monkeypatch.setattr(replica, "replica_engine", object())
+    monkeypatch.setattr(replica, "read_your_writes", ReadYourWrites(window=5))
+    monkeypatch.setattr(replica, "routing_session", lambda info: info)
+
+    replica.read_your_writes.mark_all()
+    assert not routed_to_replica(3)
+    clock.now += 5
+    assert routed_to_replica(3)
+
+
+def test_next_read_goes_to_primary_once_the_write_returns(monkeypatch):
+    from fastapi import Depends, FastAPI
+
+    from app.core import database
+    from app.services.category import CategoryService, get_category_service
+    from tests.test_unit_of_work import FakeSession as RequestSession, call
+
+    clock = Clock()
+    monkeypatch.setattr("time.monotonic", clock)
+    monkeypatch.setattr(replica, "replica_engine", object())
+    monkeypatch.setattr(replica, "read_your_writes", ReadYourWrites(window=5))
+    monkeypatch.setattr(replica, "routing_session", lambda info: info)
+
+    class Probe(list):
+        def append(self, event):
+            if event.startswith("response"):
+                # клиент видит ответ — его следующее чтение уже на primary
+                event = f"{event} replica={routed_to_replica(1)}"
+            super().append(event)
+
+    events = Probe()
+    monkeypatch.setattr(database, "async_session", lambda: RequestSession(events))
+
+    app = FastAPI()
+
+    @app.post("/items", status_code=201)
+    async def create(service: CategoryService = Depends(get_category_service)):
+        replica.record_write(service.db, 1)
+        return {}
+
+    call(app, events)
+    assert events.index("execute") < events.index("commit")  # NOTIFY до COMMIT
+    assert "response 201 replica=False" in events
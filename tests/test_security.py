@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from werkzeug.security import generate_password_hash
+
+from app.core.security import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(workers=2, queue_limit=4, rounds=4)
+
+
+def test_hash_verify_round_trip(hasher):
+    hashed = asyncio.run(hasher.hash("secret"))
+    assert hashed.startswith("$2b$04$")
+    assert asyncio.run(hasher.verify("secret", hashed)) == (True, None)
+    assert asyncio.run(hasher.verify("wrong", hashed)) == (False, None)
+
+
+def test_werkzeug_hash_is_migrated(hasher):
+    legacy = generate_password_hash("secret")
+    valid, new_hash = asyncio.run(hasher.verify("secret", legacy))
+    assert valid
+    assert asyncio.run(hasher.verify("secret", new_hash)) == (True, None)
+    assert asyncio.run(hasher.verify("wrong", legacy)) == (False, None)
+
+
+def test_rehash_on_rounds_change(hasher):
+    old = PasswordHasher(workers=1, queue_limit=1, rounds=5)
+    hashed = asyncio.run(old.hash("secret"))
+    valid, new_hash = asyncio.run(hasher.verify("secret", hashed))
+    assert valid and new_hash.startswith("$2b$04$")
+
+
+def test_long_password_rejected(hasher):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(hasher.hash("x" * 73))
+    assert exc.value.status_code == 400
+    hashed = asyncio.run(hasher.hash("x" * 72))
+    assert asyncio.run(hasher.verify("x" * 73, hashed)) == (False, None)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, status
+
+from app.core import database
+from app.core.database import after_commit
+from app.services.category import CategoryService, get_category_service
+
+
+class FakeSession:
+    def __init__(self, events, fail=False):
+        self.info = {}
+        self.events = events
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.events.append("close")
+
+    async def execute(self, stmt, params=None):
+        self.events.append("execute")
+
+    async def commit(self):
+        if self.fail:
+            raise RuntimeError("could not serialize access")
+        self.events.append("commit")
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.post("/items", status_code=status.HTTP_201_CREATED)
+    async def create(service: CategoryService = Depends(get_category_service)):
+        after_commit(service.db, lambda: service.db.events.append("after_commit"))
+        return {"ok": True}
+
+    return app
+
+
+def call(app, events):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            events.append(f"response {message['status']}")
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/items",
+        "raw_path": b"/items",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+
+
+def test_commit_happens_before_the_response(monkeypatch):
+    events = []
+    monkeypatch.setattr(database, "async_session", lambda: FakeSession(events))
+    call(make_app(), events)
+    assert events.index("commit") < events.index("response 201")
+    assert events.index("after_commit") < events.index("response 201")
+
+
+def test_commit_failure_reaches_the_client(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        database, "async_session", lambda: FakeSession(events, fail=True)
+    )
+    with pytest.raises(RuntimeError):
+        call(make_app(), events)
+    assert "response 201" not in events
+    assert "response 500" in events
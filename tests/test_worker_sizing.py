@@ -0,0 +1,63 @@
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.database import pool_limits
+from app.core.settings import settings
+
+
+def test_pool_is_unbounded_without_budget(monkeypatch):
+    monkeypatch.setattr(settings, "pg_max_connections", None)
+    monkeypatch.setattr(settings, "pg_pool_size", 10)
+    monkeypatch.setattr(settings, "pg_max_overflow", 10)
+    assert pool_limits() == (10, 10)
+
+
+@pytest.mark.parametrize(
+    "budget, workers, expected",
+    [
+        (100, 4, (10, 10)),  # 25 на воркер: пул 20 + LISTEN
+        (60, 4, (10, 4)),  # 15 на воркер: 10 постоянных, 4 overflow, LISTEN
+        (32, 4, (7, 0)),
+    ],
+)
+def test_budget_is_split_between_workers(monkeypatch, budget, workers, expected):
+    monkeypatch.setattr(settings, "pg_max_connections", budget)
+    monkeypatch.setattr(settings, "web_workers", workers)
+    monkeypatch.setattr(settings, "pg_pool_size", 10)
+    monkeypatch.setattr(settings, "pg_max_overflow", 10)
+    assert pool_limits() == expected
+    size, overflow = pool_limits()
+    assert workers * (size + overflow + 1) <= budget
+
+
+def test_budget_too_small(monkeypatch):
+    monkeypatch.setattr(settings, "pg_max_connections", 7)
+    monkeypatch.setattr(settings, "web_workers", 4)
+    with pytest.raises(ValueError):
+        pool_limits()
+
+
+def test_partition_maintenance_runs_in_one_worker(monkeypatch):
+    monkeypatch.setattr(settings, "web_workers", settings.web_workers)
+    path = Path(__file__).parent.parent / "gunicorn.conf.py"
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+
+    server = SimpleNamespace(WORKERS={})
+    workers = []
+    for pid in range(3):
+        worker = SimpleNamespace()
+        conf.pre_fork(server, worker)
+        server.WORKERS[pid] = worker
+        workers.append(worker)
+    assert [w.partition_maintenance for w in workers] == [True, False, False]
+
+    # воркер с ролью перезапущен — роль получает его преемник
+    del server.WORKERS[0]
+    successor = SimpleNamespace()
+    conf.pre_fork(server, successor)
+    assert successor.partition_maintenance